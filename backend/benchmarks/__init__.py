@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for the Vintage Queue backend
+Run from the backend directory, e.g. python -m benchmarks.bench_gather_jobs
+"""
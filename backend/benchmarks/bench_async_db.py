@@ -0,0 +1,152 @@
+"""
+Load benchmark comparing the async database path with blocking sessions
+Serves /jobs/{job_id}/status from the real app and from a copy of the
+previous handler (blocking SQLAlchemy calls inside async def), then
+reports requests/sec and latency percentiles under concurrent load
+
+SQLite answers in microseconds, which hides the cost of blocking the event
+loop; --db-latency-ms adds a per-statement delay in the thread that runs the
+query to stand in for the network round trip to PostgreSQL
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_async_db_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import event, insert
+from sqlalchemy.util import await_only
+
+from database import SessionLocal, async_engine, engine
+from main import app
+from models import Job, JobStatus, JobType
+
+def build_blocking_app() -> FastAPI:
+    """Recreate the status endpoint as it was before the async port"""
+    blocking_app = FastAPI()
+    
+    @blocking_app.get("/jobs/{job_id}/status")
+    async def get_job_status(job_id: str):
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if not job:
+                raise HTTPException(status_code=404, detail="Job not found")
+            return {
+                "job_id": job.id,
+                "type": job.type.value,
+                "status": job.status.value,
+                "progress": job.progress,
+                "created_at": job.created_at.isoformat(),
+                "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+            }
+        finally:
+            db.close()
+    
+    return blocking_app
+
+def seed_jobs(count):
+    """Insert completed jobs and return their ids"""
+    job_ids = [str(uuid.uuid4()) for _ in range(count)]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Job), [
+            {"id": job_id, "type": JobType.TEST, "status": JobStatus.COMPLETED,
+             "progress": 100, "created_at": now, "completed_at": now}
+            for job_id in job_ids
+        ])
+    return job_ids
+
+def add_statement_latency(latency_ms):
+    """Delay every statement on both engines inside the executing thread"""
+    def delay(statement):
+        time.sleep(latency_ms / 1000)
+    
+    @event.listens_for(engine, "connect")
+    def on_sync_connect(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(delay)
+    
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_async_connect(dbapi_connection, connection_record):
+        # aiosqlite runs queries on its own thread, like a network driver
+        await_only(dbapi_connection.driver_connection.set_trace_callback(delay))
+
+def serve(path, port, latency_ms):
+    """Server process entry point so the load generator has its own GIL"""
+    if latency_ms > 0:
+        add_statement_latency(latency_ms)
+    asgi_app = app if path == "async" else build_blocking_app()
+    uvicorn.run(asgi_app, host="127.0.0.1", port=port, log_level="warning")
+
+def start_server(path, port, latency_ms) -> multiprocessing.Process:
+    """Start a server process and wait until it accepts requests"""
+    process = multiprocessing.Process(target=serve, args=(path, port, latency_ms), daemon=True)
+    process.start()
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+async def hammer(base_url, job_ids, requests, concurrency):
+    """Issue requests from concurrency workers; return latencies and wall time"""
+    latencies = []
+    remaining = iter(range(requests))
+    
+    async def worker(client):
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(f"/jobs/{random.choice(job_ids)}/status")
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+    
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+def report(name, latencies, elapsed):
+    ordered = sorted(latencies)
+    p99 = ordered[max(int(len(ordered) * 0.99) - 1, 0)]
+    print(f"{name:<10} {len(ordered) / elapsed:>10.1f} {statistics.median(ordered):>10.2f} {p99:>10.2f}")
+
+def run(rows, requests, concurrency, latency_ms):
+    job_ids = seed_jobs(rows)
+    # Server processes must open their own connections
+    engine.dispose()
+    print(f"{'path':<10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for port, path in ((8765, "blocking"), (8766, "async")):
+        process = start_server(path, port, latency_ms)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            # Warm up connections and caches before measuring
+            asyncio.run(hammer(base_url, job_ids, concurrency, concurrency))
+            report(path, *asyncio.run(hammer(base_url, job_ids, requests, concurrency)))
+        finally:
+            process.terminate()
+            process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    run(args.rows, args.requests, args.concurrency, args.db_latency_ms)
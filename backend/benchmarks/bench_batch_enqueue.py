@@ -0,0 +1,45 @@
+"""
+Benchmark for bulk job submission through /gather/jobs:batch
+Measures end-to-end enqueue throughput (validation, insert and dispatch)
+against a throwaway SQLite database and Celery's in-memory transport
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_batch_enqueue_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+
+from fastapi.testclient import TestClient
+
+from celery_app import celery_app
+from main import app
+
+def run(batch_size, rounds):
+    # Publish to an in-process broker so only the API side is measured
+    celery_app.conf.broker_url = "memory://"
+    celery_app.conf.result_backend = "cache+memory://"
+    
+    body = {"jobs": [{"type": "test", "payload": {"item": i}} for i in range(batch_size)]}
+    rates = []
+    with TestClient(app) as client:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            response = client.post("/gather/jobs:batch", json=body)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.text
+            assert response.json()["count"] == batch_size
+            rates.append(batch_size / elapsed)
+            print(f"batch of {batch_size}: {elapsed * 1000:.0f} ms ({batch_size / elapsed:,.0f} jobs/sec)")
+    print(f"median throughput: {statistics.median(rates):,.0f} jobs/sec")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.batch_size, args.rounds)
@@ -0,0 +1,87 @@
+"""
+Throughput benchmark for batch categorization, CPU only
+Classifies synthetic documents with increasing batch sizes to show what
+vectorizing across documents buys, then runs a whole CATEGORIZATION job
+against a throwaway SQLite database (reads and assignment writes included)
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_categorization_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+
+from sqlalchemy import insert
+
+from categorization import DEFAULT_CATEGORY_PROFILES, UNCATEGORIZED, categorize_documents, get_category_model
+from database import Base, SessionLocal, engine
+from models import SearchDocument
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 500, 2000]
+
+COMMON_WORDS = "the of and a to in is was that it he for with as his on be at by had".split()
+
+def make_corpus(count, words, seed=0):
+    """
+    Synthetic documents of about words words each with their true category
+    A sixth are uncategorized; the rest use 2% profile terms among common
+    and random filler words
+    """
+    rng = random.Random(seed)
+    filler = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(20_000)]
+    categories = list(DEFAULT_CATEGORY_PROFILES) + [None]
+    texts, labels = [], []
+    for i in range(count):
+        category = categories[i % len(categories)] if i % 6 else None
+        document = []
+        for _ in range(words):
+            roll = rng.random()
+            if category and roll < 0.02:
+                document.append(rng.choice(DEFAULT_CATEGORY_PROFILES[category]))
+            elif roll < 0.5:
+                document.append(rng.choice(COMMON_WORDS))
+            else:
+                document.append(rng.choice(filler))
+        texts.append(" ".join(document))
+        labels.append(category or UNCATEGORIZED)
+    return texts, labels
+
+def run(documents, words, batch_sizes):
+    texts, labels = make_corpus(documents, words)
+    model = get_category_model()
+    megabytes = sum(len(text) for text in texts) / 1024 / 1024
+    print(f"{documents} documents, {megabytes:.1f} MB")
+    print(f"{'batch':>8} {'docs/s':>10} {'MB/s':>8} {'accuracy':>9}")
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        predicted = []
+        for offset in range(0, len(texts), batch_size):
+            predicted.extend(category for category, _ in model.classify(texts[offset:offset + batch_size]))
+        elapsed = time.perf_counter() - started
+        accuracy = sum(p == label for p, label in zip(predicted, labels)) / len(labels)
+        print(f"{batch_size:>8} {documents / elapsed:>10.0f} {megabytes / elapsed:>8.1f} {accuracy:>9.3f}")
+    
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(SearchDocument), [
+            {"id": f"ocr:{i}", "source": "ocr", "source_id": str(i), "title": None, "body": text, "length": 0}
+            for i, text in enumerate(texts)
+        ])
+    db = SessionLocal()
+    try:
+        result = categorize_documents(db, model, scope="all")
+    finally:
+        db.close()
+    print(f"job (SQLite, batches of 500): {result['documents_per_second']:.0f} docs/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--words", type=int, default=1_000, help="Words per document")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    args = parser.parse_args()
+    run(args.documents, args.words, args.batch_sizes)
@@ -0,0 +1,87 @@
+"""
+Benchmark for the paginated /gather/jobs endpoint
+Seeds SQLite databases of increasing size and times first, filtered and deep pages
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_gather_jobs_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import main
+from main import app
+from benchmarks.common import seed_jobs
+from database import Base, get_async_db
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+def time_requests(client, params_list, repeat):
+    """Return per-request latencies in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        for params in params_list:
+            started = time.perf_counter()
+            response = client.get("/gather/jobs", params=params)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+    return samples
+
+def summarize(samples):
+    """Median and p95 of a list of latencies"""
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[int(len(ordered) * 0.95) - 1]
+
+def run(sizes, repeat):
+    print(f"{'rows':>10} {'scenario':<16} {'median ms':>10} {'p95 ms':>10}")
+    for size in sizes:
+        path = os.path.join(_workdir, f"jobs_{size}.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        seed_jobs(engine, size)
+        # NullPool because each TestClient request runs on its own event loop
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        Session = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+        
+        async def override_get_async_db():
+            async with Session() as db:
+                yield db
+        
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        main._job_count_cache.clear()
+        client = TestClient(app)
+        
+        # Walk a few pages deep to obtain a realistic cursor
+        cursor = None
+        for _ in range(20):
+            cursor = client.get("/gather/jobs", params={"cursor": cursor} if cursor else {}).json()["next_cursor"]
+        
+        scenarios = {
+            "first page": [{}],
+            "status filter": [{"status": "running"}],
+            "type filter": [{"type": "ocr_processing"}],
+            "deep cursor": [{"cursor": cursor}],
+        }
+        for name, params_list in scenarios.items():
+            median, p95 = summarize(time_requests(client, params_list, repeat))
+            print(f"{size:>10} {name:<16} {median:>10.2f} {p95:>10.2f}")
+        
+        engine.dispose()
+        os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(run(args.sizes, args.repeat))
@@ -0,0 +1,68 @@
+"""
+Benchmark for streamed video processing on a synthetic large file
+Measures segment throughput and peak resident memory, optionally
+interrupting the run halfway and resuming from the checkpoint
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from video import get_segment_processor, process_video
+
+class SimulatedCrash(Exception):
+    pass
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def make_source(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as handle:
+        for _ in range(size_mb):
+            handle.write(block)
+
+def run(size_mb, segment_mb, processor_name, crash_at):
+    workdir = tempfile.mkdtemp(prefix="bench_video_segments_")
+    try:
+        source = os.path.join(workdir, "film.bin")
+        output_dir = os.path.join(workdir, "out")
+        os.makedirs(output_dir)
+        make_source(source, size_mb)
+        baseline = peak_rss_mb()
+        
+        processor = get_segment_processor(processor_name)
+        segment_bytes = segment_mb * 1024 * 1024
+        started = time.perf_counter()
+        
+        if crash_at:
+            def crash(done, total):
+                if done >= total * crash_at:
+                    raise SimulatedCrash()
+            try:
+                process_video(source, output_dir, processor, segment_bytes=segment_bytes, on_segment=crash)
+            except SimulatedCrash:
+                print(f"interrupted after {time.perf_counter() - started:.2f} s")
+        
+        result = process_video(source, output_dir, processor, segment_bytes=segment_bytes)
+        elapsed = time.perf_counter() - started
+        
+        print(f"file: {size_mb} MB in {result['segments']} segments of {segment_mb} MB ({processor_name})")
+        print(f"resumed from segment: {result['resumed_from_segment']}")
+        print(f"time: {elapsed:.2f} s ({size_mb / elapsed:,.0f} MB/s)")
+        print(f"peak RSS: {peak_rss_mb():.0f} MB (baseline {baseline:.0f} MB)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--segment-mb", type=int, default=8)
+    parser.add_argument("--processor", default="copy")
+    parser.add_argument("--crash-at", type=float, default=0.0, help="Interrupt after this fraction of segments, then resume")
+    args = parser.parse_args()
+    run(args.size_mb, args.segment_mb, args.processor, args.crash_at)
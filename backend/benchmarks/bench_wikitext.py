@@ -0,0 +1,97 @@
+"""
+Benchmark for incremental wikitext rendering on multi-megabyte transcriptions
+Opens documents of increasing size through /transcribe/render, then times
+single-keystroke edits at random positions against re-rendering the whole text
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_wikitext_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+
+import httpx
+
+from main import app
+from benchmarks.common import percentiles
+
+DEFAULT_SIZES_MB = [1, 4, 16]
+
+PARAGRAPHS = [
+    "== Chapter {n} ==",
+    "It was the {n}th day of the voyage, and '''Captain Reyes''' wrote in the log that the "
+    "[[Atlantic Ocean|sea]] had been calm since dawn. ''Nothing of note'' was sighted.",
+    "* Provisions checked ({n} barrels)\n* Rigging repaired\n** Foremast\n** Mizzen",
+    "{{{{Page break|{n}}}}} <!-- scan {n}: faint ink on the left margin -->",
+    "{{|\n|-\n| Date || {n} June\n|-\n| Wind || North-west\n|}}",
+    "See the [https://example.org/letters/{n} transcribed letters] for context.",
+]
+
+def make_document(size_mb, seed=0):
+    """Synthetic transcription of about size_mb megabytes with distinct paragraphs"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    parts = []
+    length = 0
+    n = 0
+    while length < target:
+        n += 1
+        paragraph = rng.choice(PARAGRAPHS).format(n=n)
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+async def run(sizes_mb, edits):
+    # In-process ASGI transport, so latencies are the service's own
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600)
+    rng = random.Random(1)
+    print(f"{'size MB':>8} {'blocks':>8} {'open ms':>9} {'full ms':>9} {'edit p50':>9} {'edit p95':>9} {'edit p99':>9}")
+    for size_mb in sizes_mb:
+        text = make_document(size_mb)
+        
+        started = time.perf_counter()
+        response = await client.post("/transcribe/render", json={"text": text})
+        open_ms = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.text
+        document = response.json()
+        
+        # A full re-render of already-seen text (token cache warm), as a
+        # non-incremental client would request after every keystroke
+        started = time.perf_counter()
+        await client.post("/transcribe/render", json={"text": text, "document_id": "full-render"})
+        full_ms = (time.perf_counter() - started) * 1000
+        
+        samples = []
+        version = document["version"]
+        length = document["length"]
+        for _ in range(edits):
+            position = rng.randint(0, length)
+            started = time.perf_counter()
+            response = await client.post("/transcribe/render", json={
+                "document_id": document["document_id"],
+                "version": version,
+                "edits": [{"start": position, "end": position, "text": rng.choice("ab '[{")}]
+            })
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+            version = response.json()["version"]
+            length += 1
+        
+        summary = percentiles(samples)
+        print(
+            f"{size_mb:>8} {len(document['blocks']):>8} {open_ms:>9.0f} {full_ms:>9.0f} "
+            f"{summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}"
+        )
+    await client.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=DEFAULT_SIZES_MB)
+    parser.add_argument("--edits", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes_mb, args.edits))
@@ -0,0 +1,48 @@
+"""
+Helpers shared by the benchmark scripts
+Synthetic job seeding and latency summaries
+"""
+
+import statistics
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import Job, JobStatus, JobType
+
+INSERT_CHUNK = 20_000
+STATUSES = list(JobStatus)
+TYPES = list(JobType)
+
+def seed_jobs(engine, count):
+    """Bulk insert count synthetic jobs spread over the last year"""
+    start = datetime.utcnow() - timedelta(days=365)
+    step = timedelta(days=365) / max(count, 1)
+    with engine.begin() as conn:
+        for offset in range(0, count, INSERT_CHUNK):
+            rows = []
+            for i in range(offset, min(offset + INSERT_CHUNK, count)):
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "type": TYPES[i % len(TYPES)],
+                    "status": STATUSES[i % len(STATUSES)],
+                    "progress": 100,
+                    "created_at": start + step * i,
+                })
+            conn.execute(insert(Job), rows)
+
+def percentiles(samples):
+    """Mean and p50/p95/p99 of latencies in seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    
+    def at(quantile):
+        return round(ordered[min(int(quantile * len(ordered)), len(ordered) - 1)] * 1000, 3)
+    
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": at(0.5),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+    }
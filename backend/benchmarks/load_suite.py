@@ -0,0 +1,306 @@
+"""
+Load-test suite for the queue system
+Runs the API, an in-process Celery worker and a Redis stand-in in one process,
+measures enqueue throughput, read latency at growing table sizes, worker
+throughput and end-to-end job latency, and writes the results as JSON
+
+Usage:
+    python -m benchmarks.load_suite run --output results.json
+    python -m benchmarks.load_suite run --sizes 1000 10000 --redis local --worker-pool threads
+    python -m benchmarks.load_suite compare baseline.json results.json
+
+The suite seeds and never cleans up; with DATABASE_URL pointing at a local
+PostgreSQL instance, use a throwaway database. Without DATABASE_URL a
+temporary SQLite database is used
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Point the application at a throwaway database before it is imported
+_workdir = tempfile.mkdtemp(prefix="bench_load_suite_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'app.db')}")
+# Test jobs finish immediately unless a run asks for a duration
+os.environ.setdefault("TEST_JOB_DURATION_SECONDS", "0")
+
+from celery.contrib.testing.worker import start_worker
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+import redis_client
+from benchmarks.common import percentiles, seed_jobs
+from celery_app import celery_app
+from database import SessionLocal, engine
+from main import app
+from models import Job, JobStatus
+from routing import all_queues
+
+RESULTS_FORMAT_VERSION = 1
+
+# Status lookups are batched to stay under SQLite's bound parameter limit
+ID_CHUNK = 500
+
+# Prefetch multiplier of the in-process worker on the in-memory broker
+MEMORY_BROKER_PREFETCH = 256
+
+# Metrics where a larger value is better; every other metric is a latency
+HIGHER_IS_BETTER = ("per_second",)
+
+def use_redis_stand_in(mode):
+    """
+    Point the shared Redis clients at the chosen stand-in
+    "fake" uses fakeredis in memory, "local" the server at REDIS_URL
+    """
+    if mode == "local":
+        return
+    import fakeredis
+    server = fakeredis.FakeServer()
+    redis_client._redis = fakeredis.FakeRedis(server=server)
+    redis_client._async_redis = fakeredis.FakeAsyncRedis(server=server)
+
+def default_redis_mode():
+    """fakeredis when it is installed, otherwise a local Redis server"""
+    try:
+        import fakeredis  # noqa: F401
+    except ImportError:
+        return "local"
+    return "fake"
+
+def timed(call):
+    """Run one request and return its latency in seconds with the response"""
+    started = time.perf_counter()
+    response = call()
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.text
+    return elapsed, response
+
+def bench_enqueue(client, requests, batch_size, batches):
+    """Single submissions and batch submissions per second"""
+    single = [timed(lambda: client.post("/gather/queue-test-job"))[0] for _ in range(requests)]
+    
+    body = {"jobs": [{"type": "test", "payload": {"item": i}} for i in range(batch_size)]}
+    batch_rates = []
+    for _ in range(batches):
+        elapsed, response = timed(lambda: client.post("/gather/jobs:batch", json=body))
+        assert response.json()["count"] == batch_size
+        batch_rates.append(batch_size / elapsed)
+    
+    return {
+        "single": {"jobs_per_second": round(len(single) / sum(single), 1), **percentiles(single)},
+        "batch": {"batch_size": batch_size, "jobs_per_second": round(statistics.median(batch_rates), 1)},
+    }
+
+def bench_reads(client, sizes, requests):
+    """/gather/jobs and /jobs/{id}/status latency as the jobs table grows"""
+    results = []
+    for size in sizes:
+        with engine.connect() as conn:
+            existing = conn.execute(select(func.count(Job.id))).scalar()
+        if existing < size:
+            seed_jobs(engine, size - existing)
+        with engine.connect() as conn:
+            job_ids = conn.execute(select(Job.id).limit(requests * 10)).scalars().all()
+        
+        first_page = [timed(lambda: client.get("/gather/jobs"))[0] for _ in range(requests)]
+        filtered = [timed(lambda: client.get("/gather/jobs", params={"status": "completed"}))[0] for _ in range(requests)]
+        status = [timed(lambda: client.get(f"/jobs/{random.choice(job_ids)}/status"))[0] for _ in range(requests)]
+        results.append({
+            "table_size": max(size, existing),
+            "gather_jobs": percentiles(first_page),
+            "gather_jobs_filtered": percentiles(filtered),
+            "job_status": percentiles(status),
+        })
+        print(f"  {max(size, existing):>9,} rows: /gather/jobs p50 {results[-1]['gather_jobs']['p50_ms']} ms, "
+              f"status p50 {results[-1]['job_status']['p50_ms']} ms")
+    return results
+
+def wait_for_jobs(job_ids, timeout):
+    """Block until every job has finished; returns (created_at, completed_at) per job"""
+    finished_statuses = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+    deadline = time.monotonic() + timeout
+    pending = list(job_ids)
+    finished = []
+    while pending:
+        db = SessionLocal()
+        try:
+            rows = []
+            for offset in range(0, len(pending), ID_CHUNK):
+                rows.extend(db.execute(
+                    select(Job.id, Job.created_at, Job.completed_at)
+                    .where(Job.id.in_(pending[offset:offset + ID_CHUNK]), Job.status.in_(finished_statuses))
+                ).all())
+        finally:
+            db.close()
+        done = {row.id for row in rows}
+        finished.extend((row.created_at, row.completed_at) for row in rows)
+        pending = [job_id for job_id in pending if job_id not in done]
+        if pending:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(pending)} jobs still unfinished after {timeout} s")
+            time.sleep(0.05)
+    return finished
+
+def bench_worker_throughput(client, jobs, timeout):
+    """Jobs completed per second by the in-process worker, from one batch submission"""
+    body = {"jobs": [{"type": "test", "payload": {"item": i}} for i in range(jobs)]}
+    started = time.perf_counter()
+    response = client.post("/gather/jobs:batch", json=body)
+    assert response.status_code == 200, response.text
+    wait_for_jobs(response.json()["job_ids"], timeout)
+    elapsed = time.perf_counter() - started
+    return {"jobs": jobs, "seconds": round(elapsed, 3), "jobs_per_second": round(jobs / elapsed, 1)}
+
+def bench_end_to_end(client, jobs, interval, timeout):
+    """Time from job creation to completion for jobs submitted one at a time"""
+    job_ids = []
+    for _ in range(jobs):
+        job_ids.append(client.post("/gather/queue-test-job").json()["job_id"])
+        time.sleep(interval)
+    finished = wait_for_jobs(job_ids, timeout)
+    return percentiles([(completed - created).total_seconds() for created, completed in finished])
+
+def git_commit():
+    """Short hash of the checked-out commit, recorded with the results"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    use_redis_stand_in(args.redis)
+    
+    # Publish to an in-process broker unless a local Redis broker was asked for
+    if args.broker == "memory":
+        celery_app.conf.broker_url = "memory://"
+        celery_app.conf.result_backend = "cache+memory://"
+        # The in-memory transport polls its queues, and once the prefetch window is
+        # full the worker only polls again after a two second drain timeout; poll
+        # often and prefetch widely so neither shows up as queue latency
+        celery_app.conf.broker_transport_options = {"polling_interval": 0.001}
+        celery_app.conf.worker_prefetch_multiplier = MEMORY_BROKER_PREFETCH
+    
+    results = {}
+    with TestClient(app) as client:
+        print("enqueue throughput")
+        results["enqueue"] = bench_enqueue(client, args.requests, args.batch_size, args.batches)
+        print(f"  single {results['enqueue']['single']['jobs_per_second']:,} jobs/s, "
+              f"batch {results['enqueue']['batch']['jobs_per_second']:,} jobs/s")
+        # Nothing consumes those jobs; drop their messages before the worker starts
+        celery_app.control.purge()
+        
+        print("read latency")
+        results["read_latency"] = bench_reads(client, args.sizes, args.requests)
+        
+        with start_worker(
+            celery_app,
+            pool=args.worker_pool,
+            concurrency=args.concurrency,
+            perform_ping_check=False,
+            queues=all_queues(),
+            shutdown_timeout=60,
+        ):
+            print("worker throughput")
+            results["worker_throughput"] = bench_worker_throughput(client, args.worker_jobs, args.timeout)
+            print(f"  {results['worker_throughput']['jobs_per_second']:,} jobs/s")
+            
+            print("end-to-end latency")
+            results["end_to_end"] = bench_end_to_end(client, args.e2e_jobs, args.e2e_interval, args.timeout)
+            print(f"  p50 {results['end_to_end']['p50_ms']} ms, p95 {results['end_to_end']['p95_ms']} ms")
+    
+    report = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "started_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "redis": args.redis,
+            "broker": args.broker,
+            "worker_pool": args.worker_pool,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"results written to {args.output}")
+    return report
+
+def flatten(value, prefix=""):
+    """Numeric leaves of a results tree keyed by path; read latencies are keyed by table size"""
+    if isinstance(value, dict):
+        items = {}
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else key))
+        return items
+    if isinstance(value, list):
+        items = {}
+        for index, child in enumerate(value):
+            label = child.get("table_size", index) if isinstance(child, dict) else index
+            items.update(flatten(child, f"{prefix}[{label}]"))
+        return items
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+def compare(baseline_path, current_path, threshold):
+    """
+    Print the relative change of every shared metric
+    Returns 1 if any throughput fell or latency rose by more than threshold percent
+    """
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = flatten(json.load(handle)["results"])
+    with open(current_path, encoding="utf-8") as handle:
+        current = flatten(json.load(handle)["results"])
+    
+    regressions = 0
+    for path in sorted(set(baseline) & set(current)):
+        if path.endswith(("count", "table_size", "jobs", "batch_size")) or not baseline[path]:
+            continue
+        change = (current[path] - baseline[path]) / baseline[path] * 100
+        worse = -change if any(marker in path for marker in HIGHER_IS_BETTER) else change
+        flag = "REGRESSION" if worse > threshold else ""
+        regressions += bool(flag)
+        print(f"{path:<55} {baseline[path]:>12,.3f} {current[path]:>12,.3f} {change:>+8.1f}% {flag}")
+    print(f"{regressions} regressions above {threshold}%")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--output", help="Write results to this JSON file")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    run_parser.add_argument("--requests", type=int, default=200, help="Requests per latency measurement")
+    run_parser.add_argument("--batch-size", type=int, default=5_000)
+    run_parser.add_argument("--batches", type=int, default=3)
+    run_parser.add_argument("--worker-jobs", type=int, default=1_000)
+    run_parser.add_argument("--e2e-jobs", type=int, default=50)
+    run_parser.add_argument("--e2e-interval", type=float, default=0.05, help="Seconds between end-to-end submissions")
+    run_parser.add_argument("--worker-pool", choices=["threads", "solo"], default="threads")
+    run_parser.add_argument("--concurrency", type=int, default=4)
+    run_parser.add_argument("--redis", choices=["fake", "local"], default=default_redis_mode())
+    run_parser.add_argument("--broker", choices=["memory", "redis"], default="memory")
+    run_parser.add_argument("--timeout", type=float, default=600)
+    
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Percent change reported as a regression")
+    
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(compare(args.baseline, args.current, args.threshold))
+    run(args)
@@ -0,0 +1,43 @@
+"""
+Job cancellation flags
+The API raises a per-job flag in Redis; running tasks poll it between steps
+"""
+
+from typing import Iterable
+
+import redis
+
+from redis_client import get_async_redis, get_redis
+
+# Flags outlive any queued or running job they could apply to
+CANCEL_FLAG_TTL = 24 * 60 * 60
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled"""
+
+def cancel_key(job_id: str) -> str:
+    """Redis key flagging a job as cancelled"""
+    return f"job:cancel:{job_id}"
+
+async def request_cancellation_async(job_ids: Iterable[str]) -> bool:
+    """
+    Flag jobs as cancelled so running tasks stop at their next check
+    Returns False when Redis is unreachable; tasks then notice the
+    cancellation from the jobs table at their next progress flush
+    """
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.set(cancel_key(job_id), 1, ex=CANCEL_FLAG_TTL)
+        await pipe.execute()
+        return True
+    except redis.RedisError as e:
+        print(f"Failed to set cancellation flags: {str(e)}")
+        return False
+
+def is_cancellation_requested(job_id: str) -> bool:
+    """Cheap check used by tasks between units of work"""
+    try:
+        return bool(get_redis().exists(cancel_key(job_id)))
+    except redis.RedisError:
+        return False
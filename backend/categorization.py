@@ -0,0 +1,317 @@
+"""
+Batch categorization of indexed documents
+Documents are classified many at a time: a batch is split into words,
+hashed into a fixed feature space and scored against category profiles in
+NumPy passes over the whole batch, so there is no per-word Python work.
+Assignments are stored in category_assignments for /organize/categories
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from models import CategoryAssignment, SearchDocument
+from search import MAX_TERM_LENGTH
+
+# Hashed feature space; a power of two keeps collisions between profile
+# terms and other words rare
+CATEGORIZATION_FEATURES = int(os.getenv("CATEGORIZATION_FEATURES", str(2 ** 18)))
+
+# Documents classified and written per transaction
+CATEGORIZATION_BATCH_SIZE = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "500"))
+
+# Characters of each document read for classification; the start of a book
+# is enough to place it and bounds the cost of very long texts
+CATEGORIZATION_MAX_CHARS = int(os.getenv("CATEGORIZATION_MAX_CHARS", "200000"))
+
+# Documents scoring below this against every profile are uncategorized; the
+# score is roughly the share of a document's words that are profile terms
+CATEGORIZATION_MIN_SCORE = float(os.getenv("CATEGORIZATION_MIN_SCORE", "0.005"))
+
+# JSON file of {"category": ["term", ...]} replacing the built-in profiles
+CATEGORIZATION_PROFILES = os.getenv("CATEGORIZATION_PROFILES")
+
+UNCATEGORIZED = "uncategorized"
+
+# Which documents a job classifies when it does not list document_ids
+CATEGORIZATION_SCOPES = ("uncategorized", "all")
+
+DEFAULT_CATEGORY_PROFILES = {
+    "history": [
+        "history", "historical", "war", "battle", "king", "queen", "empire", "reign", "army",
+        "revolution", "century", "ancient", "treaty", "dynasty", "colonial", "siege", "kingdom",
+    ],
+    "literature": [
+        "poem", "poems", "poetry", "poet", "novel", "verse", "chapter", "story", "tale", "drama",
+        "sonnet", "stanza", "fiction", "author", "hero", "heroine", "romance",
+    ],
+    "religion": [
+        "church", "god", "prayer", "bishop", "saint", "gospel", "scripture", "sermon", "faith",
+        "holy", "parish", "monastery", "psalm", "clergy", "lord", "divine", "chapel",
+    ],
+    "law": [
+        "law", "laws", "court", "statute", "judge", "legal", "justice", "contract", "parliament",
+        "deed", "plaintiff", "defendant", "verdict", "constitution", "rights", "act", "magistrate",
+    ],
+    "science": [
+        "experiment", "theory", "chemistry", "physics", "species", "botany", "observation",
+        "specimen", "specimens", "astronomy", "mathematics", "laboratory", "anatomy", "geology",
+        "science", "scientific", "microscope",
+    ],
+    "geography": [
+        "river", "city", "mountain", "map", "island", "coast", "sea", "voyage", "travel", "valley",
+        "harbour", "harbor", "province", "lake", "desert", "latitude", "longitude",
+    ],
+    "correspondence": [
+        "letter", "letters", "dear", "sir", "madam", "yours", "sincerely", "wrote", "reply",
+        "received", "regards", "post", "envelope", "respectfully", "obedient", "servant",
+    ],
+}
+
+# Text scored per NumPy pass; bounds the memory of a batch of long texts
+SCORE_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Bytes that can be part of a word: ASCII letters, digits and underscore,
+# and every byte of a non-ASCII character (punctuation is masked separately)
+WORD_BYTES = np.zeros(256, dtype=bool)
+WORD_BYTES[list(b"abcdefghijklmnopqrstuvwxyz0123456789_")] = True
+WORD_BYTES[0x80:] = True
+
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME = np.uint64(1099511628211)
+
+def hash_words(texts: List[str], features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split lowercased texts into words and hash each into a feature bucket,
+    for all texts at once
+    Works on the UTF-8 bytes: word boundaries come from a byte lookup table
+    and every word is hashed with FNV-1a, one byte position per pass over
+    the words still that long. Words longer than MAX_TERM_LENGTH bytes are
+    dropped
+    
+    Returns:
+        tuple: Text index and bucket of every word, in no particular order,
+        and the number of words in each text
+    """
+    encoded = [text.lower().encode("utf-8") for text in texts]
+    data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+    offsets = np.cumsum([0] + [len(text) + 1 for text in encoded[:-1]])
+    if not len(data):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(len(texts), dtype=np.int64)
+    
+    word = WORD_BYTES[data]
+    # General Punctuation (U+2000-U+206F: dashes, curly quotes, spaces) and
+    # Latin-1 punctuation (U+00A0-U+00BF) separate words like ASCII does
+    leads = np.flatnonzero((data[:-2] == 0xE2) & ((data[1:-1] == 0x80) | (data[1:-1] == 0x81)))
+    for position in range(3):
+        word[leads + position] = False
+    leads = np.flatnonzero((data[:-1] == 0xC2) & (data[1:] >= 0xA0))
+    word[leads] = word[leads + 1] = False
+    
+    edges = np.diff(word.view(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    kept = lengths <= MAX_TERM_LENGTH
+    starts, lengths = starts[kept], lengths[kept].astype(np.int8)
+    counts = np.diff(np.searchsorted(starts, np.append(offsets, len(data))))
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), counts
+    
+    # Longest words first, so the words with a byte at a position are a prefix
+    order = np.argsort(-lengths, kind="stable")
+    starts, lengths = starts[order], lengths[order]
+    remaining = np.searchsorted(-lengths, -np.arange(int(lengths[0]), dtype=np.int8))
+    hashes = np.full(len(starts), FNV_OFFSET, dtype=np.uint64)
+    for position, words in enumerate(remaining.tolist()):
+        hashes[:words] ^= data[starts[:words] + position]
+        hashes[:words] *= FNV_PRIME
+    
+    documents = np.searchsorted(offsets, starts, side="right") - 1
+    return documents, (hashes % np.uint64(features)).astype(np.int64), counts
+
+class CategoryModel:
+    """
+    Keyword-profile classifier over hashed term features
+    A profile term is weighted by its IDF over the profiles, scaled so a
+    term in only one profile weighs 1, and terms shared by several
+    categories count for less. A document's score for a category is the
+    weighted share of its words that are terms of that profile
+    """
+    
+    def __init__(self, profiles: Dict[str, List[str]], features: int = CATEGORIZATION_FEATURES, min_score: float = CATEGORIZATION_MIN_SCORE):
+        if not profiles:
+            raise ValueError("Categorization needs at least one category profile")
+        self.categories = list(profiles)
+        self.features = features
+        self.min_score = min_score
+        
+        profile_buckets = [np.unique(hash_words([" ".join(terms)], features)[1]) for terms in profiles.values()]
+        document_frequency = np.zeros(features, dtype=np.float32)
+        for buckets in profile_buckets:
+            document_frequency[buckets] += 1
+        idf = np.log((1 + len(profiles)) / (1 + document_frequency)) + 1
+        idf /= np.log((1 + len(profiles)) / 2) + 1
+        
+        self.weights = np.zeros((features, len(profiles)), dtype=np.float32)
+        for column, buckets in enumerate(profile_buckets):
+            self.weights[buckets, column] = idf[buckets]
+        self.profile_terms = self.weights.any(axis=1)
+    
+    def scores(self, texts: List[str]) -> np.ndarray:
+        """Scores of each text against each category, shape (texts, categories)"""
+        scores = np.zeros((len(texts), len(self.categories)), dtype=np.float32)
+        chunk_start = chunk_bytes = 0
+        for index, text in enumerate(texts):
+            chunk_bytes += len(text)
+            if chunk_bytes >= SCORE_CHUNK_BYTES or index == len(texts) - 1:
+                scores[chunk_start:index + 1] = self._score_chunk(texts[chunk_start:index + 1])
+                chunk_start, chunk_bytes = index + 1, 0
+        return scores
+    
+    def _score_chunk(self, texts: List[str]) -> np.ndarray:
+        documents, buckets, counts = hash_words(texts, self.features)
+        # Only the few words that are profile terms are gathered
+        matched = self.profile_terms[buckets]
+        scores = np.zeros((len(texts), len(self.categories)), dtype=np.float32)
+        np.add.at(scores, documents[matched], self.weights[buckets[matched]])
+        return scores / np.maximum(counts, 1)[:, None]
+    
+    def classify(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Best category and its score per text; UNCATEGORIZED below min_score"""
+        scores = self.scores(texts)
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(texts)), best]
+        return [
+            (self.categories[column] if score >= self.min_score else UNCATEGORIZED, round(float(score), 6))
+            for column, score in zip(best.tolist(), best_scores.tolist())
+        ]
+
+@lru_cache(maxsize=None)
+def load_profiles(path: Optional[str] = CATEGORIZATION_PROFILES) -> Dict[str, List[str]]:
+    """Category profiles from a JSON file, or the built-in ones"""
+    if not path:
+        return DEFAULT_CATEGORY_PROFILES
+    with open(path, encoding="utf-8") as profiles:
+        return json.load(profiles)
+
+def category_names() -> List[str]:
+    """Categories a document can be assigned, without building the model"""
+    return list(load_profiles()) + [UNCATEGORIZED]
+
+_model = None
+
+def get_category_model() -> CategoryModel:
+    """The process-wide model, built on first use"""
+    global _model
+    if _model is None:
+        _model = CategoryModel(load_profiles())
+    return _model
+
+def _in_scope(query, scope: str, source: Optional[str]):
+    """
+    Narrow a query on search_documents to a source and, in "uncategorized"
+    scope, to documents without a current assignment (a document re-indexed
+    since it was categorized counts as uncategorized)
+    """
+    if source:
+        query = query.where(SearchDocument.source == source)
+    if scope == "uncategorized":
+        query = query.outerjoin(CategoryAssignment, CategoryAssignment.document_id == SearchDocument.id).where(or_(
+            CategoryAssignment.document_id.is_(None),
+            CategoryAssignment.assigned_at < SearchDocument.indexed_at
+        ))
+    return query
+
+def _document_batches(db: Session, document_ids: Optional[List[str]], scope: str, source: Optional[str], batch_size: int):
+    """
+    Batches of (id, text) rows to classify
+    Listed documents are read in chunks; otherwise the documents in scope
+    are walked in id order
+    """
+    text = func.substr(SearchDocument.body, 1, CATEGORIZATION_MAX_CHARS).label("text")
+    if document_ids:
+        for offset in range(0, len(document_ids), batch_size):
+            chunk = document_ids[offset:offset + batch_size]
+            yield db.execute(select(SearchDocument.id, text).where(SearchDocument.id.in_(chunk))).all()
+        return
+    
+    query = _in_scope(select(SearchDocument.id, text), scope, source)
+    last_id = None
+    while True:
+        page = query if last_id is None else query.where(SearchDocument.id > last_id)
+        rows = db.execute(page.order_by(SearchDocument.id).limit(batch_size)).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+def count_documents(db: Session, document_ids: Optional[List[str]], scope: str, source: Optional[str]) -> int:
+    """Number of documents a categorization run will classify, for progress"""
+    if document_ids:
+        return len(document_ids)
+    return db.scalar(_in_scope(select(func.count()).select_from(SearchDocument), scope, source))
+
+def categorize_documents(
+    db: Session,
+    model: CategoryModel,
+    document_ids: Optional[List[str]] = None,
+    scope: str = "uncategorized",
+    source: Optional[str] = None,
+    job_id: Optional[str] = None,
+    batch_size: int = CATEGORIZATION_BATCH_SIZE,
+    on_batch: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Classify indexed documents and store their assignments, batch by batch
+    
+    Args:
+        db (Session): Database session; committed after every batch
+        model (CategoryModel): Classifier
+        document_ids (list): Search document ids; all documents in scope if empty
+        scope (str): "uncategorized" or "all", when no document_ids are given
+        source (str): Only documents from this source, when no document_ids are given
+        job_id (str): CATEGORIZATION job recorded on the assignments
+        on_batch (callable): Called with (documents done, documents in total)
+    
+    Returns:
+        dict: Documents classified, counts per category and throughput
+    """
+    if scope not in CATEGORIZATION_SCOPES:
+        raise ValueError(f"Unknown categorization scope: {scope}")
+    total = count_documents(db, document_ids, scope, source)
+    started = time.perf_counter()
+    done = 0
+    counts = Counter()
+    assignments = CategoryAssignment.__table__
+    
+    for rows in _document_batches(db, document_ids, scope, source, batch_size):
+        labels = model.classify([row.text or "" for row in rows])
+        ids = [row.id for row in rows]
+        now = datetime.utcnow()
+        db.execute(delete(assignments).where(assignments.c.document_id.in_(ids)))
+        db.execute(insert(assignments), [
+            {"document_id": document_id, "category": category, "score": score, "job_id": job_id, "assigned_at": now}
+            for document_id, (category, score) in zip(ids, labels)
+        ])
+        db.commit()
+        
+        counts.update(category for category, _ in labels)
+        done += len(rows)
+        if on_batch is not None:
+            on_batch(done, max(total, done))
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": done,
+        "categories": dict(counts),
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(done / elapsed, 1) if elapsed > 0 else None
+    }
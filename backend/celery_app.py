@@ -3,19 +3,39 @@ Celery application configuration and task definitions
 Handles background job processing with Redis broker
 """
 
-from celery import Celery
+from celery import Celery, chord, group
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_shutdown
+import mimetypes
+import os
 import time
 from datetime import datetime
+import redis
 from sqlalchemy.orm import Session
 
-from database import SessionLocal
-from models import Job, JobStatus
+from database import DB_POOL_CAPACITY, SessionLocal, engine
+from models import Job, JobType
+from cancellation import JobCancelled
+from categorization import CATEGORIZATION_BATCH_SIZE, categorize_documents, get_category_model
+from job_stats import reconcile_finished_counts
+from media import TEXT_CONTENT_TYPE, register_artifact
+from metrics import instrument_engine, start_worker_exporter, task_finished, task_started, worker_process_exited
+from ocr import OCR_CHUNK_SIZE, assemble_document, chunk_pages, get_ocr_engine, list_pages, ocr_pages
+from progress import ProgressReporter
+from pipelines import release_ready_jobs
+from partitions import detach_old_job_partitions, ensure_job_partitions
+from retention import archive_old_jobs
+from redis_client import REDIS_URL, get_redis
+from result_cache import input_fingerprint, lookup_result, store_result
+from search import SEARCH_INDEX_BATCH_SIZE, document_key, flush_pending, index_documents, queue_for_indexing
+from storage import job_artifact_dir, link_into_job, resolve_input
+from video import VIDEO_SEGMENT_BYTES, get_segment_processor, process_video
+from routing import DISPATCH_QUEUE, MAINTENANCE_QUEUE, PRIORITY_STEPS, route_options
 
 # Create Celery application instance
 celery_app = Celery(
     "vintage_queue",
-    broker="redis://localhost:6379/0",  # Redis broker URL
-    backend="redis://localhost:6379/0",  # Redis result backend
+    broker=REDIS_URL,  # Redis broker URL
+    backend=REDIS_URL,  # Redis result backend
     include=["celery_app"]  # Include this module for task discovery
 )
 
@@ -28,7 +48,7 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     
-    # Worker settings
+    # Worker settings (dedicated pools override prefetch per job type, see worker_pools.py)
     worker_prefetch_multiplier=1,  # Process one task at a time
     task_acks_late=True,  # Acknowledge task after completion
     worker_disable_rate_limits=False,
@@ -36,12 +56,47 @@ celery_app.conf.update(
     # Result settings
     result_expires=3600,  # Results expire after 1 hour
     
-    # Task routing (for future expansion)
-    task_routes={
-        "celery_app.test_job_task": {"queue": "test_queue"},
-    }
+    # Task routing: job tasks go to their job type's queue (see route_task below)
+    task_default_queue=MAINTENANCE_QUEUE,
+    
+    # Per-message priorities, and a shared worker drains its queues in -Q order
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
 )
 
+# Periodic tasks, run by `celery -A celery_app beat`
+celery_app.conf.beat_schedule = {
+    "cleanup-old-jobs": {
+        "task": "celery_app.cleanup_old_jobs",
+        "schedule": float(os.getenv("JOB_RETENTION_INTERVAL", "3600")),
+    },
+    "maintain-job-partitions": {
+        "task": "celery_app.maintain_job_partitions",
+        "schedule": 24 * 60 * 60,
+    },
+    "release-pipeline-jobs": {
+        "task": "celery_app.release_pipeline_jobs",
+        "schedule": 60.0,
+    },
+    "reconcile-job-stats": {
+        "task": "celery_app.reconcile_job_stats",
+        "schedule": float(os.getenv("JOB_STATS_RECONCILE_INTERVAL", "3600")),
+    },
+    "flush-search-index": {
+        "task": "celery_app.flush_search_index",
+        "schedule": float(os.getenv("SEARCH_INDEX_INTERVAL", "10")),
+    },
+}
+
+# Jobs per fan-out message when dispatching a batch
+BATCH_DISPATCH_CHUNK = 500
+
+# Default run time of a test job; a job's payload may set "duration_seconds"
+TEST_JOB_DURATION_SECONDS = float(os.getenv("TEST_JOB_DURATION_SECONDS", "20"))
+
 def get_db_session():
     """Get database session for Celery tasks"""
     return SessionLocal()
@@ -50,7 +105,8 @@ def get_db_session():
 def test_job_task(self, job_id: str):
     """
     Test job task that runs for 20 seconds with progress updates
-    Demonstrates job lifecycle management and progress tracking
+    Demonstrates job lifecycle management and progress tracking; the run
+    time comes from payload["duration_seconds"] or TEST_JOB_DURATION_SECONDS
     
     Args:
         job_id (str): The ID of the job to process
@@ -59,6 +115,7 @@ def test_job_task(self, job_id: str):
         dict: Task completion status and timing information
     """
     db = get_db_session()
+    reporter = ProgressReporter(job_id, db, task=self)
     
     try:
         # Get job from database
@@ -67,62 +124,51 @@ def test_job_task(self, job_id: str):
             raise Exception(f"Job {job_id} not found")
         
         # Update job status to running
-        job.status = JobStatus.RUNNING
-        job.progress = 0
-        db.commit()
+        reporter.start()
         
         print(f"Starting test job {job_id}")
         
         # Simulate work with progress updates
-        total_duration = 20  # 20 seconds total
+        total_duration = float((job.payload or {}).get("duration_seconds", TEST_JOB_DURATION_SECONDS))
         progress_steps = [0, 25, 50, 75, 100]
         
         for i, progress in enumerate(progress_steps):
             if i > 0:  # Don't sleep before first update
                 time.sleep(total_duration / (len(progress_steps) - 1))
             
-            # Update progress in database
-            job.progress = progress
-            db.commit()
-            
-            # Update task state for Celery monitoring
-            self.update_state(
-                state="PROGRESS",
-                meta={
-                    "current": progress,
-                    "total": 100,
-                    "job_id": job_id,
-                    "message": f"Processing... {progress}% complete"
-                }
-            )
+            # Report progress; the database only sees coalesced flushes
+            reporter.update(progress)
             
             print(f"Job {job_id}: {progress}% complete")
         
         # Mark job as completed
-        job.status = JobStatus.COMPLETED
-        job.progress = 100
-        job.completed_at = datetime.utcnow()
-        db.commit()
+        completed_at = reporter.complete()["completed_at"]
         
         result = {
             "job_id": job_id,
             "status": "completed",
             "message": "Test job completed successfully",
             "duration_seconds": total_duration,
-            "completed_at": job.completed_at.isoformat()
+            "completed_at": completed_at.isoformat()
         }
         
         print(f"Completed test job {job_id}")
         return result
         
+    except JobCancelled:
+        # Job was cancelled; stop early and free the worker slot
+        db.rollback()
+        reporter.acknowledge_cancel()
+        print(f"Cancelled test job {job_id}")
+        return {"job_id": job_id, "status": "cancelled", "message": "Test job cancelled"}
+        
     except Exception as e:
         # Handle task failure
         print(f"Job {job_id} failed: {str(e)}")
         
-        if 'job' in locals():
-            job.status = JobStatus.FAILED
-            job.progress = 0
-            db.commit()
+        if 'job' in locals() and job is not None:
+            db.rollback()
+            reporter.fail()
         
         # Update task state to failed
         self.update_state(
@@ -139,17 +185,567 @@ def test_job_task(self, job_id: str):
     finally:
         db.close()
 
-# Additional task for future expansion
+def _serve_from_cache(db: Session, job: Job, reporter: ProgressReporter):
+    """
+    Look the job's input up in the result cache
+    Records the input fingerprint and the lookup outcome on the job; on a hit
+    the job completes straight away with the cached result, which is returned.
+    The cached output files are linked into the job's own artifact directory
+    and the result points at those links
+    """
+    fingerprint = input_fingerprint(job.type, job.payload)
+    if fingerprint is None:
+        return None
+    cached = lookup_result(fingerprint)
+    job.input_hash = fingerprint
+    job.cache_hit = cached is not None
+    db.commit()
+    if cached is not None:
+        cached = {
+            key: link_into_job(value, job.id) if key.endswith("_path") and value else value
+            for key, value in cached.items()
+        }
+        reporter.complete(result=cached)
+        print(f"Served job {job.id} from the result cache")
+    return cached
+
+def _record_finished_page(job_id: str, page_number: int, output_dir: str) -> int:
+    """
+    Record that a page of an OCR job is stored and return how many are done
+    A Redis set keeps the count idempotent across chunk retries; without
+    Redis the page files themselves are counted
+    """
+    key = f"job:ocr:{job_id}:pages"
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(key, page_number)
+        pipe.expire(key, 24 * 60 * 60)
+        pipe.scard(key)
+        return pipe.execute()[-1]
+    except redis.RedisError:
+        return sum(1 for name in os.listdir(output_dir) if name.startswith("page-"))
+
+def _index_for_search(db: Session, keys: list):
+    """
+    Queue finished output for the search index
+    A full batch waiting is flushed straight away, the rest on the beat
+    schedule; without Redis the documents are indexed here. Failures are
+    logged and never fail the job
+    """
+    try:
+        pending = queue_for_indexing(keys)
+        if pending is None:
+            index_documents(db, keys)
+        elif pending >= SEARCH_INDEX_BATCH_SIZE:
+            flush_search_index.delay()
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to index {', '.join(keys)} for search: {str(e)}")
+
+def _register_artifact(db: Session, job_id: str, job_type: JobType, path: str, **details):
+    """
+    List a job's output file in the Consume section
+    Failures are logged and never fail the job
+    """
+    try:
+        register_artifact(db, job_id, job_type, path, **details)
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to register artifact {path} of job {job_id}: {str(e)}")
+
+def _publish_ocr_output(db: Session, job_id: str, text_path: str, payload: dict):
+    """List a completed OCR job's document in the Consume section and queue it for search"""
+    _register_artifact(
+        db, job_id, JobType.OCR_PROCESSING, text_path,
+        content_type=TEXT_CONTENT_TYPE, title=payload.get("title")
+    )
+    _index_for_search(db, [document_key("ocr", job_id)])
+
+def _publish_video_output(db: Session, job_id: str, output_path: str, payload: dict, source_path: str, processor_name: str):
+    """List a completed video job's output in the Consume section"""
+    if processor_name == "digest":
+        content_type = TEXT_CONTENT_TYPE
+    else:
+        content_type = mimetypes.guess_type(source_path)[0]
+    _register_artifact(
+        db, job_id, JobType.VIDEO_PROCESSING, output_path,
+        content_type=content_type, title=payload.get("title") or os.path.basename(source_path)
+    )
+
+@celery_app.task(bind=True)
+def ocr_document_task(self, job_id: str):
+    """
+    OCR a scanned document by fanning its pages out to parallel chunk tasks
+    Splits the document into page chunks and starts a chord; each chunk
+    stores page text as it is recognised and ocr_finalize_task assembles
+    the document once every chunk is done
+    
+    Args:
+        job_id (str): The ID of the OCR_PROCESSING job
+        
+    Returns:
+        dict: Page and chunk counts of the started pipeline
+    """
+    db = get_db_session()
+    reporter = ProgressReporter(job_id, db, task=self)
+    
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception(f"Job {job_id} not found")
+        
+        payload = job.payload or {}
+        pages = list_pages(payload)
+        chunks = chunk_pages(pages, int(payload.get("chunk_size", OCR_CHUNK_SIZE)))
+        
+        cached = _serve_from_cache(db, job, reporter)
+        if cached is not None:
+            _publish_ocr_output(db, job_id, cached["text_path"], payload)
+            return {"job_id": job_id, "status": "completed", "cache_hit": True, **cached}
+        
+        reporter.start()
+        chord(
+            ocr_page_chunk_task.s(job_id, chunk, len(pages)) for chunk in chunks
+        )(ocr_finalize_task.s(job_id, len(pages)))
+        
+        print(f"Started OCR job {job_id}: {len(pages)} pages in {len(chunks)} chunks")
+        return {"job_id": job_id, "status": "running", "pages": len(pages), "chunks": len(chunks)}
+        
+    except JobCancelled:
+        db.rollback()
+        reporter.acknowledge_cancel()
+        return {"job_id": job_id, "status": "cancelled", "message": "OCR job cancelled"}
+        
+    except Exception as e:
+        print(f"OCR job {job_id} failed: {str(e)}")
+        db.rollback()
+        reporter.fail()
+        raise
+        
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def ocr_page_chunk_task(self, job_id: str, pages: list, page_total: int):
+    """
+    Recognise one chunk of pages of an OCR job
+    Page text is written to the job's artifact directory as each page
+    finishes, and the parent job's progress reflects pages done overall
+    
+    Args:
+        job_id (str): The ID of the parent OCR_PROCESSING job
+        pages (list): Page dicts of this chunk
+        page_total (int): Number of pages in the whole document
+        
+    Returns:
+        dict: Pages handled by this chunk
+    """
+    db = get_db_session()
+    reporter = ProgressReporter(job_id, db)
+    
+    try:
+        payload = db.query(Job.payload).filter(Job.id == job_id).scalar() or {}
+        engine = get_ocr_engine(payload.get("engine"), **payload.get("engine_options", {}))
+        output_dir = job_artifact_dir(job_id)
+        
+        def on_page(page):
+            reporter.check_cancelled()
+            done = _record_finished_page(job_id, page["number"], output_dir)
+            # Completion is reported by the finalize step, so stop short of 100
+            reporter.update(min(done * 100 // page_total, 99))
+        
+        recognised = ocr_pages(engine, pages, output_dir, on_page=on_page)
+        reporter.flush()
+        return {"pages": [page["number"] for page in pages], "recognised": recognised}
+        
+    except JobCancelled:
+        db.rollback()
+        return {"pages": [], "cancelled": True}
+        
+    except Exception as e:
+        print(f"OCR chunk of job {job_id} failed: {str(e)}")
+        db.rollback()
+        reporter.fail()
+        raise
+        
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def ocr_finalize_task(self, chunk_results: list, job_id: str, page_total: int):
+    """
+    Assemble the recognised pages of an OCR job and complete the job
+    Runs as the chord callback once every chunk has finished
+    
+    Args:
+        chunk_results (list): Return values of the chunk tasks
+        job_id (str): The ID of the OCR_PROCESSING job
+        page_total (int): Number of pages in the document
+        
+    Returns:
+        dict: The job result stored on the job
+    """
+    db = get_db_session()
+    reporter = ProgressReporter(job_id, db, task=self)
+    
+    try:
+        if any(chunk.get("cancelled") for chunk in chunk_results):
+            raise JobCancelled(job_id)
+        
+        result = assemble_document(job_artifact_dir(job_id), page_total)
+        reporter.complete(result=result)
+        
+        input_hash, payload = db.query(Job.input_hash, Job.payload).filter(Job.id == job_id).one()
+        if input_hash:
+            store_result(input_hash, dict(result, cached_from=job_id))
+        
+        try:
+            get_redis().delete(f"job:ocr:{job_id}:pages")
+        except redis.RedisError:
+            pass
+        
+        _publish_ocr_output(db, job_id, result["text_path"], payload or {})
+        
+        print(f"Completed OCR job {job_id}: {page_total} pages")
+        return {"job_id": job_id, "status": "completed", **result}
+        
+    except JobCancelled:
+        db.rollback()
+        reporter.acknowledge_cancel()
+        return {"job_id": job_id, "status": "cancelled", "message": "OCR job cancelled"}
+        
+    except Exception as e:
+        print(f"OCR job {job_id} failed while assembling: {str(e)}")
+        db.rollback()
+        reporter.fail()
+        raise
+        
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_video_task(self, job_id: str):
+    """
+    Process a large video file in streamed, checkpointed segments
+    The message is acknowledged only after the task finishes and is requeued
+    if the worker dies, and the redelivered task resumes from the last
+    finished segment recorded in the job's artifact directory
+    
+    Args:
+        job_id (str): The ID of the VIDEO_PROCESSING job
+        
+    Returns:
+        dict: Task result with output location and sizes
+    """
+    db = get_db_session()
+    reporter = ProgressReporter(job_id, db, task=self)
+    
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception(f"Job {job_id} not found")
+        
+        payload = job.payload or {}
+        if not payload.get("source_path"):
+            raise ValueError("Video payload needs source_path")
+        source_path = resolve_input(payload["source_path"])
+        processor = get_segment_processor(payload.get("processor"), **payload.get("processor_options", {}))
+        segment_bytes = int(payload.get("segment_bytes", VIDEO_SEGMENT_BYTES))
+        
+        cached = _serve_from_cache(db, job, reporter)
+        if cached is not None:
+            _publish_video_output(db, job_id, cached["output_path"], payload, source_path, processor.name)
+            return {"job_id": job_id, "status": "completed", "cache_hit": True, **cached}
+        
+        reporter.start()
+        result = process_video(
+            source_path,
+            job_artifact_dir(job_id),
+            processor,
+            segment_bytes=segment_bytes,
+            on_segment=lambda done, total: reporter.update(done * 100 // total),
+        )
+        reporter.complete(result=result)
+        if job.input_hash:
+            store_result(job.input_hash, dict(result, cached_from=job_id))
+        _publish_video_output(db, job_id, result["output_path"], payload, source_path, processor.name)
+        
+        print(f"Completed video job {job_id}: {result['segments']} segments, resumed from {result['resumed_from_segment']}")
+        return {"job_id": job_id, "status": "completed", **result}
+        
+    except JobCancelled:
+        db.rollback()
+        reporter.acknowledge_cancel()
+        return {"job_id": job_id, "status": "cancelled", "message": "Video job cancelled"}
+        
+    except Exception as e:
+        print(f"Video job {job_id} failed: {str(e)}")
+        db.rollback()
+        reporter.fail()
+        raise
+        
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def categorize_documents_task(self, job_id: str):
+    """
+    Categorize indexed documents, many per task
+    Classifies payload["document_ids"] (search document ids), or else every
+    indexed document in payload["scope"] ("uncategorized", the default, or
+    "all"), optionally only those from payload["source"]. Assignments are
+    committed batch by batch
+    
+    Args:
+        job_id (str): The ID of the CATEGORIZATION job
+        
+    Returns:
+        dict: Documents classified, counts per category and throughput
+    """
+    db = get_db_session()
+    reporter = ProgressReporter(job_id, db, task=self)
+    
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception(f"Job {job_id} not found")
+        
+        payload = job.payload or {}
+        model = get_category_model()
+        reporter.start()
+        result = categorize_documents(
+            db,
+            model,
+            document_ids=payload.get("document_ids"),
+            scope=payload.get("scope", "uncategorized"),
+            source=payload.get("source"),
+            job_id=job_id,
+            batch_size=int(payload.get("batch_size", CATEGORIZATION_BATCH_SIZE)),
+            # Completion is reported below, so stop short of 100
+            on_batch=lambda done, total: reporter.update(min(done * 100 // total, 99)),
+        )
+        reporter.complete(result=result)
+        
+        print(f"Completed categorization job {job_id}: {result['documents']} documents ({result['documents_per_second']}/s)")
+        return {"job_id": job_id, "status": "completed", **result}
+        
+    except JobCancelled:
+        db.rollback()
+        reporter.acknowledge_cancel()
+        return {"job_id": job_id, "status": "cancelled", "message": "Categorization job cancelled"}
+        
+    except Exception as e:
+        print(f"Categorization job {job_id} failed: {str(e)}")
+        db.rollback()
+        reporter.fail()
+        raise
+        
+    finally:
+        db.close()
+
+# Task that processes each job type; types without an entry cannot be queued yet
+TASKS_BY_TYPE = {
+    JobType.TEST: test_job_task,
+    JobType.OCR_PROCESSING: ocr_document_task,
+    JobType.VIDEO_PROCESSING: process_video_task,
+    JobType.CATEGORIZATION: categorize_documents_task,
+}
+
+# Helper tasks that run on their parent job type's queue
+SUBTASK_JOB_TYPES = {
+    ocr_page_chunk_task.name: JobType.OCR_PROCESSING,
+    ocr_finalize_task.name: JobType.OCR_PROCESSING,
+}
+
+# Reverse lookup used by the router
+JOB_TYPES_BY_TASK = {task.name: job_type for job_type, task in TASKS_BY_TYPE.items()}
+JOB_TYPES_BY_TASK.update(SUBTASK_JOB_TYPES)
+
+# Queues for tasks that are not tied to a job type
+SYSTEM_TASK_QUEUES = {
+    "celery_app.dispatch_job_batch": DISPATCH_QUEUE,
+    "celery_app.cleanup_old_jobs": MAINTENANCE_QUEUE,
+    "celery_app.maintain_job_partitions": MAINTENANCE_QUEUE,
+    "celery_app.release_pipeline_jobs": MAINTENANCE_QUEUE,
+    "celery_app.reconcile_job_stats": MAINTENANCE_QUEUE,
+    "celery_app.flush_search_index": MAINTENANCE_QUEUE,
+}
+
+def route_task(name, args=None, kwargs=None, options=None, task=None, **kw):
+    """
+    Celery router: job tasks go to their job type's queue and priority,
+    system tasks to the dispatch or maintenance queue
+    """
+    job_type = JOB_TYPES_BY_TASK.get(name)
+    if job_type is not None:
+        return route_options(job_type)
+    if name in SYSTEM_TASK_QUEUES:
+        return {"queue": SYSTEM_TASK_QUEUES[name]}
+    return None
+
+celery_app.conf.task_routes = (route_task,)
+
+# Worker metrics: task runtimes per job type, database pool usage, and an
+# HTTP exporter on WORKER_METRICS_PORT
+instrument_engine(engine, "sync", DB_POOL_CAPACITY)
+
+@task_prerun.connect
+def _time_task_start(task_id=None, **kwargs):
+    task_started(task_id)
+
+@task_postrun.connect
+def _time_task_end(task_id=None, task=None, state=None, **kwargs):
+    job_type = JOB_TYPES_BY_TASK.get(task.name)
+    task_finished(task_id, task.name, job_type.value if job_type else None, state)
+
+@worker_init.connect
+def _start_metrics_exporter(**kwargs):
+    start_worker_exporter()
+
+@worker_process_shutdown.connect
+def _forget_worker_process(pid=None, **kwargs):
+    worker_process_exited(pid or os.getpid())
+
+def dispatch_job(job_id: str, job_type: JobType):
+    """
+    Queue the task for a job on its job type's queue
+    The Celery task id is the job id, so the job can be looked up or revoked later
+    """
+    return TASKS_BY_TYPE[job_type].apply_async(args=[job_id], task_id=job_id, **route_options(job_type))
+
+def revoke_jobs(job_ids: list):
+    """
+    Revoke the Celery tasks of cancelled jobs so queued messages are discarded
+    Best effort: running tasks stop through their cancellation flag instead
+    """
+    try:
+        celery_app.control.revoke(list(job_ids))
+    except Exception as e:
+        print(f"Failed to revoke {len(job_ids)} tasks: {str(e)}")
+
+@celery_app.task
+def dispatch_job_batch(jobs: list):
+    """
+    Fan out one chunk of a batch submission to the per-type tasks
+    
+    Args:
+        jobs (list): [job_id, job_type value] pairs
+        
+    Returns:
+        dict: Number of jobs dispatched
+    """
+    with celery_app.producer_or_acquire() as producer:
+        for job_id, job_type in jobs:
+            job_type = JobType(job_type)
+            TASKS_BY_TYPE[job_type].apply_async(
+                args=[job_id], task_id=job_id, producer=producer, **route_options(job_type)
+            )
+    return {"dispatched": len(jobs)}
+
+def dispatch_jobs(jobs: list):
+    """
+    Queue many jobs with a handful of broker messages
+    The batch is split into chunks that workers expand into per-job tasks,
+    so the API publishes len(jobs) / BATCH_DISPATCH_CHUNK messages
+    
+    Args:
+        jobs (list): [job_id, job_type value] pairs
+    """
+    chunks = [jobs[i:i + BATCH_DISPATCH_CHUNK] for i in range(0, len(jobs), BATCH_DISPATCH_CHUNK)]
+    return group(dispatch_job_batch.s(chunk) for chunk in chunks).apply_async()
+
+# Scheduled maintenance tasks
 @celery_app.task
 def cleanup_old_jobs():
     """
-    Cleanup task to remove old completed jobs
-    Can be scheduled to run periodically
+    Archive finished jobs older than the retention period
+    Runs on the beat schedule; rows are moved in small batches so the jobs
+    table is never locked for long
+    
+    Returns:
+        dict: Rows archived, batches and time taken
     """
     db = get_db_session()
     try:
-        # This would contain logic to clean up old jobs
-        # For now, just return a status message
-        return {"message": "Job cleanup completed", "timestamp": datetime.utcnow().isoformat()}
+        metrics = archive_old_jobs(db)
+        print(
+            f"Archived {metrics['rows_archived']} jobs in {metrics['batches']} batches "
+            f"({metrics['elapsed_seconds']}s)"
+        )
+        return {"message": "Job cleanup completed", "timestamp": datetime.utcnow().isoformat(), **metrics}
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery_app.task
+def maintain_job_partitions():
+    """
+    Create upcoming monthly partitions of the jobs table and detach expired ones
+    A no-op unless the jobs table is partitioned (PostgreSQL); each partition
+    is created in its own transaction
+    
+    Returns:
+        dict: Partitions ensured and detached
+    """
+    with engine.connect() as connection:
+        ensured = ensure_job_partitions(connection)
+        with connection.begin():
+            detached = detach_old_job_partitions(connection)
+    
+    if detached:
+        print(f"Detached job partitions: {', '.join(detached)}")
+    return {"ensured": ensured, "detached": detached, "timestamp": datetime.utcnow().isoformat()}
+
+@celery_app.task
+def release_pipeline_jobs():
+    """
+    Queue waiting pipeline jobs whose parent jobs have all completed
+    Jobs are normally released as soon as their last parent finishes; this
+    sweep catches up after a worker died in between
+    
+    Returns:
+        dict: Jobs released
+    """
+    db = get_db_session()
+    try:
+        released = release_ready_jobs(db)
+    finally:
+        db.close()
+    
+    if released:
+        print(f"Released {len(released)} waiting pipeline jobs")
+    return {"released": [job_id for job_id, _ in released], "timestamp": datetime.utcnow().isoformat()}
+
+@celery_app.task
+def reconcile_job_stats():
+    """
+    Recount finished jobs into the Redis statistics counters
+    Seeds the counters behind /jobs/stats and corrects any drift
+    
+    Returns:
+        dict: Finished-job counts by status and type
+    """
+    db = get_db_session()
+    try:
+        counts = reconcile_finished_counts(db)
+    finally:
+        db.close()
+    return {"counts": counts, "timestamp": datetime.utcnow().isoformat()}
+
+@celery_app.task
+def flush_search_index():
+    """
+    Index the documents waiting in the search queue, in batches
+    Runs on the beat schedule and whenever a full batch is waiting
+    
+    Returns:
+        dict: Documents indexed and removed, and batches written
+    """
+    db = get_db_session()
+    try:
+        counts = flush_pending(db)
+    finally:
+        db.close()
+    
+    if counts["batches"]:
+        print(f"Indexed {counts['indexed']} documents for search in {counts['batches']} batches")
+    return {**counts, "timestamp": datetime.utcnow().isoformat()}
\ No newline at end of file
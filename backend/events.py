@@ -0,0 +1,147 @@
+"""
+Job event publishing and fan-out over Redis pub/sub
+Workers publish job state deltas; each API process holds a single
+subscription and relays events to every connected dashboard viewer
+"""
+
+import asyncio
+import json
+from typing import Optional, Set
+
+import redis
+
+from redis_client import get_async_redis, get_redis
+
+# Redis pub/sub channel carrying job state deltas
+JOB_EVENTS_CHANNEL = "jobs:events"
+
+# Channel telling viewers to reload the listing, e.g. after a bulk change
+JOB_RESYNC_CHANNEL = "jobs:resync"
+
+# Events buffered per viewer before the viewer is told to resynchronise
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_SECONDS = 15
+
+# Delay before re-subscribing after the Redis connection drops
+RECONNECT_DELAY_SECONDS = 2
+
+def publish_job_event(job_id: str, **fields):
+    """
+    Publish a job state delta to all listening API processes
+    Only the changed fields need to be supplied; publishing is best effort
+    and never fails the caller
+    
+    Args:
+        job_id (str): The ID of the job that changed
+        **fields: Changed job fields, e.g. status="running", progress=25
+    """
+    event = {"job_id": job_id, **fields}
+    try:
+        get_redis().publish(JOB_EVENTS_CHANNEL, json.dumps(event, default=str))
+    except redis.RedisError as e:
+        print(f"Failed to publish event for job {job_id}: {str(e)}")
+
+async def publish_job_event_async(job_id: str, **fields):
+    """
+    Publish a job state delta from async code without blocking the event loop
+    Same semantics as publish_job_event
+    """
+    event = {"job_id": job_id, **fields}
+    try:
+        await get_async_redis().publish(JOB_EVENTS_CHANNEL, json.dumps(event, default=str))
+    except redis.RedisError as e:
+        print(f"Failed to publish event for job {job_id}: {str(e)}")
+
+async def publish_jobs_resync_async():
+    """
+    Ask every viewer to reload the job listing
+    Used for bulk changes where one event per job would flood the stream
+    """
+    try:
+        await get_async_redis().publish(JOB_RESYNC_CHANNEL, "{}")
+    except redis.RedisError as e:
+        print(f"Failed to publish job resync: {str(e)}")
+
+def format_sse(data: str, event: Optional[str] = None) -> str:
+    """Format a payload as a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {data}\n\n"
+
+class JobEventBroadcaster:
+    """
+    Relays job events from one Redis subscription to many in-process viewers
+    Keeps Redis and database load independent of the number of open dashboards
+    """
+    
+    def __init__(self, channel: str = JOB_EVENTS_CHANNEL):
+        self.channel = channel
+        self.subscribers: Set[asyncio.Queue] = set()
+        self._listener: Optional[asyncio.Task] = None
+    
+    def subscribe(self) -> asyncio.Queue:
+        """Register a viewer and start listening to Redis if not already"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a viewer; the Redis subscription stops with the last one"""
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+    
+    def dispatch(self, data: str):
+        """
+        Deliver a raw event payload to every viewer
+        A viewer that has fallen too far behind is flushed and sent a
+        resync event so it reloads the job list instead of blocking others
+        """
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(("job", data))
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", "{}"))
+    
+    async def _listen(self):
+        """Forward messages from the Redis channels until cancelled"""
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel, JOB_RESYNC_CHANNEL)
+                # The connection may have dropped events; have viewers reload
+                self._broadcast_resync()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    if message["channel"] in (JOB_RESYNC_CHANNEL, JOB_RESYNC_CHANNEL.encode("utf-8")):
+                        self._broadcast_resync()
+                    else:
+                        data = message["data"]
+                        self.dispatch(data.decode("utf-8") if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                print(f"Job event subscription lost: {str(e)}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                try:
+                    await pubsub.close()
+                except redis.RedisError:
+                    pass
+    
+    def _broadcast_resync(self):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(("resync", "{}"))
+            except asyncio.QueueFull:
+                pass
+
+# Process-wide broadcaster used by the streaming endpoint
+job_event_broadcaster = JobEventBroadcaster()
@@ -0,0 +1,293 @@
+"""
+Incrementally maintained job statistics
+Finished-job counts, per-minute throughput and duration histograms are
+kept in Redis as jobs change state, so reading them does not scan history
+"""
+
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import anyio
+import redis
+from celery import current_app
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Job, JobStatus, JobType
+from redis_client import get_async_redis, get_redis
+
+# Minutes of throughput history returned by /jobs/stats
+JOB_STATS_WINDOW_MINUTES = int(os.getenv("JOB_STATS_WINDOW_MINUTES", "60"))
+
+# Hours of completed-job durations behind the percentiles
+JOB_STATS_DURATION_HOURS = int(os.getenv("JOB_STATS_DURATION_HOURS", "24"))
+
+# How long a computed stats response is reused
+JOB_STATS_CACHE_SECONDS = float(os.getenv("JOB_STATS_CACHE_SECONDS", "2"))
+
+# How long finished-job counts counted from the table are reused when Redis is down
+JOB_STATS_FALLBACK_SECONDS = float(os.getenv("JOB_STATS_FALLBACK_SECONDS", "60"))
+
+# How long a reconcile requested by /jobs/stats may take before another is requested
+JOB_STATS_RECONCILE_LOCK_SECONDS = int(os.getenv("JOB_STATS_RECONCILE_LOCK_SECONDS", "600"))
+
+ACTIVE_STATUSES = (JobStatus.WAITING, JobStatus.QUEUED, JobStatus.RUNNING)
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# Redis hash of finished-job counts, fields "<status>:<type>"
+FINISHED_COUNTS_KEY = "jobs:stats:finished"
+# Field marking counts that were seeded from the table by reconcile_finished_counts
+RECONCILED_FIELD = "_reconciled_at"
+# Set while a reconcile requested by a reader is pending, so only one is sent
+RECONCILE_LOCK_KEY = "jobs:stats:reconcile_requested"
+THROUGHPUT_KEY_PREFIX = "jobs:stats:throughput:"
+DURATIONS_KEY_PREFIX = "jobs:stats:durations:"
+
+# Duration histogram: bucket i holds durations up to DURATION_BASE * DURATION_RATIO ** i,
+# so percentiles are reported to within 15%
+DURATION_BASE_SECONDS = 0.1
+DURATION_RATIO = 1.15
+
+_stats_cache = {}
+
+def duration_bucket(seconds: float) -> int:
+    """Histogram bucket of a job duration"""
+    if seconds <= DURATION_BASE_SECONDS:
+        return 0
+    return math.ceil(math.log(seconds / DURATION_BASE_SECONDS, DURATION_RATIO))
+
+def bucket_upper_bound(bucket: int) -> float:
+    """Largest duration counted in a histogram bucket"""
+    return round(DURATION_BASE_SECONDS * DURATION_RATIO ** bucket, 3)
+
+def histogram_percentile(histogram: Dict[int, int], quantile: float) -> Optional[float]:
+    """Approximate percentile of a bucketed histogram, or None when it is empty"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= quantile * total:
+            return bucket_upper_bound(bucket)
+    return bucket_upper_bound(max(histogram))
+
+def record_job_finished(job_type: JobType, status: JobStatus, created_at: datetime, completed_at: datetime):
+    """
+    Count a job reaching a final status
+    Completed jobs also add their duration to the current hour's histogram;
+    best effort, statistics never fail the caller
+    """
+    now = time.time()
+    minute_key = THROUGHPUT_KEY_PREFIX + str(int(now // 60))
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(FINISHED_COUNTS_KEY, f"{status.value}:{job_type.value}", 1)
+        pipe.hincrby(minute_key, status.value, 1)
+        pipe.expire(minute_key, (JOB_STATS_WINDOW_MINUTES + 5) * 60)
+        if status == JobStatus.COMPLETED:
+            hour_key = DURATIONS_KEY_PREFIX + str(int(now // 3600))
+            bucket = duration_bucket((completed_at - created_at).total_seconds())
+            pipe.hincrby(hour_key, f"{job_type.value}:{bucket}", 1)
+            pipe.expire(hour_key, (JOB_STATS_DURATION_HOURS + 1) * 3600)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record job statistics: {str(e)}")
+
+def record_jobs_finished(job_types: Iterable[JobType], status: JobStatus):
+    """
+    Count jobs that reached a final status in bulk without running
+    (cancelled, or failed because they could not be queued); like
+    record_job_finished, but without durations
+    """
+    counts = Counter(job_types)
+    if not counts:
+        return
+    minute_key = THROUGHPUT_KEY_PREFIX + str(int(time.time() // 60))
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for job_type, count in counts.items():
+            pipe.hincrby(FINISHED_COUNTS_KEY, f"{status.value}:{job_type.value}", count)
+        pipe.hincrby(minute_key, status.value, sum(counts.values()))
+        pipe.expire(minute_key, (JOB_STATS_WINDOW_MINUTES + 5) * 60)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record job statistics: {str(e)}")
+
+def record_jobs_cancelled(job_types: Iterable[JobType]):
+    """Count jobs cancelled in bulk"""
+    record_jobs_finished(job_types, JobStatus.CANCELLED)
+
+def record_jobs_archived(rows: Iterable[Tuple[JobStatus, JobType]]):
+    """Remove archived jobs from the finished-job counts"""
+    counts = Counter(rows)
+    if not counts:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for (status, job_type), count in counts.items():
+            pipe.hincrby(FINISHED_COUNTS_KEY, f"{status.value}:{job_type.value}", -count)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record job statistics: {str(e)}")
+
+def count_finished_jobs(db: Session) -> Dict[str, int]:
+    """Finished-job counts by "<status>:<type>", counted from the jobs table"""
+    rows = db.execute(
+        select(Job.status, Job.type, func.count(Job.id))
+        .where(Job.status.in_(FINISHED_STATUSES))
+        .group_by(Job.status, Job.type)
+    ).all()
+    return {f"{status.value}:{job_type.value}": count for status, job_type, count in rows}
+
+def reconcile_finished_counts(db: Session) -> Dict[str, int]:
+    """
+    Replace the Redis finished-job counts with a count of the jobs table
+    Seeds the counters and corrects drift (e.g. after Redis lost its data);
+    increments that land while the table is being counted may be lost until
+    the next run
+    """
+    counts = count_finished_jobs(db)
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.delete(FINISHED_COUNTS_KEY)
+    pipe.hset(FINISHED_COUNTS_KEY, mapping={**counts, RECONCILED_FIELD: datetime.utcnow().isoformat()})
+    pipe.delete(RECONCILE_LOCK_KEY)
+    pipe.execute()
+    return counts
+
+def _send_reconcile():
+    current_app.send_task("celery_app.reconcile_job_stats")
+
+async def request_reconcile():
+    """
+    Have a worker seed the finished-job counters, once
+    The first reader to find them unseeded (new deployment, Redis flushed)
+    takes the lock and sends the reconcile_job_stats task; the lock is
+    released by the reconcile, or expires if the task is lost
+    """
+    client = get_async_redis()
+    try:
+        if not await client.set(RECONCILE_LOCK_KEY, 1, nx=True, ex=JOB_STATS_RECONCILE_LOCK_SECONDS):
+            return
+        try:
+            await anyio.to_thread.run_sync(_send_reconcile)
+        except Exception:
+            await client.delete(RECONCILE_LOCK_KEY)
+            raise
+    except Exception as e:
+        print(f"Failed to request a job statistics reconcile: {str(e)}")
+
+async def _read_redis_stats(minute: int, hour: int):
+    """Finished counts, throughput buckets and duration histograms in one round trip"""
+    pipe = get_async_redis().pipeline(transaction=False)
+    pipe.hgetall(FINISHED_COUNTS_KEY)
+    for offset in range(JOB_STATS_WINDOW_MINUTES):
+        pipe.hgetall(THROUGHPUT_KEY_PREFIX + str(minute - offset))
+    for offset in range(JOB_STATS_DURATION_HOURS):
+        pipe.hgetall(DURATIONS_KEY_PREFIX + str(hour - offset))
+    replies = await pipe.execute()
+    
+    finished = {key.decode("utf-8"): value.decode("utf-8") for key, value in replies[0].items()}
+    minutes = replies[1:1 + JOB_STATS_WINDOW_MINUTES]
+    hours = replies[1 + JOB_STATS_WINDOW_MINUTES:]
+    return finished, minutes, hours
+
+async def read_job_stats(db: AsyncSession) -> dict:
+    """
+    Job counts per status and type, per-minute throughput and duration percentiles
+    Active jobs are counted through the status index (their number does not
+    grow with history); finished jobs, throughput and durations come from
+    the Redis counters
+    """
+    cached = _stats_cache.get("stats")
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    now = time.time()
+    minute = int(now // 60)
+    hour = int(now // 3600)
+    
+    rows = (await db.execute(
+        select(Job.status, Job.type, func.count(Job.id))
+        .where(Job.status.in_(ACTIVE_STATUSES))
+        .group_by(Job.status, Job.type)
+    )).all()
+    counts = Counter({(status.value, job_type.value): count for status, job_type, count in rows})
+    
+    finished = None
+    minutes = hours = []
+    try:
+        finished, minutes, hours = await _read_redis_stats(minute, hour)
+    except redis.RedisError as e:
+        print(f"Failed to read job statistics from Redis: {str(e)}")
+    
+    if finished is None:
+        # Redis is down: count the table, but rarely
+        fallback = _stats_cache.get("finished")
+        if not fallback or fallback[0] <= time.monotonic():
+            fallback = (time.monotonic() + JOB_STATS_FALLBACK_SECONDS, await db.run_sync(count_finished_jobs))
+            _stats_cache["finished"] = fallback
+        finished = fallback[1]
+    elif RECONCILED_FIELD not in finished:
+        # Counters not seeded yet: serve them as they stand until a worker
+        # has counted the table once
+        await request_reconcile()
+    for field, value in finished.items():
+        if field != RECONCILED_FIELD:
+            status, job_type = field.split(":", 1)
+            counts[(status, job_type)] += max(int(value), 0)
+    
+    by_status = {status.value: 0 for status in JobStatus}
+    by_type = {job_type.value: 0 for job_type in JobType}
+    for (status, job_type), count in counts.items():
+        by_status[status] = by_status.get(status, 0) + count
+        by_type[job_type] = by_type.get(job_type, 0) + count
+    
+    per_minute = []
+    for offset, bucket in enumerate(minutes):
+        entry = {"minute": datetime.utcfromtimestamp((minute - offset) * 60).isoformat()}
+        for status in FINISHED_STATUSES:
+            entry[status.value] = int(bucket.get(status.value.encode("utf-8"), 0))
+        per_minute.append(entry)
+    # The current minute is still filling up, so average over the complete ones
+    complete_minutes = per_minute[1:]
+    
+    overall = Counter()
+    by_type_histograms: Dict[str, Counter] = {}
+    for bucket in hours:
+        for field, value in bucket.items():
+            job_type, index = field.decode("utf-8").rsplit(":", 1)
+            overall[int(index)] += int(value)
+            by_type_histograms.setdefault(job_type, Counter())[int(index)] += int(value)
+    
+    def summarise(histogram):
+        return {
+            "samples": sum(histogram.values()),
+            "p50_seconds": histogram_percentile(histogram, 0.5),
+            "p95_seconds": histogram_percentile(histogram, 0.95)
+        }
+    
+    stats = {
+        "counts": {"total": sum(by_status.values()), "by_status": by_status, "by_type": by_type},
+        "throughput": {
+            "window_minutes": JOB_STATS_WINDOW_MINUTES,
+            "completed_per_minute": (
+                round(sum(entry["completed"] for entry in complete_minutes) / len(complete_minutes), 2)
+                if complete_minutes else None
+            ),
+            "per_minute": per_minute
+        },
+        "durations": {
+            "window_hours": JOB_STATS_DURATION_HOURS,
+            **summarise(overall),
+            "by_type": {job_type: summarise(histogram) for job_type, histogram in by_type_histograms.items()}
+        },
+        "as_of": datetime.utcnow().isoformat()
+    }
+    _stats_cache["stats"] = (time.monotonic() + JOB_STATS_CACHE_SECONDS, stats)
+    return stats
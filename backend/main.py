@@ -2,16 +2,73 @@
 FastAPI application with PostgreSQL, Redis, and Celery integration
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import delete, func, insert, select, text, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import os
+import time
 import uuid
 
-from database import get_db, engine
-from models import Job, JobStatus, JobType
-from celery_app import test_job_task
+from database import DB_POOL_CAPACITY, async_engine, get_async_db, engine
+from models import Artifact, CategoryAssignment, Job, JobDedupKey, JobDependency, JobStatus, JobType, SearchDocument, Transcription
+from cancellation import request_cancellation_async
+from categorization import category_names
+from celery_app import TASKS_BY_TYPE, dispatch_job, dispatch_jobs, revoke_jobs
+from events import (
+    HEARTBEAT_SECONDS,
+    format_sse,
+    job_event_broadcaster,
+    publish_job_event_async,
+    publish_jobs_resync_async,
+)
+from pipelines import PIPELINE_MAX_STAGES, PipelineError, cancel_dependents, create_pipeline
+from progress import read_live_progress, read_live_progress_many
+import partitions  # registers creation of jobs partitions alongside the table
+from job_stats import read_job_stats, record_jobs_cancelled, record_jobs_finished
+from media import ArtifactNotFound, serve_artifact
+from metrics import RequestMetricsMiddleware, instrument_engine, render_metrics
+from result_cache import read_cache_stats
+from serialization import (
+    BATCH_STATUS_FIELDS,
+    COMPUTED_STATUS_FIELDS,
+    LISTING_FIELDS,
+    STATUS_FIELDS,
+    job_columns,
+    etag_response,
+    job_status_query,
+    json_response,
+    parse_fields,
+    rows_to_dicts,
+)
+from retention import read_retention_metrics
+from search import SEARCH_SOURCES, document_key, index_now, queue_for_indexing_async, search_documents
+from status_cache import CACHED_STATUS_FIELDS, invalidate_job_status_async, read_job_status
+from transcriptions import (
+    RevisionConflict,
+    TranscriptionError,
+    TranscriptionNotFound,
+    create_transcription,
+    read_revisions,
+    read_transcription_text,
+    save_revision,
+)
+from wikitext import (
+    DocumentNotFound,
+    VersionConflict,
+    WikitextError,
+    edit_document,
+    open_document,
+    read_wikitext_stats,
+)
 import models
 
 # Create database tables
@@ -20,7 +77,9 @@ models.Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="Vintage Queue API",
     description="A 1920s Art Deco styled job queue management system",
-    version="0.1.0"
+    version="0.1.0",
+    # orjson encodes enums and datetimes natively and much faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for React frontend
@@ -32,6 +91,253 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route, exposed with the rest of the metrics on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+instrument_engine(async_engine, "async", DB_POOL_CAPACITY)
+
+# Job listing pagination settings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# How long a computed total_count may be reused before recounting
+JOB_COUNT_CACHE_SECONDS = float(os.getenv("JOB_COUNT_CACHE_SECONDS", "5"))
+
+# Above this many rows an unfiltered Postgres count uses the planner estimate
+JOB_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Largest number of jobs accepted by one batch submission
+MAX_BATCH_SIZE = 50_000
+
+# Planner row estimate for jobs, summed over partitions when partitioned
+JOB_ROW_ESTIMATE_SQL = """
+SELECT GREATEST(
+    (SELECT reltuples FROM pg_class WHERE oid = 'jobs'::regclass),
+    (SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+     FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+     WHERE i.inhparent = 'jobs'::regclass)
+)::bigint
+"""
+
+# Statuses a job can be cancelled from
+CANCELLABLE_STATUSES = (JobStatus.WAITING, JobStatus.QUEUED, JobStatus.RUNNING)
+
+# Jobs cancelled per transaction by a bulk cancel
+CANCEL_CHUNK_SIZE = 1000
+
+# Longest accepted Idempotency-Key header or dedup_key
+MAX_DEDUP_KEY_LENGTH = 255
+
+# Largest number of job ids accepted by one batch status lookup
+MAX_STATUS_BATCH_SIZE = 5_000
+
+# Largest number of edits accepted by one wikitext render request
+MAX_WIKITEXT_EDITS = 1_000
+
+# Search result pagination; deep offsets are refused because every page
+# ranks all matches before it
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 10_000
+
+# Keys looked up per query, and retries of a batch that races another with the same keys
+DEDUP_LOOKUP_CHUNK = 1000
+DEDUP_INSERT_ATTEMPTS = 3
+
+_job_count_cache = {}
+
+class JobSpec(BaseModel):
+    """A single job in a batch submission; jobs with a dedup_key are created at most once"""
+    type: JobType
+    payload: Optional[Dict[str, Any]] = None
+    dedup_key: Optional[str] = Field(None, min_length=1, max_length=MAX_DEDUP_KEY_LENGTH)
+
+class JobBatchRequest(BaseModel):
+    """Request body for submitting many jobs at once"""
+    jobs: List[JobSpec] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class JobStatusBatchRequest(BaseModel):
+    """Request body for looking up many jobs at once; fields is a comma-separated projection"""
+    job_ids: List[str] = Field(..., min_length=1, max_length=MAX_STATUS_BATCH_SIZE)
+    fields: Optional[str] = None
+
+class PipelineStage(BaseModel):
+    """One job of a pipeline; depends_on names the keys of its parent stages"""
+    key: str = Field(..., min_length=1, max_length=100)
+    type: JobType
+    payload: Optional[Dict[str, Any]] = None
+    depends_on: List[str] = []
+
+class PipelineRequest(BaseModel):
+    """Request body for submitting a job pipeline"""
+    stages: List[PipelineStage] = Field(..., min_length=1, max_length=PIPELINE_MAX_STAGES)
+
+class WikitextEdit(BaseModel):
+    """Replacement of the range [start, end) of a document, in UTF-16 code units"""
+    start: int = Field(..., ge=0)
+    end: int = Field(..., ge=0)
+    text: str = ""
+
+class WikitextRenderRequest(BaseModel):
+    """
+    Request body for rendering wikitext: either the full text of a document,
+    or edits against a version of an open one
+    """
+    document_id: Optional[str] = Field(None, max_length=100)
+    text: Optional[str] = None
+    version: Optional[int] = None
+    edits: List[WikitextEdit] = Field([], max_length=MAX_WIKITEXT_EDITS)
+    html: bool = False
+
+class TranscriptionCreate(BaseModel):
+    """Request body for creating a transcription from its full text"""
+    title: Optional[str] = Field(None, max_length=500)
+    text: str = ""
+
+class TranscriptionPatch(BaseModel):
+    """Edits against base_revision of a transcription, in UTF-16 code units"""
+    base_revision: int = Field(..., ge=1)
+    edits: List[WikitextEdit] = Field(..., min_length=1, max_length=MAX_WIKITEXT_EDITS)
+
+class JobCancelFilter(BaseModel):
+    """Selects waiting, queued or running jobs to cancel in bulk; at least one criterion is required"""
+    job_ids: Optional[List[str]] = Field(None, max_length=MAX_BATCH_SIZE)
+    type: Optional[JobType] = None
+    status: Optional[JobStatus] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+def encode_job_cursor(created_at: datetime, job_id: str) -> str:
+    """
+    Encode the (created_at, id) keyset position of a job as an opaque cursor
+    """
+    raw = f"{created_at.isoformat()}|{job_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_job_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_job_cursor
+    Raises ValueError when the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, job_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+async def count_jobs(db: AsyncSession, status: Optional[JobStatus] = None, job_type: Optional[JobType] = None) -> int:
+    """
+    Count jobs matching the given filters
+    Counts are cached briefly per filter, and large unfiltered Postgres
+    tables are answered from the planner's row estimate instead of a scan
+    """
+    key = (status, job_type)
+    cached = _job_count_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    total = None
+    if status is None and job_type is None and db.bind.dialect.name == "postgresql":
+        estimate = (await db.execute(text(JOB_ROW_ESTIMATE_SQL))).scalar()
+        if estimate is not None and estimate >= JOB_COUNT_ESTIMATE_THRESHOLD:
+            total = int(estimate)
+    
+    if total is None:
+        query = select(func.count(Job.id))
+        if status is not None:
+            query = query.where(Job.status == status)
+        if job_type is not None:
+            query = query.where(Job.type == job_type)
+        total = (await db.execute(query)).scalar()
+    
+    _job_count_cache[key] = (now + JOB_COUNT_CACHE_SECONDS, total)
+    return total
+
+async def cancel_job_ids(db: AsyncSession, job_ids: List[str]) -> List[str]:
+    """
+    Cancel the given jobs that are still waiting, queued or running
+    Marks them cancelled in one statement, cancels their pipeline dependents
+    and raises the Redis cancellation flags; returns the ids that were
+    actually cancelled, dependents included
+    """
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status.in_(CANCELLABLE_STATUSES))
+        .values(status=JobStatus.CANCELLED, completed_at=datetime.utcnow())
+        .returning(Job.id, Job.type)
+    )
+    rows = result.all()
+    await db.commit()
+    cancelled = [job_id for job_id, _ in rows]
+    if cancelled:
+        rows += await db.run_sync(
+            lambda session: cancel_dependents(session, cancelled, "Upstream job cancelled")
+        )
+        cancelled = [job_id for job_id, _ in rows]
+        await run_in_threadpool(record_jobs_cancelled, [job_type for _, job_type in rows])
+        await request_cancellation_async(cancelled)
+        await invalidate_job_status_async(cancelled)
+    return cancelled
+
+async def find_jobs_by_dedup_key(db: AsyncSession, keys: List[str]) -> Dict[str, str]:
+    """Map the given idempotency keys that are already taken to their job ids"""
+    found = {}
+    for i in range(0, len(keys), DEDUP_LOOKUP_CHUNK):
+        result = await db.execute(
+            select(JobDedupKey.dedup_key, JobDedupKey.job_id)
+            .where(JobDedupKey.dedup_key.in_(keys[i:i + DEDUP_LOOKUP_CHUNK]))
+        )
+        found.update(result.all())
+    return found
+
+async def replay_submission(db: AsyncSession, dedup_key: str, response: Response) -> Optional[dict]:
+    """
+    Response for a repeated submission: the job created by the first request
+    with this idempotency key, or None if the key is new
+    """
+    job_id = (await find_jobs_by_dedup_key(db, [dedup_key])).get(dedup_key)
+    if job_id is None:
+        return None
+    status = (await db.execute(select(Job.status).where(Job.id == job_id))).scalar()
+    response.headers["Idempotent-Replayed"] = "true"
+    return {
+        "job_id": job_id,
+        "message": "Job already submitted",
+        "status": status.value if status else None,
+        "duplicate": True
+    }
+
+async def fail_undispatched_jobs(db: AsyncSession, job_ids: List[str]):
+    """
+    Fail jobs whose broker publish raised and release their idempotency keys
+    Left queued, no worker would ever run them and a retry with the same
+    key would only replay them; with the keys released the retry creates
+    fresh jobs. Pipeline jobs waiting on a failed job are cancelled
+    """
+    await db.rollback()
+    failed = []
+    for i in range(0, len(job_ids), DEDUP_LOOKUP_CHUNK):
+        chunk = job_ids[i:i + DEDUP_LOOKUP_CHUNK]
+        result = await db.execute(
+            update(Job)
+            .where(Job.id.in_(chunk), Job.status == JobStatus.QUEUED)
+            .values(status=JobStatus.FAILED, completed_at=datetime.utcnow())
+            .returning(Job.id, Job.type)
+        )
+        failed += result.all()
+        await db.execute(delete(JobDedupKey).where(JobDedupKey.job_id.in_(chunk)))
+    await db.commit()
+    dependents = []
+    if failed:
+        await run_in_threadpool(record_jobs_finished, [job_type for _, job_type in failed], JobStatus.FAILED)
+        dependents = await db.run_sync(
+            lambda session: cancel_dependents(session, [job_id for job_id, _ in failed], "Upstream job could not be queued")
+        )
+        await run_in_threadpool(record_jobs_cancelled, [job_type for _, job_type in dependents])
+    await invalidate_job_status_async(job_ids + [job_id for job_id, _ in dependents])
+    await publish_jobs_resync_async()
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -40,12 +346,22 @@ async def root():
 
 # GATHER ENDPOINTS
 @app.post("/gather/queue-test-job")
-async def queue_test_job(db: Session = Depends(get_db)):
+async def queue_test_job(
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=MAX_DEDUP_KEY_LENGTH),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Create a test job that runs for 20 seconds
-    Demonstrates the job queuing and progress tracking system
+    Demonstrates the job queuing and progress tracking system; repeating a
+    request with the same Idempotency-Key header returns the original job
     """
     try:
+        if idempotency_key:
+            replay = await replay_submission(db, idempotency_key, response)
+            if replay is not None:
+                return replay
+        
         # Create job record in database
         job = Job(
             id=str(uuid.uuid4()),
@@ -56,11 +372,33 @@ async def queue_test_job(db: Session = Depends(get_db)):
         )
         
         db.add(job)
-        db.commit()
-        db.refresh(job)
+        if idempotency_key:
+            db.add(JobDedupKey(dedup_key=idempotency_key, job_id=job.id))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request with the same key committed first; its job stands
+            await db.rollback()
+            replay = await replay_submission(db, idempotency_key, response)
+            if replay is None:
+                raise
+            return replay
         
-        # Queue the Celery task
-        test_job_task.delay(job.id)
+        await publish_job_event_async(
+            job.id,
+            type=job.type.value,
+            status=job.status.value,
+            progress=job.progress,
+            created_at=job.created_at.isoformat(),
+            completed_at=None
+        )
+        
+        # Queue the Celery task (publishing to the broker blocks, so keep it off the loop)
+        try:
+            await run_in_threadpool(dispatch_job, job.id, job.type)
+        except Exception:
+            await fail_undispatched_jobs(db, [job.id])
+            raise
         
         return {
             "job_id": job.id,
@@ -69,84 +407,747 @@ async def queue_test_job(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to queue job: {str(e)}")
 
-@app.get("/gather/jobs")
-async def get_all_jobs(db: Session = Depends(get_db)):
+@app.post("/gather/jobs:batch")
+async def queue_job_batch(batch: JobBatchRequest, db: AsyncSession = Depends(get_async_db)):
     """
-    Retrieve all jobs for the Gather section display
-    Returns job list with status and timing information
+    Create and queue many jobs in one request
+    Rows are written with batched multi-row INSERTs in a single transaction
+    and dispatched to Celery in chunks rather than one message per job.
+    Jobs whose dedup_key was submitted before are not created again; their
+    existing ids are returned in place
     """
+    unsupported = sorted({spec.type.value for spec in batch.jobs if spec.type not in TASKS_BY_TYPE})
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported job types: {', '.join(unsupported)}")
+    
     try:
-        jobs = db.query(Job).order_by(Job.created_at.desc()).all()
+        dedup_keys = list({spec.dedup_key for spec in batch.jobs if spec.dedup_key})
+        for attempt in range(DEDUP_INSERT_ATTEMPTS):
+            job_ids_by_key = await find_jobs_by_dedup_key(db, dedup_keys) if dedup_keys else {}
+            created_at = datetime.utcnow()
+            rows = []
+            key_rows = []
+            job_ids = []
+            for spec in batch.jobs:
+                if spec.dedup_key and spec.dedup_key in job_ids_by_key:
+                    job_ids.append(job_ids_by_key[spec.dedup_key])
+                    continue
+                row = {
+                    "id": str(uuid.uuid4()),
+                    "type": spec.type,
+                    "status": JobStatus.QUEUED,
+                    "progress": 0,
+                    "payload": spec.payload,
+                    "created_at": created_at
+                }
+                rows.append(row)
+                job_ids.append(row["id"])
+                if spec.dedup_key:
+                    job_ids_by_key[spec.dedup_key] = row["id"]
+                    key_rows.append({"dedup_key": spec.dedup_key, "job_id": row["id"], "created_at": created_at})
+            
+            try:
+                if rows:
+                    await db.execute(insert(Job), rows)
+                if key_rows:
+                    await db.execute(insert(JobDedupKey), key_rows)
+                await db.commit()
+                break
+            except IntegrityError:
+                # A concurrent submission took some of the keys; look them up again
+                await db.rollback()
+        else:
+            raise HTTPException(status_code=409, detail="Conflicting concurrent submission; retry the request")
+        
+        if rows:
+            try:
+                await run_in_threadpool(dispatch_jobs, [[row["id"], row["type"].value] for row in rows])
+            except Exception:
+                await fail_undispatched_jobs(db, [row["id"] for row in rows])
+                raise
+            await publish_jobs_resync_async()
         
         return {
-            "jobs": [
-                {
-                    "job_id": job.id,
-                    "type": job.type.value,
-                    "status": job.status.value,
-                    "progress": job.progress,
-                    "created_at": job.created_at.isoformat(),
-                    "completed_at": job.completed_at.isoformat() if job.completed_at else None
-                }
-                for job in jobs
-            ],
-            "total_count": len(jobs)
+            "job_ids": job_ids,
+            "count": len(rows),
+            "duplicates": len(job_ids) - len(rows),
+            "message": f"{len(rows)} jobs queued successfully",
+            "status": JobStatus.QUEUED.value
         }
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to queue jobs: {str(e)}")
+
+@app.get("/gather/jobs")
+async def get_all_jobs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    job_type: Optional[JobType] = Query(None, alias="type"),
+    fields: Optional[str] = Query(None, description="Comma-separated job fields to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Retrieve a page of jobs for the Gather section display
+    Jobs are ordered newest first and paginated by a (created_at, id) cursor;
+    pass the returned next_cursor back to fetch the following page. fields
+    narrows each job to the named fields
+    """
+    try:
+        try:
+            selected = parse_fields(fields, LISTING_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Column-only query; id and created_at are appended for the cursor
+        query = select(*job_columns(selected), Job.id, Job.created_at)
+        if status is not None:
+            query = query.where(Job.status == status)
+        if job_type is not None:
+            query = query.where(Job.type == job_type)
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_job_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(tuple_(Job.created_at, Job.id) < (cursor_created_at, cursor_id))
+        
+        # Fetch one extra row to learn whether another page exists
+        query = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return json_response({
+            "jobs": rows_to_dicts(rows, selected),
+            "total_count": await count_jobs(db, status, job_type),
+            "next_cursor": encode_job_cursor(rows[-1][-1], rows[-1][-2]) if has_more else None
+        })
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve jobs: {str(e)}")
 
+@app.get("/gather/jobs/stream")
+async def stream_job_events(request: Request):
+    """
+    Stream job state deltas to the Gather section as Server-Sent Events
+    Each "job" event carries the job_id plus the fields that changed; a
+    "resync" event asks the client to reload the listing from /gather/jobs
+    """
+    async def event_stream():
+        queue = job_event_broadcaster.subscribe()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(data, event=event)
+        finally:
+            job_event_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs/cancel")
+async def cancel_jobs(criteria: JobCancelFilter, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel every queued or running job matching a filter
+    Jobs are cancelled in chunks; their queued Celery tasks are revoked
+    and running tasks stop at their next cancellation check
+    """
+    if not any(value is not None for value in criteria.model_dump().values()):
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+    if criteria.status is not None and criteria.status not in CANCELLABLE_STATUSES:
+        raise HTTPException(status_code=400, detail="Only waiting, queued or running jobs can be cancelled")
+    
+    try:
+        query = select(Job.id).where(Job.status.in_(CANCELLABLE_STATUSES))
+        if criteria.job_ids is not None:
+            query = query.where(Job.id.in_(criteria.job_ids))
+        if criteria.type is not None:
+            query = query.where(Job.type == criteria.type)
+        if criteria.status is not None:
+            query = query.where(Job.status == criteria.status)
+        if criteria.created_after is not None:
+            query = query.where(Job.created_at >= criteria.created_after)
+        if criteria.created_before is not None:
+            query = query.where(Job.created_at < criteria.created_before)
+        
+        cancelled_count = 0
+        while True:
+            # Cancelled jobs drop out of the filter, so each pass sees the next chunk
+            job_ids = (await db.execute(query.limit(CANCEL_CHUNK_SIZE))).scalars().all()
+            if not job_ids:
+                break
+            cancelled = await cancel_job_ids(db, job_ids)
+            cancelled_count += len(cancelled)
+            if cancelled:
+                background_tasks.add_task(revoke_jobs, cancelled)
+        
+        if cancelled_count:
+            await publish_jobs_resync_async()
+        
+        return {
+            "cancelled_count": cancelled_count,
+            "message": f"{cancelled_count} jobs cancelled"
+        }
+        
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to cancel jobs: {str(e)}")
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel a single queued or running job
+    A queued job never starts; a running job stops at its next progress check
+    """
+    try:
+        cancelled = await cancel_job_ids(db, [job_id])
+        if not cancelled:
+            status = (await db.execute(select(Job.status).where(Job.id == job_id))).scalar()
+            if status is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            raise HTTPException(status_code=409, detail=f"Job already {status.value}")
+        
+        background_tasks.add_task(revoke_jobs, cancelled)
+        await publish_job_event_async(job_id, status=JobStatus.CANCELLED.value)
+        
+        return {
+            "job_id": job_id,
+            "message": "Job cancelled",
+            "status": JobStatus.CANCELLED.value
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to cancel job: {str(e)}")
+
+@app.get("/jobs/retention")
+async def get_retention_metrics():
+    """
+    Report what the scheduled retention task last archived and how long it took
+    """
+    metrics = await run_in_threadpool(read_retention_metrics)
+    if metrics is None:
+        return {"last_run": None, "totals": {"rows_archived": 0, "runs": 0}}
+    return metrics
+
+@app.get("/jobs/stats")
+async def get_job_stats(db: AsyncSession = Depends(get_async_db)):
+    """
+    Job counts per status and type, throughput per minute and p50/p95 durations
+    Served from counters maintained as jobs change state, so the cost does
+    not grow with the number of finished jobs
+    """
+    try:
+        return await read_job_stats(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job statistics: {str(e)}")
+
+@app.get("/jobs/cache")
+async def get_result_cache_stats():
+    """
+    Report result cache hits, misses, hit rate and current size
+    """
+    return await run_in_threadpool(read_cache_stats)
+
 @app.get("/jobs/{job_id}/status")
-async def get_job_status(job_id: str, db: Session = Depends(get_db)):
+async def get_job_status(
+    job_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated job fields to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get detailed status information for a specific job
-    Used for real-time status updates in the frontend
+    Used for real-time status updates in the frontend; fields narrows the
+    response to the named fields
+    """
+    try:
+        try:
+            selected = parse_fields(fields, STATUS_FIELDS, COMPUTED_STATUS_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stored = tuple(name for name in selected if name not in COMPUTED_STATUS_FIELDS)
+        
+        if set(stored) <= set(CACHED_STATUS_FIELDS):
+            job = await read_job_status(db, job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            status, created_at, completed_at = job["status"], job["created_at"], job["completed_at"]
+        else:
+            # payload and result are not cached
+            row = (await db.execute(job_status_query(stored), {"job_id": job_id})).first()
+            if not row:
+                raise HTTPException(status_code=404, detail="Job not found")
+            status, created_at, completed_at = row[:3]
+            job = dict(zip(stored, row[3:]))
+        
+        # Running jobs flush progress lazily; prefer the live value from Redis
+        if "progress" in job and status == JobStatus.RUNNING:
+            live_progress = await read_live_progress(job_id)
+            if live_progress is not None:
+                job["progress"] = live_progress
+        
+        if "duration_seconds" in selected:
+            job["duration_seconds"] = ((completed_at or datetime.utcnow()) - created_at).total_seconds()
+        
+        return json_response({name: job[name] for name in selected})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job status: {str(e)}")
+
+@app.post("/jobs/status:batch")
+async def get_job_statuses(
+    batch: JobStatusBatchRequest,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the status of many jobs with a single query
+    Running jobs carry their live progress from Redis. Jobs come back in
+    request order, unknown ids under "missing"; the response has an ETag,
+    and sending it back in If-None-Match returns 304 while nothing changed
+    """
+    try:
+        try:
+            selected = parse_fields(batch.fields, BATCH_STATUS_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        job_ids = list(dict.fromkeys(batch.job_ids))
+        
+        rows = (await db.execute(
+            select(Job.id, Job.status, *job_columns(selected)).where(Job.id.in_(job_ids))
+        )).all()
+        jobs = {row[0]: dict(zip(selected, row[2:])) for row in rows}
+        
+        if "progress" in selected:
+            running = [row[0] for row in rows if row[1] == JobStatus.RUNNING]
+            for job_id, progress in (await read_live_progress_many(running)).items():
+                jobs[job_id]["progress"] = progress
+        
+        return etag_response({
+            "jobs": [jobs[job_id] for job_id in job_ids if job_id in jobs],
+            "missing": [job_id for job_id in job_ids if job_id not in jobs]
+        }, if_none_match)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job statuses: {str(e)}")
+
+# PIPELINE ENDPOINTS
+@app.post("/pipelines")
+async def create_job_pipeline(pipeline: PipelineRequest, db: AsyncSession = Depends(get_async_db)):
     """
+    Create a graph of dependent jobs, e.g. gather -> OCR -> categorize -> publish
+    Stages without dependencies are queued at once; every other stage waits
+    and is queued as soon as all of its parent stages have completed, so
+    independent branches run in parallel
+    """
+    unsupported = sorted({stage.type.value for stage in pipeline.stages if stage.type not in TASKS_BY_TYPE})
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported job types: {', '.join(unsupported)}")
+    
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
+        stages = [stage.model_dump() for stage in pipeline.stages]
+        try:
+            pipeline_id, jobs = await db.run_sync(lambda session: create_pipeline(session, stages))
+        except PipelineError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await db.commit()
         
-        if not job:
-            raise HTTPException(status_code=404, detail="Job not found")
+        roots = [[job.id, job.type.value] for job in jobs if job.status == JobStatus.QUEUED]
+        try:
+            await run_in_threadpool(dispatch_jobs, roots)
+        except Exception:
+            # Also cancels the waiting stages, which could never be released
+            await fail_undispatched_jobs(db, [job_id for job_id, _ in roots])
+            raise
+        await publish_jobs_resync_async()
         
         return {
-            "job_id": job.id,
-            "type": job.type.value,
-            "status": job.status.value,
-            "progress": job.progress,
-            "created_at": job.created_at.isoformat(),
-            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-            "duration_seconds": (
-                (job.completed_at - job.created_at).total_seconds() 
-                if job.completed_at else 
-                (datetime.utcnow() - job.created_at).total_seconds()
-            )
+            "pipeline_id": pipeline_id,
+            "jobs": [job.to_dict() for job in jobs],
+            "message": f"Pipeline with {len(jobs)} jobs created"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get job status: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create pipeline: {str(e)}")
+
+@app.get("/pipelines/{pipeline_id}")
+async def get_job_pipeline(pipeline_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the jobs and dependency edges of a pipeline with an overall status
+    """
+    try:
+        jobs = (await db.execute(
+            select(Job).where(Job.pipeline_id == pipeline_id).order_by(Job.created_at, Job.id)
+        )).scalars().all()
+        if not jobs:
+            raise HTTPException(status_code=404, detail="Pipeline not found")
+        
+        edges = (await db.execute(
+            select(JobDependency).where(JobDependency.child_id.in_([job.id for job in jobs]))
+        )).scalars().all()
+        
+        statuses = {job.status for job in jobs}
+        if JobStatus.FAILED in statuses:
+            status = JobStatus.FAILED
+        elif JobStatus.CANCELLED in statuses:
+            status = JobStatus.CANCELLED
+        elif statuses == {JobStatus.COMPLETED}:
+            status = JobStatus.COMPLETED
+        elif statuses & {JobStatus.RUNNING, JobStatus.COMPLETED}:
+            status = JobStatus.RUNNING
+        else:
+            status = JobStatus.QUEUED
+        
+        return {
+            "pipeline_id": pipeline_id,
+            "status": status.value,
+            "jobs": [job.to_dict() for job in jobs],
+            "edges": [{"parent_id": edge.parent_id, "child_id": edge.child_id} for edge in edges]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get pipeline: {str(e)}")
 
-# PLACEHOLDER ENDPOINTS FOR OTHER SECTIONS
-# These demonstrate the API structure for future development
+# METRICS ENDPOINT
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics of the API process
+    Request latencies, database pool usage, queue depths and (when workers
+    share PROMETHEUS_MULTIPROC_DIR) task runtimes and progress writes
+    """
+    payload, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=payload, media_type=content_type)
+
+# TRANSCRIBE ENDPOINTS
+async def queue_search_indexing(key: str, background_tasks: BackgroundTasks):
+    """
+    Queue a saved document for the search indexer
+    Without Redis it is indexed after the response instead
+    """
+    if await queue_for_indexing_async([key]) is None:
+        background_tasks.add_task(index_now, [key])
 
 @app.get("/transcribe/status")
 async def transcribe_status():
-    """Placeholder for transcription service status"""
-    return {"section": "transcribe", "status": "ready", "message": "Transcription services ready"}
+    """
+    Transcription service status
+    Includes the documents open in the wikitext renderer and its token cache usage
+    """
+    return {
+        "section": "transcribe",
+        "status": "ready",
+        "message": "Transcription services ready",
+        **read_wikitext_stats()
+    }
+
+@app.post("/transcribe/render")
+async def render_wikitext(request: WikitextRenderRequest):
+    """
+    Tokenize MediaWiki markup for syntax highlighting
+    Sending text opens a document and returns the spans of all its blocks;
+    edits against its document_id and version return only the blocks that
+    changed. Unknown documents (404) and stale versions (409) need the full
+    text again
+    """
+    try:
+        if request.text is not None:
+            return json_response(await run_in_threadpool(
+                open_document, request.text, request.document_id, request.html
+            ))
+        if request.document_id is None or request.version is None:
+            raise HTTPException(status_code=400, detail="Send text, or document_id and version with edits")
+        
+        edits = [edit.model_dump() for edit in request.edits]
+        try:
+            return json_response(await run_in_threadpool(
+                edit_document, request.document_id, request.version, edits, request.html
+            ))
+        except DocumentNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except VersionConflict as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except WikitextError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render wikitext: {str(e)}")
+
+@app.post("/transcribe/transcriptions")
+async def create_transcription_document(
+    request: TranscriptionCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Store a new transcription
+    The full text is sent once; later saves send edits (PATCH)
+    """
+    try:
+        transcription = await create_transcription(db, request.text, request.title)
+        await queue_search_indexing(document_key("transcription", transcription.id), background_tasks)
+        return {"transcription_id": transcription.id, "revision": 1, "length": transcription.length}
+        
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create transcription: {str(e)}")
+
+@app.get("/transcribe/transcriptions/{transcription_id}")
+async def get_transcription(
+    transcription_id: str,
+    revision: Optional[int] = Query(None, ge=1, description="Revision to load (default: the head)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the text of a transcription at its head or at an earlier revision
+    Any revision is rebuilt from one snapshot and a bounded number of deltas
+    """
+    try:
+        transcription = await db.get(Transcription, transcription_id)
+        if transcription is None:
+            raise HTTPException(status_code=404, detail="Transcription not found")
+        try:
+            text = await read_transcription_text(db, transcription, revision)
+        except TranscriptionNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        
+        return json_response({
+            "transcription_id": transcription.id,
+            "title": transcription.title,
+            "revision": revision or transcription.head_revision,
+            "head_revision": transcription.head_revision,
+            "updated_at": transcription.updated_at,
+            "text": text
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get transcription: {str(e)}")
+
+@app.patch("/transcribe/transcriptions/{transcription_id}")
+async def patch_transcription(
+    transcription_id: str,
+    patch: TranscriptionPatch,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Save edits made against base_revision as the next revision
+    Only the edits travel and are stored (compressed). Returns 409 with the
+    current head_revision when base_revision is no longer the head
+    """
+    try:
+        edits = [(edit.start, edit.end, edit.text) for edit in patch.edits]
+        try:
+            saved = await save_revision(db, transcription_id, patch.base_revision, edits)
+        except TranscriptionNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except RevisionConflict as e:
+            raise HTTPException(status_code=409, detail={"message": str(e), "head_revision": e.head_revision})
+        except TranscriptionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await queue_search_indexing(document_key("transcription", transcription_id), background_tasks)
+        return saved
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to save transcription: {str(e)}")
+
+@app.get("/transcribe/transcriptions/{transcription_id}/revisions")
+async def get_transcription_revisions(
+    transcription_id: str,
+    since: int = Query(1, ge=1, description="Return the revisions after this one"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the edits of the revisions after since, oldest first
+    Lets a client holding an older revision catch up without reloading the text
+    """
+    try:
+        transcription = await db.get(Transcription, transcription_id)
+        if transcription is None:
+            raise HTTPException(status_code=404, detail="Transcription not found")
+        return json_response({
+            "transcription_id": transcription_id,
+            "head_revision": transcription.head_revision,
+            "revisions": await read_revisions(db, transcription_id, since, limit)
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get transcription revisions: {str(e)}")
+
+# ORGANIZE ENDPOINTS
+@app.get("/organize/search")
+async def search_content(
+    q: str = Query(..., min_length=1, max_length=500, description="Search terms"),
+    source: Optional[str] = Query(None, description=f"Only results from one source ({', '.join(SEARCH_SOURCES)})"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search OCR output and transcriptions
+    Results are ranked by relevance, best first, with a snippet around the
+    matches. Documents are indexed shortly after a job completes or a
+    transcription is saved
+    """
+    try:
+        if source is not None and source not in SEARCH_SOURCES:
+            raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
+        page = await search_documents(db, q, source, limit, offset)
+        return json_response({"query": q, "source": source, "limit": limit, "offset": offset, **page})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search: {str(e)}")
 
 @app.get("/organize/categories")
-async def get_categories():
-    """Placeholder for content organization categories"""
-    return {"section": "organize", "categories": ["documents", "media", "archives"], "status": "ready"}
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
+    """
+    Categories with the number of documents assigned to each
+    Assignments are made by CATEGORIZATION jobs; indexed documents that no
+    job has classified yet are counted as pending
+    """
+    try:
+        counts = dict((await db.execute(
+            select(CategoryAssignment.category, func.count()).group_by(CategoryAssignment.category)
+        )).all())
+        indexed = await db.scalar(select(func.count()).select_from(SearchDocument))
+        names = category_names()
+        # Categories of earlier profiles that still have documents
+        names += sorted(set(counts) - set(names))
+        categorized = sum(counts.values())
+        return {
+            "section": "organize",
+            "status": "ready",
+            "categories": [{"name": name, "documents": counts.get(name, 0)} for name in names],
+            "categorized": categorized,
+            "pending": max(indexed - categorized, 0)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get categories: {str(e)}")
 
+# CONSUME ENDPOINTS
 @app.get("/consume/recent")
-async def get_recent_content():
-    """Placeholder for recent content consumption"""
-    return {"section": "consume", "recent_items": [], "status": "ready"}
+async def get_recent_content(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    job_type: Optional[JobType] = Query(None, alias="type"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recently completed artifacts, newest first
+    Paginated by a (created_at, id) cursor like /gather/jobs; pass the
+    returned next_cursor back for older artifacts. Each item's url serves
+    its content
+    """
+    try:
+        query = select(
+            Artifact.id,
+            Artifact.job_id,
+            Artifact.job_type,
+            Artifact.title,
+            Artifact.content_type,
+            Artifact.size,
+            Artifact.created_at
+        )
+        if job_type is not None:
+            query = query.where(Artifact.job_type == job_type)
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_job_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(tuple_(Artifact.created_at, Artifact.id) < (cursor_created_at, cursor_id))
+        
+        # Fetch one extra row to learn whether another page exists
+        query = query.order_by(Artifact.created_at.desc(), Artifact.id.desc()).limit(limit + 1)
+        rows = (await db.execute(query)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return json_response({
+            "section": "consume",
+            "status": "ready",
+            "recent_items": [
+                {
+                    "artifact_id": row.id,
+                    "job_id": row.job_id,
+                    "type": row.job_type,
+                    "title": row.title,
+                    "content_type": row.content_type,
+                    "size": row.size,
+                    "created_at": row.created_at,
+                    "url": f"/consume/artifacts/{row.id}"
+                }
+                for row in rows
+            ],
+            "next_cursor": encode_job_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get recent content: {str(e)}")
 
-# Import dependency after app creation to avoid circular imports
-from fastapi import Depends
\ No newline at end of file
+@app.api_route("/consume/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+async def get_artifact_content(artifact_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Content of an artifact, with Range and conditional request support
+    Players seeking through a film get 206 partial responses; clients
+    revalidating with If-None-Match or If-Modified-Since get 304 while the
+    file is unchanged
+    """
+    try:
+        artifact = await db.get(Artifact, artifact_id)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        try:
+            return await run_in_threadpool(
+                serve_artifact, artifact.path, artifact.content_type, request.headers, request.method == "HEAD"
+            )
+        except ArtifactNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to serve artifact: {str(e)}")
\ No newline at end of file
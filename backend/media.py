@@ -0,0 +1,254 @@
+"""
+Serving job artifacts to the Consume section
+Completed jobs register their output files as artifacts. A file is served
+with byte-range and conditional request support and never read into Python
+memory whole: nginx sends it when MEDIA_ACCEL_REDIRECT is set, otherwise
+the ASGI server's zero-copy send, or failing that bounded chunks
+"""
+
+import mimetypes
+import os
+import re
+import stat
+import uuid
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from models import Artifact, JobType
+from serialization import etag_matches
+import storage
+
+# nginx internal location mapped to ARTIFACT_ROOT (e.g. /_artifacts/); when
+# set, responses carry X-Accel-Redirect and nginx sends the file with sendfile
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT")
+
+# Bytes read per chunk when the server cannot send the file itself
+MEDIA_CHUNK_BYTES = int(os.getenv("MEDIA_CHUNK_BYTES", str(256 * 1024)))
+
+TEXT_CONTENT_TYPE = "text/plain; charset=utf-8"
+
+# Types artifacts may be served as; anything else (HTML, SVG, scripts) is
+# served as application/octet-stream so it cannot run on the API origin
+SAFE_MEDIA_TYPES = ("video/", "audio/", "image/png", "image/jpeg", "image/gif", "image/tiff", "image/webp", "application/pdf")
+SAFE_CONTENT_TYPES = (TEXT_CONTENT_TYPE, "text/plain")
+
+# A single byte range; several ranges in one request are answered with the
+# whole file, as RFC 9110 allows
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+class ArtifactNotFound(ValueError):
+    """The artifact's file is missing or lies outside ARTIFACT_ROOT"""
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range starts past the end of the file"""
+    
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+def safe_content_type(content_type: Optional[str]) -> str:
+    """A content type from SAFE_MEDIA_TYPES or SAFE_CONTENT_TYPES, else application/octet-stream"""
+    if content_type and (content_type in SAFE_CONTENT_TYPES or content_type.startswith(SAFE_MEDIA_TYPES)):
+        return content_type
+    return "application/octet-stream"
+
+def register_artifact(
+    db: Session,
+    job_id: str,
+    job_type: JobType,
+    path: str,
+    content_type: Optional[str] = None,
+    title: Optional[str] = None,
+) -> Artifact:
+    """
+    Record a finished output file of a job as an artifact and commit
+    Registering the same file again (a retried task) updates the record
+    
+    Args:
+        db (Session): Database session
+        job_id (str): Job that produced the file
+        job_type (JobType): Type of that job
+        path (str): The file, under ARTIFACT_ROOT
+        content_type (str): MIME type; guessed from the file name by default, and
+            served as application/octet-stream unless it is a safe media type
+        title (str): Display title for listings
+    
+    Returns:
+        Artifact: The stored artifact
+    """
+    root = os.path.realpath(storage.ARTIFACT_ROOT)
+    full_path = os.path.realpath(path)
+    if os.path.commonpath([root, full_path]) != root:
+        raise ArtifactNotFound(f"{path} is not under {storage.ARTIFACT_ROOT}")
+    relative_path = os.path.relpath(full_path, root)
+    artifact = db.merge(Artifact(
+        id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job_id}/{relative_path}")),
+        job_id=job_id,
+        job_type=job_type,
+        title=title,
+        path=relative_path,
+        content_type=safe_content_type(content_type or mimetypes.guess_type(full_path)[0]),
+        size=os.path.getsize(full_path),
+        created_at=datetime.utcnow()
+    ))
+    db.commit()
+    return artifact
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of the range a Range header asks for
+    Returns None for headers that are ignored (other units, several
+    ranges, malformed) and raises RangeNotSatisfiable for a range that
+    starts at or past the end of the file
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable(size)
+    if last < first:
+        return None
+    return first, last
+
+def not_modified(request_headers: Mapping[str, str], etag: str, modified: float) -> bool:
+    """
+    Whether a GET can be answered with 304
+    If-Modified-Since is only consulted without If-None-Match
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return int(modified) <= since.timestamp()
+
+class FileRangeResponse(Response):
+    """
+    Sends count bytes of an open file from offset, then closes it
+    Uses the ASGI zero-copy send extension when the server offers it;
+    otherwise reads MEDIA_CHUNK_BYTES at a time, so memory use does not
+    depend on the size of the file or range
+    """
+    
+    def __init__(self, file, offset: int, count: int, status_code: int, headers: dict, media_type: str, head: bool = False):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.file = file
+        self.offset = offset
+        self.count = count
+        self.head = head
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if self.head or self.count == 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False
+                })
+            else:
+                fd = self.file.fileno()
+                offset, remaining = self.offset, self.count
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, min(MEDIA_CHUNK_BYTES, remaining), offset)
+                    if not chunk:
+                        raise RuntimeError(f"{self.file.name} was truncated while being sent")
+                    offset += len(chunk)
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        finally:
+            self.file.close()
+
+def _open_artifact(path: str):
+    """Open an artifact file by its path under ARTIFACT_ROOT, with its stat"""
+    root = os.path.realpath(storage.ARTIFACT_ROOT)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise ArtifactNotFound(f"Artifact file outside {storage.ARTIFACT_ROOT}: {path}")
+    try:
+        file = open(full_path, "rb", buffering=0)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        raise ArtifactNotFound(f"Artifact file missing: {path}")
+    stat_result = os.fstat(file.fileno())
+    if not stat.S_ISREG(stat_result.st_mode):
+        file.close()
+        raise ArtifactNotFound(f"Artifact is not a regular file: {path}")
+    return file, stat_result
+
+def serve_artifact(path: str, content_type: str, request_headers: Mapping[str, str], head: bool = False) -> Response:
+    """
+    Response to a GET or HEAD of an artifact file
+    Conditional requests for an unchanged file get 304, a single byte range
+    206 (or 416 past the end, and the whole file once If-Range no longer
+    matches), anything else the whole file. The ETag has nginx's format, so
+    it stays the same whether nginx or this process sends the file
+    
+    Args:
+        path (str): Artifact path under ARTIFACT_ROOT
+        content_type (str): Content-Type of the response
+        request_headers (Mapping): Request headers, lowercase keys
+        head (bool): Send the headers only
+    """
+    file, stat_result = _open_artifact(path)
+    try:
+        size = stat_result.st_size
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        etag = f'"{int(stat_result.st_mtime):x}-{size:x}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "no-cache",
+            "X-Content-Type-Options": "nosniff"
+        }
+        
+        if not_modified(request_headers, etag, stat_result.st_mtime):
+            file.close()
+            return Response(status_code=304, headers=headers)
+        if MEDIA_ACCEL_REDIRECT:
+            # nginx applies any Range itself
+            file.close()
+            headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + quote(path)
+            return Response(media_type=content_type, headers=headers)
+        
+        first, last, status_code = 0, size - 1, 200
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() in (etag, last_modified)):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                file.close()
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            if byte_range is not None:
+                first, last = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+        headers["Content-Length"] = str(last - first + 1)
+        return FileRangeResponse(file, first, last - first + 1, status_code, headers, content_type, head=head)
+    except BaseException:
+        file.close()
+        raise
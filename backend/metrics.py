@@ -0,0 +1,225 @@
+"""
+Prometheus metrics for the API and the Celery workers
+Hot paths only increment in-process counters and histograms; anything that
+needs a round trip (queue depth) is collected when Prometheus scrapes
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+import redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from redis_client import get_redis
+from routing import PRIORITY_STEPS, all_queues
+
+# Port of the worker-side exporter; unset disables it
+WORKER_METRICS_PORT = os.getenv("WORKER_METRICS_PORT")
+
+# Set for prefork workers or several API processes, so every process
+# writes its samples to a shared directory (see the prometheus_client docs)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Task runtimes range from milliseconds (OCR chunks) to hours (video)
+TASK_RUNTIME_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 1800, 3600, 7200)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, per route",
+    ["method", "route", "status"]
+)
+DB_CONNECTION_HOLD_SECONDS = Histogram(
+    "db_connection_hold_seconds",
+    "Time from checkout to checkin of a pooled database connection (not the wait to acquire it)",
+    ["engine"]
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Pooled database connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Largest number of connections the pool hands out (pool size plus overflow)",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+TASK_RUNTIME = Histogram(
+    "celery_task_runtime_seconds",
+    "Celery task runtime per job type",
+    ["job_type", "task", "state"],
+    buckets=TASK_RUNTIME_BUCKETS
+)
+JOB_STATUS_CACHE_LOOKUPS = Counter(
+    "job_status_cache_lookups_total",
+    "Job status cache lookups by result (hit or miss)",
+    ["result"]
+)
+SEARCH_DOCUMENTS_INDEXED = Counter(
+    "search_documents_indexed_total",
+    "Documents written to the search index, by source",
+    ["source"]
+)
+PROGRESS_WRITES = Counter(
+    "job_progress_writes_total",
+    "Progress writes by target: live Redis entries or jobs table rows",
+    ["target"]
+)
+
+class QueueDepthCollector:
+    """
+    Messages waiting in each Celery queue, read with LLEN at scrape time
+    The Redis broker keeps one list per priority step, so those are summed
+    """
+    
+    def describe(self):
+        # Lets the registry check metric names without a Redis round trip
+        yield self._family()
+    
+    def collect(self):
+        depth = self._family()
+        queues = all_queues()
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for queue in queues:
+                for key in _priority_keys(queue):
+                    pipe.llen(key)
+            lengths = pipe.execute()
+        except redis.RedisError as e:
+            print(f"Failed to read queue depths: {str(e)}")
+            return
+        per_queue = len(PRIORITY_STEPS)
+        for index, queue in enumerate(queues):
+            depth.add_metric([queue], sum(lengths[index * per_queue:(index + 1) * per_queue]))
+        yield depth
+    
+    def _family(self):
+        return GaugeMetricFamily("celery_queue_depth", "Messages waiting in each Celery queue", labels=["queue"])
+
+def _priority_keys(queue: str):
+    """Redis lists behind a queue; priority 0 uses the bare queue name"""
+    return [queue if step == 0 else f"{queue}:{step}" for step in PRIORITY_STEPS]
+
+_queue_depth_collector = QueueDepthCollector()
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry to expose: the process-wide default one, or one that merges
+    every process's samples in multiprocess mode
+    """
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_queue_depth_collector)
+    return registry
+
+def render_metrics():
+    """Payload and content type of a scrape"""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+_instrumented_pools = set()
+
+def instrument_engine(engine, name: str, capacity: int):
+    """
+    Record connection hold times and pool usage of a SQLAlchemy engine
+    Works for async engines through their sync_engine
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    if pool in _instrumented_pools:
+        return
+    _instrumented_pools.add(pool)
+    in_use = DB_POOL_IN_USE.labels(name)
+    held = DB_CONNECTION_HOLD_SECONDS.labels(name)
+    DB_POOL_CAPACITY.labels(name).set(capacity)
+    
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        in_use.inc()
+    
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            held.observe(time.perf_counter() - started)
+            in_use.dec()
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing each request until its response starts
+    Routes are labelled by their path template (e.g. /jobs/{job_id}/status),
+    so event streams are timed to their first byte rather than their lifetime
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                REQUEST_LATENCY.labels(
+                    scope["method"],
+                    route.path if route is not None else "unmatched",
+                    str(message["status"])
+                ).observe(time.perf_counter() - started)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_timing)
+
+_task_started: Dict[str, float] = {}
+
+def task_started(task_id: str):
+    """Note the start of a Celery task"""
+    _task_started[task_id] = time.perf_counter()
+
+def task_finished(task_id: str, task_name: str, job_type: Optional[str], state: Optional[str]):
+    """Observe the runtime of a Celery task started with task_started"""
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    TASK_RUNTIME.labels(job_type or "system", task_name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+def start_worker_exporter(port: Optional[str] = None) -> bool:
+    """
+    Serve worker metrics over HTTP from the worker's main process
+    Returns False when no port is configured or it is taken
+    """
+    port = port or WORKER_METRICS_PORT
+    if not port:
+        return False
+    try:
+        start_http_server(int(port), registry=metrics_registry())
+    except OSError as e:
+        print(f"Worker metrics exporter not started on port {port}: {str(e)}")
+        return False
+    print(f"Worker metrics exporter listening on port {port}")
+    return True
+
+def worker_process_exited(pid: int):
+    """Drop the live gauges of an exited prefork child"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+if not PROMETHEUS_MULTIPROC_DIR:
+    REGISTRY.register(_queue_depth_collector)
@@ -3,15 +3,20 @@ Database models for the Vintage Queue system
 Defines Job table structure and related enums
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, Enum as SQLEnum
+from sqlalchemy import BigInteger, Boolean, Column, Float, ForeignKey, String, Integer, DateTime, Index, JSON, LargeBinary, Text, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
+import os
 
 from database import Base
 
+# "monthly" range-partitions the jobs table on created_at (PostgreSQL only), "none" disables
+JOB_PARTITIONING = os.getenv("JOB_PARTITIONING", "monthly")
+
 class JobStatus(enum.Enum):
     """Job status enumeration for tracking job lifecycle"""
+    WAITING = "waiting"  # pipeline job whose parent jobs have not all completed
     QUEUED = "queued"
     RUNNING = "running"
     COMPLETED = "completed"
@@ -26,6 +31,22 @@ class JobType(enum.Enum):
     CATEGORIZATION = "categorization"
     MEDIA_CONSUMPTION = "media_consumption"
 
+# Public fields of a job in API responses, mapped to the Job attribute behind
+# each; shared by Job.to_dict and the column-only queries in serialization.py
+JOB_FIELDS = {
+    "job_id": "id",
+    "type": "type",
+    "status": "status",
+    "progress": "progress",
+    "payload": "payload",
+    "result": "result",
+    "pipeline_id": "pipeline_id",
+    "stage": "stage",
+    "cache_hit": "cache_hit",
+    "created_at": "created_at",
+    "completed_at": "completed_at",
+}
+
 class Job(Base):
     """
     Job model representing a queued task in the system
@@ -45,20 +66,231 @@ class Job(Base):
     # Progress tracking (0-100)
     progress = Column(Integer, default=0, nullable=False)
     
-    # Timestamp tracking
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Job input parameters, interpreted by the task for the job type
+    payload = Column(JSON, nullable=True)
+    
+    # Job output summary (e.g. artifact paths and counts), set on completion
+    result = Column(JSON, nullable=True)
+    
+    # Pipeline membership; dependency edges live in job_dependencies
+    pipeline_id = Column(String, nullable=True, index=True)
+    stage = Column(String, nullable=True)
+    
+    # Content hash of the job's input (see result_cache.py) and whether the
+    # result was served from the cache; both stay null for uncached job types
+    input_hash = Column(String, nullable=True)
+    cache_hit = Column(Boolean, nullable=True)
+    
+    # Timestamp tracking; created_at is part of the key because it is the partition key
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, primary_key=True, index=True)
     completed_at = Column(DateTime, nullable=True)
     
+    # Composite indexes backing keyset pagination on (created_at, id),
+    # optionally narrowed by status or type; on PostgreSQL the table is
+    # range-partitioned by month (see partitions.py), elsewhere it is a single table
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobs_type_created_at_id", "type", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"} if JOB_PARTITIONING == "monthly" else {},
+    )
+    
     def __repr__(self):
         return f"<Job(id={self.id}, type={self.type.value}, status={self.status.value})>"
     
-    def to_dict(self):
-        """Convert job to dictionary for API responses"""
-        return {
-            "id": self.id,
-            "type": self.type.value,
-            "status": self.status.value,
-            "progress": self.progress,
-            "created_at": self.created_at.isoformat(),
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None
-        }
\ No newline at end of file
+    def to_dict(self, fields=None):
+        """
+        Convert job to dictionary for API responses
+        Enums and datetimes are left for the orjson response to encode
+        """
+        return {name: getattr(self, JOB_FIELDS[name]) for name in fields or JOB_FIELDS}
+
+class JobArchive(Base):
+    """
+    Archived copy of a finished job
+    Rows are moved here from the jobs table by the retention task
+    """
+    __tablename__ = "jobs_archive"
+    
+    id = Column(String, primary_key=True)
+    type = Column(SQLEnum(JobType), nullable=False)
+    status = Column(SQLEnum(JobStatus), nullable=False)
+    progress = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    pipeline_id = Column(String, nullable=True)
+    stage = Column(String, nullable=True)
+    input_hash = Column(String, nullable=True)
+    cache_hit = Column(Boolean, nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    completed_at = Column(DateTime, nullable=True)
+    
+    # When the row left the jobs table
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<JobArchive(id={self.id}, type={self.type.value}, status={self.status.value})>"
+
+class JobDependency(Base):
+    """
+    Dependency edge between two jobs of a pipeline
+    The child job waits until every one of its parents has completed; the
+    ids are plain columns because the partitioned jobs table cannot be the
+    target of a foreign key on id alone
+    """
+    __tablename__ = "job_dependencies"
+    
+    parent_id = Column(String, primary_key=True)
+    child_id = Column(String, primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f"<JobDependency(parent_id={self.parent_id}, child_id={self.child_id})>"
+
+class JobDedupKey(Base):
+    """
+    Caller-supplied idempotency key of a submitted job
+    The primary key makes a second submission with the same key fail to
+    insert, which the API turns into a reply with the original job. It is a
+    separate table because a unique index on the partitioned jobs table
+    would have to include created_at and so could not catch duplicates
+    """
+    __tablename__ = "job_dedup_keys"
+    
+    dedup_key = Column(String, primary_key=True)
+    job_id = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<JobDedupKey(dedup_key={self.dedup_key}, job_id={self.job_id})>"
+
+class Transcription(Base):
+    """
+    A transcribed document, stored as a chain of revisions
+    The text of a revision is rebuilt from the latest snapshot at or before
+    it plus the deltas after that snapshot; this row only tracks the head
+    """
+    __tablename__ = "transcriptions"
+    
+    id = Column(String, primary_key=True)
+    title = Column(String, nullable=True)
+    head_revision = Column(Integer, nullable=False, default=1)
+    
+    # Length of the head text in UTF-16 code units, the unit of edit offsets
+    length = Column(Integer, nullable=False, default=0)
+    
+    # Latest snapshot revision and the compressed delta bytes stored since,
+    # which decide when the next snapshot is due
+    snapshot_revision = Column(Integer, nullable=False, default=1)
+    delta_bytes = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<Transcription(id={self.id}, head_revision={self.head_revision})>"
+
+class TranscriptionRevision(Base):
+    """
+    One saved revision of a transcription
+    delta holds the edits against the previous revision (absent for the
+    first); snapshot holds the full text, on the first revision and then
+    periodically. Both are zlib-compressed
+    """
+    __tablename__ = "transcription_revisions"
+    
+    transcription_id = Column(String, ForeignKey("transcriptions.id", ondelete="CASCADE"), primary_key=True)
+    revision = Column(Integer, primary_key=True)
+    delta = Column(LargeBinary, nullable=True)
+    snapshot = Column(LargeBinary, nullable=True)
+    length = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<TranscriptionRevision(transcription_id={self.transcription_id}, revision={self.revision})>"
+
+class SearchDocument(Base):
+    """
+    Searchable text of one piece of pipeline output
+    The id is "<source>:<source_id>", e.g. "ocr:<job id>" or
+    "transcription:<transcription id>". On PostgreSQL the table also has a
+    generated tsvector column with a GIN index (see search.py)
+    """
+    __tablename__ = "search_documents"
+    
+    id = Column(String, primary_key=True)
+    source = Column(String, nullable=False)
+    source_id = Column(String, nullable=False)
+    title = Column(String, nullable=True)
+    body = Column(Text, nullable=False)
+    
+    # Number of indexed terms, for length normalisation of postings scores
+    length = Column(Integer, nullable=False, default=0)
+    
+    indexed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Covers the corpus statistics of the postings ranking (document count
+    # and average length) without reading the text, and filters by source
+    __table_args__ = (
+        Index("ix_search_documents_source_length", "source", "length"),
+    )
+    
+    def __repr__(self):
+        return f"<SearchDocument(id={self.id})>"
+
+class SearchPosting(Base):
+    """
+    Inverted index entry: how often a term occurs in a search document
+    Used for ranking where the database has no full-text search of its own
+    (SQLite); the primary key serves lookups by term
+    """
+    __tablename__ = "search_postings"
+    
+    term = Column(String, primary_key=True)
+    document_id = Column(String, ForeignKey("search_documents.id", ondelete="CASCADE"), primary_key=True, index=True)
+    frequency = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<SearchPosting(term={self.term}, document_id={self.document_id})>"
+
+class CategoryAssignment(Base):
+    """
+    Category of a search document, as assigned by the latest CATEGORIZATION
+    job that classified it (see categorization.py)
+    """
+    __tablename__ = "category_assignments"
+    
+    document_id = Column(String, ForeignKey("search_documents.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, nullable=False, index=True)
+    score = Column(Float, nullable=False)
+    job_id = Column(String, nullable=True)
+    assigned_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<CategoryAssignment(document_id={self.document_id}, category={self.category})>"
+
+class Artifact(Base):
+    """
+    A file produced by a completed job, listed and served by the Consume section
+    path is relative to ARTIFACT_ROOT. The id is derived from the job and
+    path, so a retried task registers the same artifact again rather than a
+    second one
+    """
+    __tablename__ = "artifacts"
+    
+    id = Column(String, primary_key=True)
+    job_id = Column(String, nullable=False, index=True)
+    job_type = Column(SQLEnum(JobType), nullable=False)
+    title = Column(String, nullable=True)
+    path = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Newest-first keyset listing, overall and per job type
+    __table_args__ = (
+        Index("ix_artifacts_created_at_id", "created_at", "id"),
+        Index("ix_artifacts_job_type_created_at_id", "job_type", "created_at", "id"),
+    )
+    
+    def __repr__(self):
+        return f"<Artifact(id={self.id}, job_id={self.job_id}, path={self.path})>"
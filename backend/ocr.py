@@ -0,0 +1,164 @@
+"""
+OCR pipeline building blocks
+Pluggable OCR engines, page discovery and per-page processing used by the
+OCR_PROCESSING Celery tasks
+"""
+
+import hashlib
+import os
+from typing import Callable, Dict, List, Optional
+
+from storage import resolve_input, write_atomic
+
+# Engine used when a job's payload does not name one
+OCR_ENGINE = os.getenv("OCR_ENGINE", "tesseract")
+
+# Pages handled by one chunk task
+OCR_CHUNK_SIZE = int(os.getenv("OCR_CHUNK_SIZE", "10"))
+
+PAGE_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+# Name of the assembled document inside the job's artifact directory
+DOCUMENT_FILENAME = "document.txt"
+
+class OCREngine:
+    """Interface for OCR engines; recognize returns the text of one page"""
+    name = "base"
+    
+    def recognize(self, page: dict) -> str:
+        raise NotImplementedError
+
+class FakeOCREngine(OCREngine):
+    """
+    Deterministic stand-in engine for tests and benchmarks
+    The text of a page depends only on its path and number
+    """
+    name = "fake"
+    
+    VOCABULARY = (
+        "the", "of", "and", "public", "domain", "chapter", "volume", "library",
+        "history", "letter", "river", "city", "poem", "king", "law", "church",
+    )
+    
+    def __init__(self, words_per_page: int = 200):
+        self.words_per_page = words_per_page
+    
+    def recognize(self, page: dict) -> str:
+        seed = hashlib.sha256(f"{page.get('path') or ''}:{page['number']}".encode("utf-8")).digest()
+        words = []
+        while len(words) < self.words_per_page:
+            for byte in seed:
+                words.append(self.VOCABULARY[byte % len(self.VOCABULARY)])
+            seed = hashlib.sha256(seed).digest()
+        return f"Page {page['number']}\n" + " ".join(words[:self.words_per_page]) + "\n"
+
+class TesseractOCREngine(OCREngine):
+    """OCR with Tesseract through pytesseract (optional dependency)"""
+    name = "tesseract"
+    
+    def __init__(self, language: str = "eng"):
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError as e:
+            raise RuntimeError("The tesseract OCR engine requires pytesseract and Pillow") from e
+        self._pytesseract = pytesseract
+        self._image = Image
+        self.language = language
+    
+    def recognize(self, page: dict) -> str:
+        if not page.get("path"):
+            raise ValueError(f"Page {page['number']} has no image to recognise")
+        with self._image.open(page["path"]) as image:
+            return self._pytesseract.image_to_string(image, lang=self.language)
+
+OCR_ENGINES: Dict[str, Callable[..., OCREngine]] = {
+    FakeOCREngine.name: FakeOCREngine,
+    TesseractOCREngine.name: TesseractOCREngine,
+}
+
+def get_ocr_engine(name: Optional[str] = None, **options) -> OCREngine:
+    """Instantiate an OCR engine by name, defaulting to OCR_ENGINE"""
+    name = name or OCR_ENGINE
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    return OCR_ENGINES[name](**options)
+
+def list_pages(payload: dict) -> List[dict]:
+    """
+    Resolve the pages of a document from an OCR job payload
+    Accepts {"source_dir": ...} (page images sorted by name),
+    {"pages": [paths...]} or {"page_count": n} (synthetic pages for the fake engine).
+    Paths must lie under INPUT_ROOT; others raise InputPathError
+    
+    Returns:
+        list: {"number": n, "path": path or None} dicts, numbered from 1
+    """
+    if payload.get("source_dir"):
+        source_dir = resolve_input(payload["source_dir"])
+        paths = sorted(
+            resolve_input(os.path.join(source_dir, name))
+            for name in os.listdir(source_dir)
+            if name.lower().endswith(PAGE_IMAGE_EXTENSIONS)
+        )
+    elif payload.get("pages"):
+        paths = [resolve_input(path) for path in payload["pages"]]
+    elif payload.get("page_count"):
+        paths = [None] * int(payload["page_count"])
+    else:
+        raise ValueError("OCR payload needs source_dir, pages or page_count")
+    
+    if not paths:
+        raise ValueError("OCR payload contains no pages")
+    return [{"number": number, "path": path} for number, path in enumerate(paths, start=1)]
+
+def chunk_pages(pages: List[dict], chunk_size: int = OCR_CHUNK_SIZE) -> List[List[dict]]:
+    """Split pages into consecutive chunks for parallel processing"""
+    return [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+
+def page_filename(number: int) -> str:
+    """File name of one recognised page"""
+    return f"page-{number:05d}.txt"
+
+def ocr_pages(engine: OCREngine, pages: List[dict], output_dir: str, on_page: Optional[Callable[[dict], None]] = None) -> int:
+    """
+    Recognise pages and write each page's text to output_dir as soon as it is done
+    Pages whose output already exists are skipped, so a retried chunk resumes
+    
+    Args:
+        engine (OCREngine): Engine used for recognition
+        pages (list): Page dicts from list_pages
+        output_dir (str): Directory receiving page-NNNNN.txt files
+        on_page (callable): Called with each page after its text is stored
+        
+    Returns:
+        int: Number of pages recognised in this call
+    """
+    recognised = 0
+    for page in pages:
+        path = os.path.join(output_dir, page_filename(page["number"]))
+        if not os.path.exists(path):
+            write_atomic(path, engine.recognize(page))
+            recognised += 1
+        if on_page is not None:
+            on_page(page)
+    return recognised
+
+def assemble_document(output_dir: str, page_count: int) -> dict:
+    """
+    Concatenate page files in order into the final document
+    Streams each page so memory use does not depend on document size
+    
+    Returns:
+        dict: Path and size of the assembled document
+    """
+    document_path = os.path.join(output_dir, DOCUMENT_FILENAME)
+    characters = 0
+    with open(document_path + ".partial", "w", encoding="utf-8") as document:
+        for number in range(1, page_count + 1):
+            with open(os.path.join(output_dir, page_filename(number)), encoding="utf-8") as page:
+                for block in iter(lambda: page.read(65536), ""):
+                    characters += len(block)
+                    document.write(block)
+    os.replace(document_path + ".partial", document_path)
+    return {"text_path": document_path, "pages": page_count, "characters": characters}
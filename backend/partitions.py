@@ -0,0 +1,157 @@
+"""
+Monthly range partitioning of the jobs table on PostgreSQL
+Creates upcoming partitions ahead of time and detaches expired ones;
+other databases keep the single jobs table
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from models import JOB_PARTITIONING, Job
+
+# Monthly partitions created beyond the current month
+JOB_PARTITIONS_AHEAD = int(os.getenv("JOB_PARTITIONS_AHEAD", "3"))
+
+# Partitions ending more than this many months ago are detached (0 keeps all)
+JOB_PARTITION_RETENTION_MONTHS = int(os.getenv("JOB_PARTITION_RETENTION_MONTHS", "12"))
+
+# Catch-all partition for rows outside every monthly range (e.g. backfills)
+DEFAULT_PARTITION = "jobs_default"
+
+PARTITION_NAME_PATTERN = re.compile(r"^jobs_(\d{4})_(\d{2})$")
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of the month containing moment"""
+    return datetime(moment.year, moment.month, 1)
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """First instant of the month a number of months after moment's month"""
+    index = moment.year * 12 + (moment.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(start: datetime) -> str:
+    """Name of the monthly partition starting at start"""
+    return f"jobs_{start:%Y_%m}"
+
+def partition_bounds(now: datetime, months_ahead: int = JOB_PARTITIONS_AHEAD) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Monthly partitions that should exist at a given moment
+    Covers the previous month (for late writes) through months_ahead
+    
+    Returns:
+        list: (name, inclusive start, exclusive end) tuples
+    """
+    current = month_start(now)
+    return [
+        (partition_name(add_months(current, offset)), add_months(current, offset), add_months(current, offset + 1))
+        for offset in range(-1, months_ahead + 1)
+    ]
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether the jobs table on this connection uses monthly partitions"""
+    return JOB_PARTITIONING == "monthly" and connection.dialect.name == "postgresql"
+
+def _step(connection: Connection):
+    """
+    A savepoint inside a running transaction, otherwise a transaction of its
+    own, so a failed partition does not undo the others
+    """
+    return connection.begin_nested() if connection.in_transaction() else connection.begin()
+
+def _table_exists(connection: Connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+def create_partition(connection: Connection, name: str, start: datetime, end: datetime):
+    """
+    Create a monthly partition unless it exists
+    PostgreSQL refuses a partition whose range already has rows in the
+    default partition, so those are moved: the default partition is
+    detached, the month created, its rows re-inserted through jobs (which
+    routes them to the new partition) and the default partition attached again
+    """
+    if _table_exists(connection, name):
+        return
+    in_range = {"start": start, "end": end}
+    stranded = _table_exists(connection, DEFAULT_PARTITION) and connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), in_range).scalar()
+    if stranded:
+        connection.execute(text(f"ALTER TABLE jobs DETACH PARTITION {DEFAULT_PARTITION}"))
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF jobs "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if stranded:
+        connection.execute(text(
+            f"INSERT INTO jobs SELECT * FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+        ), in_range)
+        connection.execute(text(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+        ), in_range)
+        connection.execute(text(f"ALTER TABLE jobs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+def ensure_job_partitions(connection: Connection, now: Optional[datetime] = None, months_ahead: int = JOB_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Create any missing monthly partitions plus the default partition
+    Each partition is created in its own transaction (or savepoint), so one
+    that fails is reported and skipped without undoing the rest. Safe to run
+    repeatedly; returns the partitions that exist afterwards
+    """
+    if not is_partitioned(connection):
+        return []
+    
+    # Monthly partitions first, so a new table has no default partition
+    # whose rows could block them
+    names = []
+    for name, start, end in partition_bounds(now or datetime.utcnow(), months_ahead):
+        try:
+            with _step(connection):
+                create_partition(connection, name, start, end)
+        except DBAPIError as e:
+            print(f"Failed to create job partition {name}: {str(e)}")
+            continue
+        names.append(name)
+    with _step(connection):
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF jobs DEFAULT"))
+    return names
+
+def detach_old_job_partitions(connection: Connection, now: Optional[datetime] = None, retention_months: int = JOB_PARTITION_RETENTION_MONTHS) -> List[str]:
+    """
+    Detach monthly partitions whose range ended before the retention window
+    Detached partitions remain as standalone tables so they can be dumped
+    or dropped; queries on jobs stop scanning them immediately
+    
+    Returns:
+        list: Names of the partitions that were detached
+    """
+    if not is_partitioned(connection) or retention_months <= 0:
+        return []
+    
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+    attached = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'jobs'::regclass"
+    )).scalars().all()
+    
+    detached = []
+    for name in sorted(attached):
+        match = PARTITION_NAME_PATTERN.match(name)
+        if not match:
+            continue
+        end = add_months(datetime(int(match.group(1)), int(match.group(2)), 1), 1)
+        if end <= cutoff:
+            connection.execute(text(f"ALTER TABLE jobs DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+@event.listens_for(Job.__table__, "after_create")
+def create_initial_partitions(target, connection, **kw):
+    """Create partitions as soon as the partitioned jobs table exists"""
+    ensure_job_partitions(connection)
@@ -0,0 +1,235 @@
+"""
+Job pipelines
+Jobs linked by dependency edges run as a graph: a job waits until all of its
+parents have completed and is queued the moment the last one finishes
+"""
+
+import uuid
+from datetime import datetime
+from typing import List, Tuple
+
+from celery import current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, aliased
+
+from job_stats import record_jobs_cancelled
+from models import Job, JobDependency, JobStatus, JobType
+from status_cache import invalidate_job_status
+
+# Upper bound on the number of stages in one pipeline
+PIPELINE_MAX_STAGES = 100
+
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+class PipelineError(ValueError):
+    """Raised for invalid pipeline definitions"""
+
+def order_stages(stages: List[dict]) -> List[dict]:
+    """
+    Validate a pipeline definition and return its stages in dependency order
+    Each stage is a dict with "key", "type", "payload" and "depends_on" (keys
+    of other stages); unknown keys, duplicates and cycles are rejected
+    """
+    stages_by_key = {}
+    for stage in stages:
+        if stage["key"] in stages_by_key:
+            raise PipelineError(f"Duplicate stage key: {stage['key']}")
+        stages_by_key[stage["key"]] = stage
+    
+    for stage in stages:
+        for parent in stage.get("depends_on") or []:
+            if parent not in stages_by_key:
+                raise PipelineError(f"Stage {stage['key']} depends on unknown stage {parent}")
+    
+    # Kahn's algorithm; stages left over sit on a cycle
+    remaining = {key: len(set(stage.get("depends_on") or [])) for key, stage in stages_by_key.items()}
+    children = {key: [] for key in stages_by_key}
+    for stage in stages:
+        for parent in set(stage.get("depends_on") or []):
+            children[parent].append(stage["key"])
+    
+    ready = [stage["key"] for stage in stages if remaining[stage["key"]] == 0]
+    ordered = []
+    while ready:
+        key = ready.pop(0)
+        ordered.append(stages_by_key[key])
+        for child in children[key]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+    
+    if len(ordered) != len(stages):
+        cyclic = sorted(key for key, count in remaining.items() if count > 0)
+        raise PipelineError(f"Pipeline has a dependency cycle through: {', '.join(cyclic)}")
+    return ordered
+
+def create_pipeline(db: Session, stages: List[dict]) -> Tuple[str, List[Job]]:
+    """
+    Add the jobs and edges of a pipeline to the session
+    Stages without dependencies start queued, all others waiting; the caller
+    commits and dispatches the queued jobs
+    
+    Returns:
+        tuple: The pipeline id and its jobs in dependency order
+    """
+    ordered = order_stages(stages)
+    pipeline_id = str(uuid.uuid4())
+    created_at = datetime.utcnow()
+    
+    jobs_by_key = {}
+    for stage in ordered:
+        parents = stage.get("depends_on") or []
+        jobs_by_key[stage["key"]] = Job(
+            id=str(uuid.uuid4()),
+            type=stage["type"],
+            status=JobStatus.WAITING if parents else JobStatus.QUEUED,
+            progress=0,
+            payload=stage.get("payload"),
+            pipeline_id=pipeline_id,
+            stage=stage["key"],
+            created_at=created_at
+        )
+    
+    db.add_all(jobs_by_key.values())
+    db.add_all(
+        JobDependency(parent_id=jobs_by_key[parent].id, child_id=jobs_by_key[stage["key"]].id)
+        for stage in ordered
+        for parent in set(stage.get("depends_on") or [])
+    )
+    db.flush()
+    return pipeline_id, [jobs_by_key[stage["key"]] for stage in ordered]
+
+def release_jobs(db: Session, child_ids: List[str]) -> List[Tuple[str, JobType]]:
+    """
+    Queue the waiting jobs among child_ids whose parents have all completed
+    Parent results are handed to the child as payload["inputs"], keyed by
+    stage. The status change is guarded, so when two parents finish at once
+    only one caller releases the child
+    
+    Returns:
+        list: (job_id, job_type) of the jobs that were queued
+    """
+    released = []
+    blocked_by = set()
+    for child_id in child_ids:
+        child = db.execute(
+            select(Job.type, Job.payload).where(Job.id == child_id, Job.status == JobStatus.WAITING)
+        ).first()
+        if child is None:
+            continue
+        parents = db.execute(
+            select(Job.id, Job.status, Job.stage, Job.result)
+            .join(JobDependency, JobDependency.parent_id == Job.id)
+            .where(JobDependency.child_id == child_id)
+        ).all()
+        blocked_by.update(parent.id for parent in parents if parent.status in (JobStatus.FAILED, JobStatus.CANCELLED))
+        if any(parent.status != JobStatus.COMPLETED for parent in parents):
+            continue
+        
+        payload = dict(child.payload or {})
+        payload["inputs"] = {parent.stage or parent.id: parent.result for parent in parents}
+        result = db.execute(
+            update(Job)
+            .where(Job.id == child_id, Job.status == JobStatus.WAITING)
+            .values(status=JobStatus.QUEUED, payload=payload)
+        )
+        if result.rowcount:
+            released.append((child_id, child.type))
+    db.commit()
+    invalidate_job_status(job_id for job_id, _ in released)
+    if blocked_by:
+        record_cancelled(cancel_dependents(db, list(blocked_by), "Upstream job failed or was cancelled"))
+    return released
+
+def cancel_dependents(db: Session, job_ids: List[str], reason: str) -> List[Tuple[str, JobType]]:
+    """
+    Cancel every waiting job downstream of job_ids and commit
+    Used when a job fails or is cancelled, since its dependents can never run.
+    Only the database is touched; the caller clears their cached statuses
+    and counts them (record_cancelled, or the async helpers in the API)
+    
+    Returns:
+        list: (job_id, job_type) of the jobs that were cancelled
+    """
+    cancelled = []
+    frontier = list(job_ids)
+    while frontier:
+        children = db.execute(
+            select(Job.id)
+            .join(JobDependency, JobDependency.child_id == Job.id)
+            .where(JobDependency.parent_id.in_(frontier), Job.status == JobStatus.WAITING)
+        ).scalars().unique().all()
+        if not children:
+            break
+        rows = db.execute(
+            update(Job)
+            .where(Job.id.in_(children), Job.status == JobStatus.WAITING)
+            .values(status=JobStatus.CANCELLED, completed_at=datetime.utcnow(), result={"error": reason})
+            .returning(Job.id, Job.type)
+        ).all()
+        cancelled.extend(rows)
+        frontier = children
+    db.commit()
+    return cancelled
+
+def record_cancelled(cancelled: List[Tuple[str, JobType]]):
+    """Clear the cached statuses of jobs cancel_dependents cancelled and count them"""
+    invalidate_job_status(job_id for job_id, _ in cancelled)
+    record_jobs_cancelled(job_type for _, job_type in cancelled)
+
+def advance_pipeline(db: Session, job_id: str) -> List[Tuple[str, JobType]]:
+    """
+    React to a pipeline job reaching a final status
+    Completed jobs release their children; failed or cancelled jobs cancel
+    everything downstream. Released jobs are dispatched through the
+    dispatch_job_batch task
+    
+    Returns:
+        list: (job_id, job_type) of the jobs that were queued
+    """
+    job = db.execute(select(Job.status, Job.pipeline_id).where(Job.id == job_id)).first()
+    if job is None or job.pipeline_id is None or job.status not in FINISHED_STATUSES:
+        return []
+    
+    if job.status != JobStatus.COMPLETED:
+        record_cancelled(cancel_dependents(db, [job_id], f"Upstream job {job_id} {job.status.value}"))
+        return []
+    
+    child_ids = db.execute(select(JobDependency.child_id).where(JobDependency.parent_id == job_id)).scalars().all()
+    released = release_jobs(db, child_ids)
+    if released:
+        dispatch_released(released)
+    return released
+
+def release_ready_jobs(db: Session, limit: int = 1000) -> List[Tuple[str, JobType]]:
+    """
+    Queue waiting jobs whose parents have all completed
+    Safety net for a worker that died between finishing a job and releasing
+    its children; run periodically. Only jobs whose parents have all
+    finished are picked, so jobs still blocked on running parents never
+    crowd out the ones that are ready (or must be cancelled)
+    """
+    parent = aliased(Job)
+    unfinished_parent = (
+        select(JobDependency.parent_id)
+        .join(parent, parent.id == JobDependency.parent_id)
+        .where(JobDependency.child_id == Job.id, parent.status.notin_(FINISHED_STATUSES))
+        .exists()
+    )
+    waiting = db.execute(
+        select(Job.id)
+        .where(Job.status == JobStatus.WAITING, ~unfinished_parent)
+        .order_by(Job.created_at)
+        .limit(limit)
+    ).scalars().all()
+    released = release_jobs(db, waiting)
+    if released:
+        dispatch_released(released)
+    return released
+
+def dispatch_released(released: List[Tuple[str, JobType]]):
+    """Send released jobs to their queues via the dispatch_job_batch task"""
+    current_app.send_task(
+        "celery_app.dispatch_job_batch",
+        args=[[[job_id, job_type.value] for job_id, job_type in released]]
+    )
@@ -0,0 +1,234 @@
+"""
+Write-behind progress reporting for Celery tasks
+Progress ticks go to Redis; the jobs table only sees coalesced flushes
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import redis
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from cancellation import JobCancelled, cancel_key, is_cancellation_requested
+from events import publish_job_event
+from job_stats import record_job_finished
+from metrics import PROGRESS_WRITES
+from models import Job, JobStatus
+from pipelines import advance_pipeline
+from redis_client import get_async_redis, get_redis
+from status_cache import invalidate_job_status
+
+# Minimum seconds between progress writes to the jobs table
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "5"))
+
+# Live progress entries expire on their own if a worker dies mid-job
+PROGRESS_KEY_TTL = 24 * 60 * 60
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+_redis_writes = PROGRESS_WRITES.labels("redis")
+_database_writes = PROGRESS_WRITES.labels("database")
+
+def progress_key(job_id: str) -> str:
+    """Redis key holding the live progress of a job"""
+    return f"job:progress:{job_id}"
+
+async def read_live_progress(job_id: str) -> Optional[int]:
+    """
+    Read the freshest progress value a worker has reported for a job
+    Returns None when no live value exists or Redis is unreachable
+    """
+    try:
+        value = await get_async_redis().hget(progress_key(job_id), "progress")
+    except redis.RedisError:
+        return None
+    return int(value) if value is not None else None
+
+async def read_live_progress_many(job_ids: List[str]) -> Dict[str, int]:
+    """
+    Read the live progress of several jobs in one Redis round trip
+    Jobs without a live value are left out; Redis errors yield no values
+    """
+    if not job_ids:
+        return {}
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hget(progress_key(job_id), "progress")
+        values = await pipe.execute()
+    except redis.RedisError:
+        return {}
+    return {job_id: int(value) for job_id, value in zip(job_ids, values) if value is not None}
+
+class ProgressReporter:
+    """
+    Reports job progress from inside a task
+    Every change is written to Redis and published to viewers immediately,
+    while Job.progress is flushed at most once per flush interval and on
+    every status transition
+    
+    Updates raise JobCancelled once the job has been cancelled, so tasks
+    stop at their next progress report
+    """
+    
+    def __init__(self, job_id: str, db: Session, task=None, flush_interval: Optional[float] = None):
+        self.job_id = job_id
+        self.db = db
+        self.task = task
+        self.flush_interval = PROGRESS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.progress = 0
+        self._flushed_progress = None
+        self._last_flush = time.monotonic()
+        self._redis_available = True
+    
+    def start(self):
+        """Mark the job as running, unless it was cancelled while queued"""
+        if self.transition(JobStatus.RUNNING, progress=0) is None:
+            raise JobCancelled(self.job_id)
+    
+    def update(self, progress: int, message: Optional[str] = None):
+        """
+        Record a progress value between 0 and 100
+        Repeated values are dropped, so fine-grained loops cost at most one
+        Redis write per percentage point
+        """
+        progress = max(0, min(100, int(progress)))
+        if progress == self.progress:
+            return
+        self.check_cancelled()
+        self.progress = progress
+        self._write_live(progress)
+        publish_job_event(self.job_id, progress=progress)
+        
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush(message)
+    
+    def flush(self, message: Optional[str] = None):
+        """Write the latest progress to the jobs table if it changed"""
+        self._last_flush = time.monotonic()
+        if self.progress == self._flushed_progress:
+            return
+        result = self.db.execute(
+            update(Job)
+            .where(Job.id == self.job_id, Job.status.notin_(TERMINAL_STATUSES))
+            .values(progress=self.progress)
+        )
+        self.db.commit()
+        _database_writes.inc()
+        if result.rowcount == 0:
+            # Finished elsewhere, i.e. cancelled while Redis was unavailable
+            raise JobCancelled(self.job_id)
+        self._flushed_progress = self.progress
+        
+        if self.task is not None:
+            # Update task state for Celery monitoring at the same coalesced rate
+            self.task.update_state(
+                state="PROGRESS",
+                meta={
+                    "current": self.progress,
+                    "total": 100,
+                    "job_id": self.job_id,
+                    "message": message or f"Processing... {self.progress}% complete"
+                }
+            )
+    
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation of the job has been requested"""
+        if self._redis_available and is_cancellation_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+    
+    def transition(self, status: JobStatus, progress: Optional[int] = None, result: Optional[dict] = None) -> Optional[dict]:
+        """
+        Move the job to a new status, flushing progress (and the job result,
+        if given) in the same write
+        Terminal statuses also stamp completed_at and drop the live entry
+        Returns None without changing anything if the job already finished
+        (e.g. it was cancelled)
+        """
+        if progress is not None:
+            self.progress = progress
+        values = {"status": status, "progress": self.progress}
+        if result is not None:
+            values["result"] = result
+        if status in TERMINAL_STATUSES:
+            values["completed_at"] = datetime.utcnow()
+        
+        row = self.db.execute(
+            update(Job)
+            .where(Job.id == self.job_id, Job.status.notin_(TERMINAL_STATUSES))
+            .values(**values)
+            .returning(Job.type, Job.created_at)
+        ).first()
+        self.db.commit()
+        _database_writes.inc()
+        if row is None:
+            return None
+        invalidate_job_status([self.job_id])
+        self._flushed_progress = self.progress
+        self._last_flush = time.monotonic()
+        
+        if status in TERMINAL_STATUSES:
+            self._clear_live()
+        else:
+            self._write_live(self.progress)
+        
+        event = {"status": status.value, "progress": self.progress}
+        if "completed_at" in values:
+            event["completed_at"] = values["completed_at"].isoformat()
+        publish_job_event(self.job_id, **event)
+        
+        if status in TERMINAL_STATUSES:
+            record_job_finished(row.type, status, row.created_at, values["completed_at"])
+            try:
+                advance_pipeline(self.db, self.job_id)
+            except Exception as e:
+                # Waiting dependents are picked up by the release_pipeline_jobs sweep
+                self.db.rollback()
+                print(f"Failed to advance pipeline after job {self.job_id}: {str(e)}")
+        return values
+    
+    def complete(self, result: Optional[dict] = None) -> dict:
+        """Mark the job as completed, unless it was cancelled in the meantime"""
+        values = self.transition(JobStatus.COMPLETED, progress=100, result=result)
+        if values is None:
+            raise JobCancelled(self.job_id)
+        return values
+    
+    def fail(self) -> Optional[dict]:
+        """Mark the job as failed"""
+        return self.transition(JobStatus.FAILED, progress=0)
+    
+    def acknowledge_cancel(self):
+        """Clean up after a task stopped because its job was cancelled"""
+        self._clear_live()
+        if self._redis_available:
+            try:
+                get_redis().delete(cancel_key(self.job_id))
+            except redis.RedisError:
+                pass
+    
+    def _write_live(self, progress: int):
+        if not self._redis_available:
+            return
+        try:
+            key = progress_key(self.job_id)
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hset(key, mapping={"progress": progress, "updated_at": time.time()})
+            pipe.expire(key, PROGRESS_KEY_TTL)
+            pipe.execute()
+            _redis_writes.inc()
+        except redis.RedisError as e:
+            # Fall back to interval flushes straight to the database
+            print(f"Live progress unavailable for job {self.job_id}: {str(e)}")
+            self._redis_available = False
+    
+    def _clear_live(self):
+        if not self._redis_available:
+            return
+        try:
+            get_redis().delete(progress_key(self.job_id))
+        except redis.RedisError:
+            self._redis_available = False
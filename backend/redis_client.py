@@ -0,0 +1,35 @@
+"""
+Redis connection helpers
+Shared clients for the Redis instance that also serves as the Celery broker
+"""
+
+import os
+
+import redis
+import redis.asyncio as aioredis
+
+# Redis configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_redis = None
+_async_redis = None
+
+def get_redis() -> redis.Redis:
+    """
+    Get the process-wide synchronous Redis client
+    Used by Celery tasks and other blocking code paths
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2)
+    return _redis
+
+def get_async_redis() -> aioredis.Redis:
+    """
+    Get the process-wide asyncio Redis client
+    Used by FastAPI endpoints so Redis round trips do not block the event loop
+    """
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.Redis.from_url(REDIS_URL, socket_connect_timeout=2)
+    return _async_redis
@@ -0,0 +1,258 @@
+"""
+Content-addressed result cache
+Job results are keyed by a hash of the job type, its processing parameters
+and the bytes of its input files, so identical inputs are processed once
+"""
+
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import redis
+
+from models import JobType
+from ocr import OCR_ENGINE, list_pages
+from redis_client import get_redis
+from storage import ARTIFACT_ROOT, resolve_input, write_atomic
+from video import VIDEO_PROCESSOR
+
+# "redis" (LRU by entry count), "disk" (LRU by total bytes) or "none"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "redis")
+
+# Bounds on the cache; least recently used entries are evicted first
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "100000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(ARTIFACT_ROOT, ".result-cache"))
+
+# Bump to invalidate every entry when processing output changes
+RESULT_CACHE_VERSION = 1
+
+RESULT_CACHE_PREFIX = "results:cache:"
+RESULT_CACHE_LRU_KEY = "results:lru"
+RESULT_CACHE_STATS_KEY = "results:stats"
+
+# Payload keys that are not processing parameters: input file references
+# (hashed by content instead), upstream results and the per-job cache switch
+IGNORED_PAYLOAD_KEYS = ("source_dir", "pages", "source_path", "inputs", "cache")
+
+@lru_cache(maxsize=4096)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    """SHA-256 of a file; memoised per (path, size, mtime) so unchanged files are read once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def cache_inputs(job_type: JobType, payload: dict) -> Optional[Tuple[List[str], dict]]:
+    """
+    Input files and processing parameters of a job
+    Returns None for job types whose results are not cached
+    """
+    params = {key: value for key, value in payload.items() if key not in IGNORED_PAYLOAD_KEYS}
+    if job_type == JobType.OCR_PROCESSING:
+        params["engine"] = payload.get("engine") or OCR_ENGINE
+        return [page["path"] for page in list_pages(payload) if page["path"]], params
+    if job_type == JobType.VIDEO_PROCESSING:
+        params["processor"] = payload.get("processor") or VIDEO_PROCESSOR
+        return [resolve_input(payload["source_path"])], params
+    return None
+
+def input_fingerprint(job_type: JobType, payload: dict) -> Optional[str]:
+    """
+    Content hash identifying a job's work
+    File paths do not take part, so the same scan found at two mirrors
+    hashes the same; returns None when the job type is not cacheable or the
+    payload sets "cache": false
+    """
+    payload = payload or {}
+    if payload.get("cache") is False:
+        return None
+    inputs = cache_inputs(job_type, payload)
+    if inputs is None:
+        return None
+    files, params = inputs
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        {"version": RESULT_CACHE_VERSION, "type": job_type.value, "params": params},
+        sort_keys=True,
+        default=str
+    ).encode("utf-8"))
+    for path in files:
+        digest.update(file_digest(path).encode("ascii"))
+    return digest.hexdigest()
+
+def _artifacts_exist(result: dict) -> bool:
+    """Cached results point at files of the job that produced them; check they are still there"""
+    return all(os.path.exists(value) for key, value in result.items() if key.endswith("_path") and value)
+
+class RedisResultCache:
+    """Entries in Redis strings, recency in a sorted set; bounded by entry count"""
+    name = "redis"
+    
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+    
+    def get(self, fingerprint: str) -> Optional[dict]:
+        client = get_redis()
+        value = client.get(RESULT_CACHE_PREFIX + fingerprint)
+        if value is None:
+            return None
+        client.zadd(RESULT_CACHE_LRU_KEY, {fingerprint: time.time()})
+        return json.loads(value)
+    
+    def put(self, fingerprint: str, result: dict):
+        client = get_redis()
+        pipe = client.pipeline(transaction=False)
+        pipe.set(RESULT_CACHE_PREFIX + fingerprint, json.dumps(result))
+        pipe.zadd(RESULT_CACHE_LRU_KEY, {fingerprint: time.time()})
+        pipe.zcard(RESULT_CACHE_LRU_KEY)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = client.zrange(RESULT_CACHE_LRU_KEY, 0, size - self.max_entries - 1)
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(*[RESULT_CACHE_PREFIX + key.decode("ascii") for key in evicted])
+            pipe.zrem(RESULT_CACHE_LRU_KEY, *evicted)
+            pipe.execute()
+    
+    def delete(self, fingerprint: str):
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.delete(RESULT_CACHE_PREFIX + fingerprint)
+        pipe.zrem(RESULT_CACHE_LRU_KEY, fingerprint)
+        pipe.execute()
+    
+    def size(self) -> dict:
+        return {"entries": get_redis().zcard(RESULT_CACHE_LRU_KEY), "max_entries": self.max_entries}
+
+class DiskResultCache:
+    """One JSON file per entry, recency in file mtimes; bounded by total bytes"""
+    name = "disk"
+    
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = directory or RESULT_CACHE_DIR
+        self.max_bytes = max_bytes
+    
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, fingerprint + ".json")
+    
+    def get(self, fingerprint: str) -> Optional[dict]:
+        path = self._path(fingerprint)
+        try:
+            with open(path, encoding="utf-8") as handle:
+                result = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+    
+    def put(self, fingerprint: str, result: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self._path(fingerprint), json.dumps(result))
+        
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        total = sum(entry.stat().st_size for entry in entries)
+        if total <= self.max_bytes:
+            return
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    
+    def delete(self, fingerprint: str):
+        try:
+            os.unlink(self._path(fingerprint))
+        except FileNotFoundError:
+            pass
+    
+    def size(self) -> dict:
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")] if os.path.isdir(self.directory) else []
+        return {
+            "entries": len(entries),
+            "size_bytes": sum(entry.stat().st_size for entry in entries),
+            "max_bytes": self.max_bytes
+        }
+
+RESULT_CACHE_BACKENDS = {
+    RedisResultCache.name: RedisResultCache,
+    DiskResultCache.name: DiskResultCache,
+}
+
+def get_result_cache(name: Optional[str] = None):
+    """The configured cache backend, or None when caching is disabled"""
+    name = name or RESULT_CACHE_BACKEND
+    if name == "none":
+        return None
+    if name not in RESULT_CACHE_BACKENDS:
+        raise ValueError(f"Unknown result cache backend: {name}")
+    return RESULT_CACHE_BACKENDS[name]()
+
+def _record_lookup(hit: bool):
+    """Count a hit or miss for the hit-rate report"""
+    try:
+        get_redis().hincrby(RESULT_CACHE_STATS_KEY, "hits" if hit else "misses", 1)
+    except redis.RedisError:
+        pass
+
+def lookup_result(fingerprint: str, cache=None) -> Optional[dict]:
+    """
+    Cached result for a fingerprint, or None on a miss
+    Entries whose artifacts have been removed are dropped and count as misses;
+    cache errors also count as misses so processing goes ahead
+    """
+    cache = cache or get_result_cache()
+    if cache is None:
+        return None
+    try:
+        result = cache.get(fingerprint)
+        if result is not None and not _artifacts_exist(result):
+            cache.delete(fingerprint)
+            result = None
+    except (redis.RedisError, OSError) as e:
+        print(f"Result cache lookup failed: {str(e)}")
+        result = None
+    _record_lookup(result is not None)
+    return result
+
+def store_result(fingerprint: str, result: dict, cache=None):
+    """Cache a job result under its input fingerprint; best effort"""
+    cache = cache or get_result_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(fingerprint, result)
+    except (redis.RedisError, OSError) as e:
+        print(f"Failed to store cached result: {str(e)}")
+
+def read_cache_stats() -> dict:
+    """Hit and miss counts, hit rate and current size of the result cache"""
+    stats = {"backend": RESULT_CACHE_BACKEND, "hits": 0, "misses": 0, "hit_rate": None}
+    try:
+        counts = get_redis().hgetall(RESULT_CACHE_STATS_KEY)
+        stats["hits"] = int(counts.get(b"hits", 0))
+        stats["misses"] = int(counts.get(b"misses", 0))
+    except redis.RedisError:
+        pass
+    lookups = stats["hits"] + stats["misses"]
+    if lookups:
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4)
+    
+    cache = get_result_cache()
+    if cache is not None:
+        try:
+            stats.update(cache.size())
+        except (redis.RedisError, OSError):
+            pass
+    return stats
@@ -0,0 +1,164 @@
+"""
+Job retention and archival
+Moves finished jobs out of the jobs table in small, separately committed batches
+"""
+
+import enum
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import redis
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from job_stats import record_jobs_archived
+from models import Job, JobArchive, JobDedupKey, JobDependency, JobStatus
+from redis_client import get_redis
+from status_cache import invalidate_job_status
+
+# Jobs created longer ago than this are archived once finished
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "30"))
+
+# Rows moved per transaction; small batches keep row locks short
+JOB_RETENTION_BATCH_SIZE = int(os.getenv("JOB_RETENTION_BATCH_SIZE", "1000"))
+
+# Upper bound on one run so a large backlog is worked off over several runs
+JOB_RETENTION_MAX_SECONDS = float(os.getenv("JOB_RETENTION_MAX_SECONDS", "300"))
+
+# "table" copies rows into jobs_archive, "jsonl" writes gzipped JSON lines files
+JOB_ARCHIVE_MODE = os.getenv("JOB_ARCHIVE_MODE", "table")
+JOB_ARCHIVE_DIR = os.getenv("JOB_ARCHIVE_DIR", "./archive")
+
+# Redis hash holding metrics of the most recent run
+RETENTION_METRICS_KEY = "jobs:retention:last_run"
+
+ARCHIVABLE_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+def _json_default(value):
+    """Serialise enums and timestamps in archived rows"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+def archive_old_jobs(
+    db: Session,
+    older_than: Optional[datetime] = None,
+    batch_size: int = JOB_RETENTION_BATCH_SIZE,
+    mode: str = JOB_ARCHIVE_MODE,
+    max_seconds: float = JOB_RETENTION_MAX_SECONDS
+) -> dict:
+    """
+    Move finished jobs created before a cutoff out of the jobs table
+    Each batch is copied to the archive and deleted in its own transaction
+    
+    Args:
+        db (Session): Database session
+        older_than (datetime): Cutoff; defaults to JOB_RETENTION_DAYS ago
+        batch_size (int): Rows moved per transaction
+        mode (str): "table" or "jsonl"
+        max_seconds (float): Stop starting new batches after this long
+        
+    Returns:
+        dict: Run metrics (rows_archived, batches, elapsed_seconds, ...)
+    """
+    if mode not in ("table", "jsonl"):
+        raise ValueError(f"Unknown archive mode: {mode}")
+    
+    started = time.monotonic()
+    cutoff = older_than or datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    archive_path = None
+    archive_file = None
+    rows_archived = 0
+    batches = 0
+    
+    try:
+        while time.monotonic() - started < max_seconds:
+            rows = db.execute(
+                select(Job.__table__)
+                .where(Job.status.in_(ARCHIVABLE_STATUSES), Job.created_at < cutoff)
+                .order_by(Job.created_at)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            
+            archived_at = datetime.utcnow()
+            if mode == "table":
+                db.execute(insert(JobArchive), [dict(row, archived_at=archived_at) for row in rows])
+            else:
+                if archive_file is None:
+                    os.makedirs(JOB_ARCHIVE_DIR, exist_ok=True)
+                    archive_path = os.path.join(JOB_ARCHIVE_DIR, f"jobs-{archived_at:%Y%m%dT%H%M%S}.jsonl.gz")
+                    archive_file = gzip.open(archive_path, "at", encoding="utf-8")
+                for row in rows:
+                    archive_file.write(json.dumps(dict(row, archived_at=archived_at), default=_json_default) + "\n")
+                # Make the lines durable before the rows disappear: flush the
+                # text and gzip layers into the file, then the file to disk
+                archive_file.flush()
+                os.fsync(archive_file.buffer.fileobj.fileno())
+            
+            job_ids = [row["id"] for row in rows]
+            db.execute(delete(Job).where(Job.id.in_(job_ids)))
+            # Edges are only needed until the child job finishes
+            db.execute(delete(JobDependency).where(JobDependency.child_id.in_(job_ids)))
+            # Archived jobs release their idempotency keys
+            db.execute(delete(JobDedupKey).where(JobDedupKey.job_id.in_(job_ids)))
+            db.commit()
+            invalidate_job_status(job_ids)
+            record_jobs_archived((row["status"], row["type"]) for row in rows)
+            rows_archived += len(rows)
+            batches += 1
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+    
+    metrics = {
+        "rows_archived": rows_archived,
+        "batches": batches,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "cutoff": cutoff.isoformat(),
+        "mode": mode,
+        "archive_path": archive_path,
+        "finished_at": datetime.utcnow().isoformat()
+    }
+    record_retention_metrics(metrics)
+    return metrics
+
+def read_retention_metrics() -> Optional[dict]:
+    """
+    Read the metrics of the last run plus running totals
+    Returns None when no run has been recorded or Redis is unreachable
+    """
+    try:
+        client = get_redis()
+        last_run = client.hgetall(RETENTION_METRICS_KEY)
+        totals = client.hgetall(RETENTION_METRICS_KEY + ":totals")
+    except redis.RedisError:
+        return None
+    if not last_run:
+        return None
+    return {
+        "last_run": {key.decode("utf-8"): json.loads(value) for key, value in last_run.items()},
+        "totals": {key.decode("utf-8"): int(value) for key, value in totals.items()}
+    }
+
+def record_retention_metrics(metrics: dict):
+    """Store the metrics of a run in Redis for the API and dashboards"""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.delete(RETENTION_METRICS_KEY)
+        pipe.hset(RETENTION_METRICS_KEY, mapping={key: json.dumps(value) for key, value in metrics.items()})
+        pipe.hincrby(RETENTION_METRICS_KEY + ":totals", "rows_archived", metrics["rows_archived"])
+        pipe.hincrby(RETENTION_METRICS_KEY + ":totals", "runs", 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record retention metrics: {str(e)}")
@@ -0,0 +1,70 @@
+"""
+Queue routing keyed on job type
+Each JobType gets its own queue, priority, and worker pool settings so
+short jobs never wait behind long-running ones
+"""
+
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, List
+
+from models import JobType
+
+# Queue for the batch fan-out task
+DISPATCH_QUEUE = "dispatch_queue"
+
+# Queue for scheduled maintenance (retention, partitions)
+MAINTENANCE_QUEUE = "maintenance_queue"
+
+# Redis broker priorities run from 0 (first) to 9 (last)
+PRIORITY_STEPS = list(range(10))
+
+@dataclass(frozen=True)
+class QueueSettings:
+    """Routing and worker pool settings for one job type"""
+    queue: str
+    priority: int  # 0 runs first on the Redis broker
+    concurrency: int
+    prefetch_multiplier: int
+    pool: str  # "prefork" for CPU-bound work, "threads" or "gevent" for I/O-bound work
+
+_CPU_COUNT = os.cpu_count() or 2
+
+# Defaults per job type; each field can be overridden with
+# <JOB_TYPE>_QUEUE, <JOB_TYPE>_PRIORITY, <JOB_TYPE>_CONCURRENCY,
+# <JOB_TYPE>_PREFETCH_MULTIPLIER and <JOB_TYPE>_POOL environment variables
+_DEFAULT_QUEUE_SETTINGS = {
+    JobType.TEST: QueueSettings("test_queue", priority=5, concurrency=4, prefetch_multiplier=1, pool="threads"),
+    JobType.VIDEO_PROCESSING: QueueSettings("video_queue", priority=8, concurrency=max(_CPU_COUNT // 2, 1), prefetch_multiplier=1, pool="prefork"),
+    JobType.OCR_PROCESSING: QueueSettings("ocr_queue", priority=6, concurrency=_CPU_COUNT, prefetch_multiplier=1, pool="prefork"),
+    JobType.CATEGORIZATION: QueueSettings("categorization_queue", priority=2, concurrency=_CPU_COUNT, prefetch_multiplier=4, pool="prefork"),
+    JobType.MEDIA_CONSUMPTION: QueueSettings("media_queue", priority=3, concurrency=32, prefetch_multiplier=4, pool="threads"),
+}
+
+def _with_env_overrides(job_type: JobType, settings: QueueSettings) -> QueueSettings:
+    prefix = job_type.name
+    overrides = {}
+    for field, cast in (("queue", str), ("priority", int), ("concurrency", int), ("prefetch_multiplier", int), ("pool", str)):
+        value = os.getenv(f"{prefix}_{field.upper()}")
+        if value is not None:
+            overrides[field] = cast(value)
+    return replace(settings, **overrides)
+
+QUEUE_SETTINGS: Dict[JobType, QueueSettings] = {
+    job_type: _with_env_overrides(job_type, settings)
+    for job_type, settings in _DEFAULT_QUEUE_SETTINGS.items()
+}
+
+def queue_settings(job_type: JobType) -> QueueSettings:
+    """Routing and pool settings for a job type"""
+    return QUEUE_SETTINGS[job_type]
+
+def route_options(job_type: JobType) -> dict:
+    """apply_async options placing a job's task on its queue and priority"""
+    settings = QUEUE_SETTINGS[job_type]
+    return {"queue": settings.queue, "priority": settings.priority}
+
+def all_queues() -> List[str]:
+    """Every queue, ordered so a shared worker drains urgent queues first"""
+    job_queues = [settings.queue for settings in sorted(QUEUE_SETTINGS.values(), key=lambda s: s.priority)]
+    return [DISPATCH_QUEUE] + list(dict.fromkeys(job_queues)) + [MAINTENANCE_QUEUE]
@@ -0,0 +1,426 @@
+"""
+Full-text search over OCR and transcription output
+Finished OCR jobs and saved transcriptions are queued in Redis and indexed
+in batches by a worker, one document at a time rather than by rebuilding.
+PostgreSQL ranks with a generated tsvector column and a GIN index; other
+databases (SQLite in tests) use the inverted index in search_postings
+"""
+
+import html
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from sqlalchemy import bindparam, case, delete, event, func, insert, literal_column, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from metrics import SEARCH_DOCUMENTS_INDEXED
+from models import CategoryAssignment, Job, JobStatus, SearchDocument, SearchPosting
+from redis_client import get_async_redis, get_redis
+from transcriptions import read_head_text
+
+# PostgreSQL text search configuration (stemming and stop words)
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "english")
+
+# Documents indexed per batch (one transaction); a full batch waiting in
+# the queue is flushed straight away instead of at the next beat run
+SEARCH_INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "200"))
+
+# Characters of a document searched for the snippet of a result
+SEARCH_SNIPPET_SCAN_CHARS = int(os.getenv("SEARCH_SNIPPET_SCAN_CHARS", "100000"))
+
+SEARCH_PENDING_KEY = "search:pending"
+
+# Kinds of pipeline output that are indexed
+SEARCH_SOURCES = ("ocr", "transcription")
+
+# Terms of a query beyond this are ignored by the postings index
+SEARCH_MAX_QUERY_TERMS = 16
+
+# Longer words (e.g. OCR noise) are not indexed
+MAX_TERM_LENGTH = 64
+
+# Title terms count this many times their occurrences in the postings index
+TITLE_TERM_WEIGHT = 5
+
+# BM25 parameters of the postings ranking
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_CHARS = 200
+
+# Markers ts_headline puts around matches; control characters that are
+# stripped from the text first, so the headline can be HTML-escaped and the
+# markers then turned into <b></b> like highlight() does
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+
+TOKEN_PATTERN = re.compile(rf"\b\w{{1,{MAX_TERM_LENGTH}}}\b")
+
+if not re.fullmatch(r"[A-Za-z_]+", SEARCH_TEXT_CONFIG):
+    raise ValueError(f"Invalid text search configuration: {SEARCH_TEXT_CONFIG}")
+
+TS_CONFIG = literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig")
+SEARCH_VECTOR = literal_column("search_documents.search_vector")
+
+def uses_tsvector(dialect_name: str) -> bool:
+    """Whether a database ranks with its own full-text search"""
+    return dialect_name == "postgresql"
+
+@event.listens_for(SearchDocument.__table__, "after_create")
+def create_search_vector(target, connection, **kw):
+    """Add the weighted tsvector column and its GIN index on PostgreSQL"""
+    if not uses_tsvector(connection.dialect.name):
+        return
+    connection.execute(text(
+        "ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', body), 'B')) STORED"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_search_vector "
+        "ON search_documents USING GIN (search_vector)"
+    ))
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word terms of a text, as stored in the postings index"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def document_key(source: str, source_id: str) -> str:
+    """Search document id of a piece of pipeline output"""
+    return f"{source}:{source_id}"
+
+def load_ocr_output(db: Session, job_id: str) -> Optional[Tuple[str, str]]:
+    """Title and text of a completed OCR job, or None if it has none"""
+    row = db.query(Job.status, Job.payload, Job.result).filter(Job.id == job_id).first()
+    if row is None or row.status != JobStatus.COMPLETED:
+        return None
+    path = (row.result or {}).get("text_path")
+    if not path or not os.path.exists(path):
+        return None
+    payload = row.payload or {}
+    title = payload.get("title") or os.path.basename(payload.get("source_dir") or "") or f"OCR job {job_id}"
+    with open(path, encoding="utf-8") as document:
+        return title, document.read()
+
+def load_transcription(db: Session, transcription_id: str) -> Optional[Tuple[str, str]]:
+    """Title and head text of a transcription, or None if it is gone"""
+    found = read_head_text(db, transcription_id)
+    if found is None:
+        return None
+    transcription, text = found
+    return transcription.title or f"Transcription {transcription_id}", text
+
+SOURCE_LOADERS = {
+    "ocr": load_ocr_output,
+    "transcription": load_transcription,
+}
+
+def _term_counts(title: str, body: str) -> Tuple[Counter, int]:
+    """Postings frequencies of a document, title terms weighted up, and its length in terms"""
+    counts = Counter(tokenize(body))
+    length = sum(counts.values())
+    for term, frequency in Counter(tokenize(title)).items():
+        counts[term] += frequency * TITLE_TERM_WEIGHT
+    return counts, length
+
+def index_documents(db: Session, keys: Iterable[str]) -> Dict[str, int]:
+    """
+    Bring the indexed text of some documents up to date with their sources
+    Only postings whose frequency changed are written, so re-indexing a
+    large transcription after a small edit touches a handful of rows.
+    Documents whose source no longer exists are removed from the index.
+    Everything is written in one transaction
+    
+    Args:
+        keys (iterable): Search document ids, see document_key
+    
+    Returns:
+        dict: Documents indexed and removed
+    """
+    keys = list(dict.fromkeys(keys))
+    postings_index = not uses_tsvector(db.get_bind().dialect.name)
+    documents = SearchDocument.__table__
+    postings = SearchPosting.__table__
+    
+    existing = set(db.execute(select(documents.c.id).where(documents.c.id.in_(keys))).scalars())
+    stored = {}
+    if postings_index and existing:
+        for document_id, term, frequency in db.execute(
+            select(postings.c.document_id, postings.c.term, postings.c.frequency)
+            .where(postings.c.document_id.in_(existing))
+        ):
+            stored.setdefault(document_id, {})[term] = frequency
+    
+    new_documents, changed_documents = [], []
+    new_postings, changed_postings, stale_postings = [], [], []
+    for key in keys:
+        source, _, source_id = key.partition(":")
+        if source not in SOURCE_LOADERS:
+            print(f"Skipping search document of unknown source: {key}")
+            continue
+        content = SOURCE_LOADERS[source](db, source_id)
+        if content is None:
+            continue
+        title, body = content
+        counts, length = _term_counts(title, body)
+        document = {
+            "b_id": key,
+            "source": source,
+            "source_id": source_id,
+            "title": title,
+            "body": body,
+            "length": length,
+            "indexed_at": datetime.utcnow()
+        }
+        (changed_documents if key in existing else new_documents).append(document)
+        if not postings_index:
+            continue
+        
+        previous = stored.get(key, {})
+        for term, frequency in counts.items():
+            if term not in previous:
+                new_postings.append({"term": term, "document_id": key, "frequency": frequency})
+            elif previous.pop(term) != frequency:
+                changed_postings.append({"b_term": term, "b_document_id": key, "frequency": frequency})
+        stale_postings.extend({"b_term": term, "b_document_id": key} for term in previous)
+    
+    indexed = {document["b_id"] for document in new_documents + changed_documents}
+    removed = [key for key in existing if key not in indexed]
+    if removed:
+        db.execute(delete(CategoryAssignment.__table__).where(CategoryAssignment.document_id.in_(removed)))
+        db.execute(delete(postings).where(postings.c.document_id.in_(removed)))
+        db.execute(delete(documents).where(documents.c.id.in_(removed)))
+    if stale_postings:
+        db.execute(
+            delete(postings).where(postings.c.term == bindparam("b_term"), postings.c.document_id == bindparam("b_document_id")),
+            stale_postings
+        )
+    if changed_postings:
+        db.execute(
+            update(postings).where(postings.c.term == bindparam("b_term"), postings.c.document_id == bindparam("b_document_id")),
+            changed_postings
+        )
+    if changed_documents:
+        db.execute(update(documents).where(documents.c.id == bindparam("b_id")), changed_documents)
+    if new_documents:
+        db.execute(insert(documents), [
+            {("id" if name == "b_id" else name): value for name, value in document.items()}
+            for document in new_documents
+        ])
+    if new_postings:
+        db.execute(insert(postings), new_postings)
+    db.commit()
+    
+    for document in new_documents + changed_documents:
+        SEARCH_DOCUMENTS_INDEXED.labels(document["source"]).inc()
+    return {"indexed": len(indexed), "removed": len(removed)}
+
+def index_now(keys: List[str]):
+    """Index documents in a session of their own; used when the queue is unavailable"""
+    db = SessionLocal()
+    try:
+        index_documents(db, keys)
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to index {', '.join(keys)} for search: {str(e)}")
+    finally:
+        db.close()
+
+def queue_for_indexing(keys: List[str]) -> Optional[int]:
+    """
+    Add documents to the set waiting for the indexer
+    A set, so a document saved repeatedly before the next flush is indexed once
+    
+    Returns:
+        int: Documents waiting, or None when Redis is unavailable
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(SEARCH_PENDING_KEY, *keys)
+        pipe.scard(SEARCH_PENDING_KEY)
+        return pipe.execute()[-1]
+    except redis.RedisError as e:
+        print(f"Failed to queue search indexing: {str(e)}")
+        return None
+
+async def queue_for_indexing_async(keys: List[str]) -> Optional[int]:
+    """queue_for_indexing for async code"""
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        pipe.sadd(SEARCH_PENDING_KEY, *keys)
+        pipe.scard(SEARCH_PENDING_KEY)
+        return (await pipe.execute())[-1]
+    except redis.RedisError as e:
+        print(f"Failed to queue search indexing: {str(e)}")
+        return None
+
+def flush_pending(db: Session, batch_size: int = SEARCH_INDEX_BATCH_SIZE, max_batches: int = 100) -> Dict[str, int]:
+    """
+    Index the documents waiting in the queue, batch_size at a time
+    A batch that fails to index is put back for the next run
+    
+    Returns:
+        dict: Documents indexed and removed, and batches written
+    """
+    totals = {"indexed": 0, "removed": 0, "batches": 0}
+    for _ in range(max_batches):
+        keys = [key.decode("utf-8") for key in get_redis().spop(SEARCH_PENDING_KEY, batch_size) or []]
+        if not keys:
+            break
+        try:
+            counts = index_documents(db, keys)
+        except Exception:
+            db.rollback()
+            get_redis().sadd(SEARCH_PENDING_KEY, *keys)
+            raise
+        totals["indexed"] += counts["indexed"]
+        totals["removed"] += counts["removed"]
+        totals["batches"] += 1
+        if len(keys) < batch_size:
+            break
+    return totals
+
+def highlight(excerpt: str, terms: List[str]) -> str:
+    """
+    Snippet of text around the first match of any term
+    Escaped for HTML, with the matches wrapped in <b></b>
+    """
+    pattern = re.compile(r"(?<!\w)(" + "|".join(map(re.escape, terms)) + r")(?!\w)", re.IGNORECASE)
+    match = pattern.search(excerpt)
+    start = max(0, match.start() - SNIPPET_CHARS // 4) if match else 0
+    window = " ".join(excerpt[start:start + SNIPPET_CHARS].split())
+    parts = []
+    position = 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[position:match.start()]))
+        parts.append(f"<b>{html.escape(match.group())}</b>")
+        position = match.end()
+    parts.append(html.escape(window[position:]))
+    return "".join(parts)
+
+def escape_headline(headline: str) -> str:
+    """A ts_headline fragment escaped for HTML, with the matches wrapped in <b></b>"""
+    return html.escape(headline).replace(HEADLINE_START, "<b>").replace(HEADLINE_STOP, "</b>")
+
+def _result(row, score: float, snippet: str) -> dict:
+    return {
+        "document_id": row.id,
+        "source": row.source,
+        "source_id": row.source_id,
+        "title": row.title,
+        "score": round(float(score), 6),
+        "snippet": snippet
+    }
+
+async def _search_tsvector(db: AsyncSession, query: str, source: Optional[str], limit: int, offset: int) -> dict:
+    """Rank with the GIN-indexed tsvector column (PostgreSQL)"""
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, query)
+    # Normalised by document length, so long books do not outrank everything
+    rank = func.ts_rank_cd(SEARCH_VECTOR, tsquery, 1)
+    conditions = [SEARCH_VECTOR.op("@@")(tsquery)]
+    if source:
+        conditions.append(SearchDocument.source == source)
+    
+    total = await db.scalar(select(func.count()).select_from(SearchDocument).where(*conditions))
+    rows = (await db.execute(
+        select(SearchDocument.id, SearchDocument.source, SearchDocument.source_id, SearchDocument.title, rank.label("score"))
+        .where(*conditions)
+        .order_by(rank.desc(), SearchDocument.id)
+        .limit(limit)
+        .offset(offset)
+    )).all()
+    
+    # Headlines only for the page of results, over the start of each text
+    snippets = {}
+    if rows:
+        excerpt = func.translate(func.left(SearchDocument.body, SEARCH_SNIPPET_SCAN_CHARS), HEADLINE_START + HEADLINE_STOP, "")
+        options = f"MaxFragments=1, MaxWords=35, MinWords=15, StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}"
+        snippets = dict((await db.execute(
+            select(SearchDocument.id, func.ts_headline(TS_CONFIG, excerpt, tsquery, options))
+            .where(SearchDocument.id.in_([row.id for row in rows]))
+        )).all())
+    return {
+        "total": total,
+        "results": [_result(row, row.score, escape_headline(snippets.get(row.id, ""))) for row in rows]
+    }
+
+async def _search_postings(db: AsyncSession, query: str, source: Optional[str], limit: int, offset: int) -> dict:
+    """
+    Rank with BM25 over the postings index
+    Every query term must occur in a result; there is no stemming or query syntax
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:SEARCH_MAX_QUERY_TERMS]
+    empty = {"total": 0, "results": []}
+    if not terms:
+        return empty
+    
+    document_count, average_length = (await db.execute(
+        select(func.count(), func.avg(SearchDocument.length))
+    )).one()
+    frequencies = dict((await db.execute(
+        select(SearchPosting.term, func.count())
+        .where(SearchPosting.term.in_(terms))
+        .group_by(SearchPosting.term)
+    )).all())
+    if len(frequencies) < len(terms):
+        return empty
+    
+    idf = {
+        term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+        for term, frequency in frequencies.items()
+    }
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * SearchDocument.length / max(float(average_length or 1), 1.0))
+    score = func.sum(
+        case(idf, value=SearchPosting.term) * SearchPosting.frequency * (BM25_K1 + 1)
+        / (SearchPosting.frequency + length_norm)
+    ).label("score")
+    matches = (
+        select(SearchPosting.document_id, score)
+        .join(SearchDocument, SearchDocument.id == SearchPosting.document_id)
+        .where(SearchPosting.term.in_(terms), *([SearchDocument.source == source] if source else []))
+        .group_by(SearchPosting.document_id)
+        .having(func.count() == len(terms))
+    )
+    
+    total = await db.scalar(select(func.count()).select_from(matches.subquery()))
+    page = (await db.execute(
+        matches.order_by(score.desc(), SearchPosting.document_id).limit(limit).offset(offset)
+    )).all()
+    if not page:
+        return {"total": total, "results": []}
+    
+    documents = {row.id: row for row in (await db.execute(
+        select(
+            SearchDocument.id,
+            SearchDocument.source,
+            SearchDocument.source_id,
+            SearchDocument.title,
+            func.substr(SearchDocument.body, 1, SEARCH_SNIPPET_SCAN_CHARS).label("excerpt")
+        ).where(SearchDocument.id.in_([row.document_id for row in page]))
+    )).all()}
+    return {
+        "total": total,
+        "results": [
+            _result(documents[row.document_id], row.score, highlight(documents[row.document_id].excerpt, terms))
+            for row in page
+        ]
+    }
+
+async def search_documents(db: AsyncSession, query: str, source: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked page of the indexed documents matching a query
+    
+    Returns:
+        dict: total matching documents and the results of the page, each
+        with its document and source ids, title, score and snippet
+    """
+    if uses_tsvector(db.bind.dialect.name):
+        return await _search_tsvector(db, query, source, limit, offset)
+    return await _search_postings(db, query, source, limit, offset)
@@ -0,0 +1,92 @@
+"""
+Compact job serialization
+Job responses are built from column-only queries and rendered by orjson, which
+encodes enums and datetimes itself, so rows never become ORM objects
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, select
+
+from models import JOB_FIELDS, Job
+
+# Fields of each job in /gather/jobs unless the request asks for others
+LISTING_FIELDS = ("job_id", "type", "status", "progress", "created_at", "completed_at")
+
+# Fields of /jobs/{job_id}/status unless the request asks for others
+STATUS_FIELDS = LISTING_FIELDS + ("cache_hit", "duration_seconds")
+
+# Fields of each job in /jobs/status:batch unless the request asks for others;
+# computed fields are not offered so unchanged jobs keep the same ETag
+BATCH_STATUS_FIELDS = ("job_id", "status", "progress", "completed_at")
+
+# Status fields computed per request rather than read from a column
+COMPUTED_STATUS_FIELDS = ("duration_seconds",)
+
+def parse_fields(fields: Optional[str], default: Sequence[str], computed: Sequence[str] = ()) -> Tuple[str, ...]:
+    """
+    Field names requested with a comma-separated fields= parameter
+    An absent or empty parameter selects the default fields
+    
+    Raises:
+        ValueError: If a requested field is not part of the job schema
+    """
+    if not fields:
+        return tuple(default)
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in JOB_FIELDS and name not in computed]
+    if unknown:
+        allowed = ", ".join(list(JOB_FIELDS) + list(computed))
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {allowed}")
+    return requested or tuple(default)
+
+def job_columns(fields: Iterable[str]) -> List:
+    """Job columns behind the stored fields among fields, in the same order"""
+    return [getattr(Job, JOB_FIELDS[name]) for name in fields if name in JOB_FIELDS]
+
+@lru_cache(maxsize=256)
+def job_status_query(fields: Tuple[str, ...]):
+    """
+    Cached statement selecting one job's status and timestamps followed by
+    the columns of fields; the job id is bound as :job_id
+    """
+    return select(Job.status, Job.created_at, Job.completed_at, *job_columns(fields)).where(Job.id == bindparam("job_id"))
+
+def rows_to_dicts(rows, fields: Sequence[str]) -> List[dict]:
+    """
+    Job dicts from rows selected with job_columns(fields)
+    Columns selected after those (e.g. for a cursor) are ignored
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+def json_response(content, status_code: int = 200) -> ORJSONResponse:
+    """
+    Response rendered straight by orjson
+    Returning it skips FastAPI's jsonable_encoder pass over the content
+    """
+    return ORJSONResponse(content, status_code=status_code)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names etag, by weak comparison as it requires"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+def etag_response(content, if_none_match: Optional[str] = None) -> Response:
+    """
+    JSON response carrying an ETag of its body
+    Returns 304 without a body when if_none_match already names that ETag,
+    so pollers of an unchanged result only pay for the lookup
+    """
+    body = orjson.dumps(content)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,179 @@
+"""
+Read-through cache for job status lookups
+Finished jobs never change again, so they are cached for a long time; active
+jobs only briefly. Status transitions evict entries explicitly
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional
+
+import orjson
+import redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from metrics import JOB_STATUS_CACHE_LOOKUPS
+from models import JobStatus, JobType
+from redis_client import get_async_redis, get_redis
+from serialization import COMPUTED_STATUS_FIELDS, STATUS_FIELDS, job_status_query
+
+# "redis" (shared by every API process), "local" (in-process LRU) or "none"
+JOB_STATUS_CACHE_BACKEND = os.getenv("JOB_STATUS_CACHE_BACKEND", "redis")
+
+# Seconds a finished job stays cached, and an active one
+JOB_STATUS_CACHE_TERMINAL_TTL = float(os.getenv("JOB_STATUS_CACHE_TERMINAL_TTL", str(24 * 60 * 60)))
+JOB_STATUS_CACHE_ACTIVE_TTL = float(os.getenv("JOB_STATUS_CACHE_ACTIVE_TTL", "2"))
+
+# Bound on the in-process LRU; least recently used entries are evicted first
+JOB_STATUS_CACHE_MAX_ENTRIES = int(os.getenv("JOB_STATUS_CACHE_MAX_ENTRIES", "10000"))
+
+JOB_STATUS_CACHE_PREFIX = "job:status:"
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+# Fields held per entry; payload and result can be large and are read from the table
+CACHED_STATUS_FIELDS = tuple(name for name in STATUS_FIELDS if name not in COMPUTED_STATUS_FIELDS)
+
+def status_ttl(status: JobStatus) -> float:
+    """How long an entry for a job in this status may be served"""
+    return JOB_STATUS_CACHE_TERMINAL_TTL if status in TERMINAL_STATUSES else JOB_STATUS_CACHE_ACTIVE_TTL
+
+def encode_entry(entry: dict) -> bytes:
+    """Serialize a cache entry for Redis"""
+    return orjson.dumps(entry)
+
+def decode_entry(value: bytes) -> dict:
+    """Restore the enums and datetimes of an entry read from Redis"""
+    entry = orjson.loads(value)
+    entry["type"] = JobType(entry["type"])
+    entry["status"] = JobStatus(entry["status"])
+    entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+    if entry["completed_at"] is not None:
+        entry["completed_at"] = datetime.fromisoformat(entry["completed_at"])
+    return entry
+
+class RedisStatusCache:
+    """Entries in Redis strings that expire on their own; shared by all processes"""
+    name = "redis"
+    
+    async def get(self, job_id: str) -> Optional[dict]:
+        value = await get_async_redis().get(JOB_STATUS_CACHE_PREFIX + job_id)
+        return decode_entry(value) if value is not None else None
+    
+    async def put(self, job_id: str, entry: dict, ttl: float):
+        await get_async_redis().set(JOB_STATUS_CACHE_PREFIX + job_id, encode_entry(entry), px=int(ttl * 1000))
+    
+    async def delete_async(self, job_ids: list):
+        await get_async_redis().delete(*[JOB_STATUS_CACHE_PREFIX + job_id for job_id in job_ids])
+    
+    def delete(self, job_ids: list):
+        get_redis().delete(*[JOB_STATUS_CACHE_PREFIX + job_id for job_id in job_ids])
+
+class LocalStatusCache:
+    """
+    In-process LRU with per-entry expiry
+    Evictions from other processes (workers) cannot reach it, so outside
+    tests and single-process setups only the TTLs bound staleness
+    """
+    name = "local"
+    
+    def __init__(self, max_entries: int = JOB_STATUS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    async def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            item = self._entries.get(job_id)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._entries[job_id]
+                return None
+            self._entries.move_to_end(job_id)
+            return dict(item[1])
+    
+    async def put(self, job_id: str, entry: dict, ttl: float):
+        with self._lock:
+            self._entries[job_id] = (time.monotonic() + ttl, dict(entry))
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    async def delete_async(self, job_ids: list):
+        self.delete(job_ids)
+    
+    def delete(self, job_ids: list):
+        with self._lock:
+            for job_id in job_ids:
+                self._entries.pop(job_id, None)
+
+STATUS_CACHE_BACKENDS = {
+    RedisStatusCache.name: RedisStatusCache,
+    LocalStatusCache.name: LocalStatusCache,
+}
+
+_status_cache = None
+
+def get_status_cache():
+    """The process-wide cache backend, or None when caching is disabled"""
+    global _status_cache
+    if _status_cache is None and JOB_STATUS_CACHE_BACKEND != "none":
+        if JOB_STATUS_CACHE_BACKEND not in STATUS_CACHE_BACKENDS:
+            raise ValueError(f"Unknown job status cache backend: {JOB_STATUS_CACHE_BACKEND}")
+        _status_cache = STATUS_CACHE_BACKENDS[JOB_STATUS_CACHE_BACKEND]()
+    return _status_cache
+
+async def read_job_status(db: AsyncSession, job_id: str) -> Optional[dict]:
+    """
+    CACHED_STATUS_FIELDS of a job, from the cache or else from the jobs table
+    Returns None for unknown jobs (which are not cached); cache errors fall
+    through to the table
+    """
+    cache = get_status_cache()
+    if cache is not None:
+        try:
+            entry = await cache.get(job_id)
+        except redis.RedisError:
+            entry = None
+        if entry is not None:
+            JOB_STATUS_CACHE_LOOKUPS.labels("hit").inc()
+            return entry
+        JOB_STATUS_CACHE_LOOKUPS.labels("miss").inc()
+    
+    row = (await db.execute(job_status_query(CACHED_STATUS_FIELDS), {"job_id": job_id})).first()
+    if row is None:
+        return None
+    entry = dict(zip(CACHED_STATUS_FIELDS, row[3:]))
+    
+    if cache is not None:
+        try:
+            await cache.put(job_id, entry, status_ttl(entry["status"]))
+        except redis.RedisError as e:
+            print(f"Failed to cache status of job {job_id}: {str(e)}")
+    return entry
+
+def invalidate_job_status(job_ids: Iterable[str]):
+    """Evict cached statuses after the jobs changed; best effort"""
+    job_ids = list(job_ids)
+    cache = get_status_cache()
+    if cache is None or not job_ids:
+        return
+    try:
+        cache.delete(job_ids)
+    except redis.RedisError as e:
+        print(f"Failed to evict cached job statuses: {str(e)}")
+
+async def invalidate_job_status_async(job_ids: Iterable[str]):
+    """Evict cached statuses from async code without blocking the event loop"""
+    job_ids = list(job_ids)
+    cache = get_status_cache()
+    if cache is None or not job_ids:
+        return
+    try:
+        await cache.delete_async(job_ids)
+    except redis.RedisError as e:
+        print(f"Failed to evict cached job statuses: {str(e)}")
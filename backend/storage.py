@@ -0,0 +1,74 @@
+"""
+Artifact storage for job outputs
+Files produced by jobs live under ARTIFACT_ROOT, one directory per job
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Union
+
+# Root directory for job outputs (OCR text, processed media, ...)
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", "./artifacts")
+
+# Root directory job inputs (scans, source media) are read from; payload
+# paths elsewhere are rejected, since job outputs are served to clients
+INPUT_ROOT = os.getenv("INPUT_ROOT", "./inputs")
+
+class InputPathError(ValueError):
+    """Raised for job input paths outside INPUT_ROOT"""
+
+def resolve_input(path: str) -> str:
+    """
+    Real path of a job input file or directory named in a payload
+    Relative paths are taken from INPUT_ROOT; symlinks are followed before
+    checking, so a link cannot lead out of it
+    """
+    root = os.path.realpath(INPUT_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise InputPathError(f"Input path outside INPUT_ROOT: {path}")
+    return resolved
+
+def job_artifact_dir(job_id: str) -> str:
+    """Directory holding the outputs of a job, created on first use"""
+    path = os.path.join(ARTIFACT_ROOT, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def link_into_job(path: str, job_id: str) -> str:
+    """
+    Give a job its own name for a file another job produced
+    The file is hard-linked (copied across file systems) into the job's
+    artifact directory, so it outlives the other job's directory
+    """
+    target = os.path.join(job_artifact_dir(job_id), os.path.basename(path))
+    temp_path = target + ".link"
+    if os.path.exists(temp_path):
+        os.unlink(temp_path)
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copyfile(path, temp_path)
+    os.replace(temp_path, target)
+    return target
+
+def write_atomic(path: str, data: Union[str, bytes]):
+    """
+    Write a file so readers never observe it half-written
+    The data goes to a temporary file in the same directory first and is
+    renamed into place
+    """
+    directory = os.path.dirname(path) or "."
+    mode = "w" if isinstance(data, str) else "wb"
+    encoding = "utf-8" if isinstance(data, str) else None
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
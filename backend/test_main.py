@@ -6,22 +6,57 @@ Tests database connections, Redis connectivity, Celery workers, and API endpoint
 import pytest
 import redis
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from celery.result import AsyncResult
+import asyncio
+import os
+import random
 import time
 import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 
-from main import app, get_db
-from database import Base
-from models import Job, JobStatus, JobType
-from celery_app import celery_app, test_job_task
+import main
+from main import app
+from database import Base, get_async_db, get_db, to_async_url
+from models import Artifact, Job, JobArchive, JobDedupKey, JobStatus, JobType, TranscriptionRevision
+from celery_app import categorize_documents_task, celery_app, ocr_finalize_task, ocr_page_chunk_task, process_video_task, route_task, test_job_task
+from events import SUBSCRIBER_QUEUE_SIZE, JobEventBroadcaster, format_sse
+from cancellation import JobCancelled
+from categorization import DEFAULT_CATEGORY_PROFILES, CategoryModel
+from video import CopySegmentProcessor, process_video
+from storage import InputPathError
+from result_cache import DiskResultCache, input_fingerprint
+from job_stats import RECONCILE_LOCK_KEY, duration_bucket, histogram_percentile, request_reconcile
+from media import ArtifactNotFound, RangeNotSatisfiable, parse_range, register_artifact
+from metrics import task_finished, task_started
+from prometheus_client import REGISTRY
+from ocr import FakeOCREngine, assemble_document, chunk_pages, list_pages, ocr_pages, page_filename
+from progress import ProgressReporter
+from pipelines import PipelineError, advance_pipeline, cancel_dependents, create_pipeline, order_stages, release_ready_jobs
+from retention import archive_old_jobs
+from search import document_key, escape_headline, highlight, index_documents
+from status_cache import LocalStatusCache, status_ttl
+from transcriptions import HeadCache
+from wikitext import IN_COMMENT, TokenCache, WikitextDocument, render_block_html, split_blocks, tokenize_block
+from partitions import detach_old_job_partitions, ensure_job_partitions, partition_bounds
+from routing import MAINTENANCE_QUEUE, queue_settings, route_options
+from worker_pools import worker_command
 
 # Test database configuration
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"  # Use SQLite for testing
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine over the same file for the async endpoints; NullPool because
+# each TestClient request runs on its own event loop
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 def override_get_db():
     """Override database dependency for testing"""
     try:
@@ -30,8 +65,14 @@ def override_get_db():
     finally:
         db.close()
 
-# Override the database dependency
+async def override_get_async_db():
+    """Override async database dependency for testing"""
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+# Override the database dependencies
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 # Create test client
 client = TestClient(app)
@@ -118,6 +159,14 @@ class TestDatabaseConnection:
             
         finally:
             db.close()
+    
+    def test_async_url_mapping(self):
+        """
+        Test that synchronous database URLs map onto asyncio drivers
+        Verifies the async engine targets the same database as the sync one
+        """
+        assert to_async_url("postgresql://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
 
 class TestRedisConnection:
     """Test Redis connectivity for Celery broker"""
@@ -209,6 +258,50 @@ class TestCeleryWorker:
             
         except Exception as e:
             pytest.skip(f"Celery not available for testing: {str(e)}")
+    
+    def test_test_job_duration_from_payload(self, setup_database):
+        """
+        Test that a test job's run time can be set through its payload
+        Verifies load tests can run test jobs without the 20 second default
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.QUEUED, progress=0, payload={"duration_seconds": 0})
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        
+        started = time.monotonic()
+        result = test_job_task.run(job_id)
+        assert time.monotonic() - started < 5
+        assert result["status"] == "completed"
+        assert result["duration_seconds"] == 0
+
+class TestQueueRouting:
+    """Test per-job-type queue routing and worker pool settings"""
+    
+    def test_every_job_type_has_its_own_queue(self):
+        """
+        Test that each job type routes to a distinct queue
+        Verifies long video jobs cannot block short categorization jobs
+        """
+        queues = [queue_settings(job_type).queue for job_type in JobType]
+        assert len(set(queues)) == len(queues)
+    
+    def test_job_tasks_are_routed_by_type(self):
+        """Test that the Celery router sends job tasks to their type's queue and priority"""
+        assert route_task(test_job_task.name) == route_options(JobType.TEST)
+        assert route_task("celery_app.cleanup_old_jobs") == {"queue": MAINTENANCE_QUEUE}
+    
+    def test_worker_command_uses_pool_settings(self):
+        """Test that dedicated pools start with their queue, pool type and prefetch"""
+        settings = queue_settings(JobType.OCR_PROCESSING)
+        command = worker_command("ocr_processing", settings)
+        assert command[command.index("--queues") + 1] == settings.queue
+        assert command[command.index("--pool") + 1] == settings.pool
+        assert command[command.index("--prefetch-multiplier") + 1] == str(settings.prefetch_multiplier)
 
 class TestAPIEndpoints:
     """Test all FastAPI endpoints for correct responses"""
@@ -321,6 +414,1729 @@ class TestAPIEndpoints:
         assert response.status_code == 200
         assert response.json()["section"] == "consume"
 
+class TestJobListingPagination:
+    """Test keyset pagination and filtering of the job listing endpoint"""
+    
+    def _seed_jobs(self, count, job_type=JobType.CATEGORIZATION, status=JobStatus.COMPLETED):
+        """Insert jobs with distinct creation times directly into the test database"""
+        db = TestingSessionLocal()
+        try:
+            base = datetime(2001, 1, 1)
+            job_ids = []
+            for i in range(count):
+                job = Job(
+                    id=str(uuid.uuid4()),
+                    type=job_type,
+                    status=status,
+                    progress=100,
+                    created_at=base + timedelta(minutes=i)
+                )
+                db.add(job)
+                job_ids.append(job.id)
+            db.commit()
+            return job_ids
+        finally:
+            db.close()
+    
+    def test_pages_cover_all_jobs_without_duplicates(self, setup_database):
+        """
+        Test that following next_cursor walks every matching job exactly once
+        Verifies newest-first ordering across page boundaries
+        """
+        job_ids = self._seed_jobs(5)
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2, "type": "categorization"}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/gather/jobs", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data["jobs"]) <= 2
+            seen.extend(job["job_id"] for job in data["jobs"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert seen == list(reversed(job_ids))
+    
+    def test_status_filter_and_count(self, setup_database):
+        """
+        Test that status filters narrow both the page and the total count
+        Verifies total_count reflects the filter rather than the page size
+        """
+        main._job_count_cache.clear()
+        self._seed_jobs(3, job_type=JobType.MEDIA_CONSUMPTION, status=JobStatus.FAILED)
+        
+        response = client.get("/gather/jobs", params={"status": "failed", "limit": 1})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["jobs"]) == 1
+        assert data["jobs"][0]["status"] == "failed"
+        assert data["total_count"] >= 3
+        assert data["next_cursor"] is not None
+    
+    def test_invalid_cursor_rejected(self):
+        """
+        Test that a malformed cursor is reported as a client error
+        """
+        response = client.get("/gather/jobs", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+    
+    def test_fields_projection(self, setup_database):
+        """
+        Test that fields= narrows the listing and the status response
+        Verifies projected pages still paginate and unknown fields are rejected
+        """
+        job_ids = self._seed_jobs(3, job_type=JobType.VIDEO_PROCESSING)
+        
+        response = client.get("/gather/jobs", params={"type": "video_processing", "limit": 2, "fields": "job_id,status"})
+        assert response.status_code == 200
+        data = response.json()
+        assert all(set(job) == {"job_id", "status"} for job in data["jobs"])
+        assert data["jobs"][0]["status"] == "completed"
+        assert data["next_cursor"] is not None
+        
+        response = client.get(f"/jobs/{job_ids[0]}/status", params={"fields": "status,created_at,duration_seconds"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "completed",
+            "created_at": "2001-01-01T00:00:00",
+            "duration_seconds": response.json()["duration_seconds"]
+        }
+        
+        assert client.get("/gather/jobs", params={"fields": "job_id,secret"}).status_code == 400
+        assert client.get(f"/jobs/{job_ids[0]}/status", params={"fields": "duration"}).status_code == 400
+
+class TestBatchStatusLookup:
+    """Test looking up the status of many jobs in one request"""
+    
+    def test_statuses_in_request_order_with_missing(self, setup_database):
+        """
+        Test that the batch lookup returns every known job and lists unknown ids
+        Verifies request order is kept and duplicate ids are answered once
+        """
+        db = TestingSessionLocal()
+        try:
+            jobs = [
+                Job(id=str(uuid.uuid4()), type=JobType.TEST, status=status, progress=progress)
+                for status, progress in [(JobStatus.QUEUED, 0), (JobStatus.COMPLETED, 100)]
+            ]
+            db.add_all(jobs)
+            db.commit()
+            job_ids = [job.id for job in jobs]
+        finally:
+            db.close()
+        unknown = str(uuid.uuid4())
+        
+        response = client.post("/jobs/status:batch", json={"job_ids": [job_ids[1], unknown, job_ids[0], job_ids[1]]})
+        assert response.status_code == 200
+        data = response.json()
+        assert [job["job_id"] for job in data["jobs"]] == [job_ids[1], job_ids[0]]
+        assert data["jobs"][0]["status"] == "completed"
+        assert data["jobs"][0]["progress"] == 100
+        assert data["missing"] == [unknown]
+        
+        response = client.post("/jobs/status:batch", json={"job_ids": job_ids, "fields": "job_id,type"})
+        assert response.json()["jobs"][0] == {"job_id": job_ids[0], "type": "test"}
+    
+    def test_etag_returns_not_modified_until_a_job_changes(self, setup_database):
+        """
+        Test that If-None-Match with the current ETag returns 304 without a body
+        Verifies the ETag changes once one of the jobs changes
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.QUEUED, progress=0)
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        body = {"job_ids": [job_id]}
+        
+        etag = client.post("/jobs/status:batch", json=body).headers["etag"]
+        response = client.post("/jobs/status:batch", json=body, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        
+        db = TestingSessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id).update({"status": JobStatus.COMPLETED, "progress": 100})
+            db.commit()
+        finally:
+            db.close()
+        
+        response = client.post("/jobs/status:batch", json=body, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["jobs"][0]["status"] == "completed"
+    
+    def test_batch_size_limit(self):
+        """
+        Test that oversized and empty lookups are rejected
+        """
+        assert client.post("/jobs/status:batch", json={"job_ids": []}).status_code == 422
+        too_many = [str(i) for i in range(main.MAX_STATUS_BATCH_SIZE + 1)]
+        assert client.post("/jobs/status:batch", json={"job_ids": too_many}).status_code == 422
+
+class TestJobStatusCache:
+    """Test the read-through cache in front of job status lookups"""
+    
+    @pytest.fixture
+    def local_cache(self, monkeypatch):
+        cache = LocalStatusCache()
+        monkeypatch.setattr("status_cache._status_cache", cache)
+        return cache
+    
+    def test_finished_job_served_from_cache(self, setup_database, local_cache):
+        """
+        Test that a finished job's status is answered from the cache
+        Verifies the cached entry survives the row going away
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.COMPLETED, progress=100,
+                      completed_at=datetime.utcnow())
+            db.add(job)
+            db.commit()
+            job_id = job.id
+            
+            first = client.get(f"/jobs/{job_id}/status").json()
+            db.query(Job).filter(Job.id == job_id).delete()
+            db.commit()
+            assert client.get(f"/jobs/{job_id}/status").json() == first
+            
+            # payload and result are not cached, so they still come from the table
+            assert client.get(f"/jobs/{job_id}/status", params={"fields": "result"}).status_code == 404
+        finally:
+            db.close()
+    
+    def test_transition_evicts_cached_status(self, setup_database, local_cache):
+        """
+        Test that a status transition is visible straight away
+        Verifies the reporter evicts the entry instead of waiting for its TTL
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.QUEUED, progress=0)
+            db.add(job)
+            db.commit()
+            job_id = job.id
+            
+            assert client.get(f"/jobs/{job_id}/status").json()["status"] == "queued"
+            reporter = ProgressReporter(job_id, db, flush_interval=3600)
+            reporter.start()
+            assert client.get(f"/jobs/{job_id}/status").json()["status"] == "running"
+            reporter.complete()
+            data = client.get(f"/jobs/{job_id}/status").json()
+            assert data["status"] == "completed"
+            assert data["progress"] == 100
+        finally:
+            db.close()
+    
+    def test_local_cache_bound_and_expiry(self):
+        """
+        Test that the in-process LRU drops its least recently used and expired entries
+        """
+        async def exercise():
+            cache = LocalStatusCache(max_entries=2)
+            await cache.put("a", {"status": JobStatus.COMPLETED}, 60)
+            await cache.put("b", {"status": JobStatus.COMPLETED}, 60)
+            assert await cache.get("a") is not None
+            await cache.put("c", {"status": JobStatus.COMPLETED}, 60)
+            assert await cache.get("b") is None
+            assert await cache.get("a") is not None
+            await cache.put("d", {"status": JobStatus.RUNNING}, 0)
+            assert await cache.get("d") is None
+        
+        asyncio.run(exercise())
+        assert status_ttl(JobStatus.COMPLETED) > status_ttl(JobStatus.RUNNING)
+
+class TestBatchSubmission:
+    """Test validation of the bulk job submission endpoint"""
+    
+    def test_empty_batch_rejected(self):
+        """Test that a batch must contain at least one job"""
+        response = client.post("/gather/jobs:batch", json={"jobs": []})
+        assert response.status_code == 422
+    
+    def test_unsupported_job_type_rejected(self, setup_database):
+        """
+        Test that job types without a task implementation are refused
+        Verifies nothing is inserted that no worker could ever run
+        """
+        response = client.post("/gather/jobs:batch", json={
+            "jobs": [{"type": "test"}, {"type": "media_consumption"}]
+        })
+        assert response.status_code == 400
+        assert "media_consumption" in response.json()["detail"]
+
+class TestIdempotentSubmission:
+    """Test deduplication of repeated job submissions"""
+    
+    @pytest.fixture
+    def dispatched(self, monkeypatch):
+        """Record dispatched jobs instead of publishing them to the broker"""
+        dispatched = []
+        monkeypatch.setattr(main, "dispatch_job", lambda job_id, job_type: dispatched.append(job_id))
+        monkeypatch.setattr(main, "dispatch_jobs", lambda jobs: dispatched.extend(job_id for job_id, _ in jobs))
+        return dispatched
+    
+    def test_repeated_key_returns_original_job(self, setup_database, dispatched):
+        """
+        Test that a retried request with the same Idempotency-Key creates no new job
+        Verifies the original job is returned and queued only once
+        """
+        headers = {"Idempotency-Key": "gather-click-1"}
+        first = client.post("/gather/queue-test-job", headers=headers)
+        second = client.post("/gather/queue-test-job", headers=headers)
+        assert first.status_code == 200 and second.status_code == 200
+        assert second.json()["job_id"] == first.json()["job_id"]
+        assert second.json()["duplicate"] is True
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert dispatched == [first.json()["job_id"]]
+        
+        other = client.post("/gather/queue-test-job", headers={"Idempotency-Key": "gather-click-2"})
+        assert other.json()["job_id"] != first.json()["job_id"]
+    
+    def test_failed_dispatch_releases_key(self, setup_database, dispatched, monkeypatch):
+        """
+        Test a submission whose broker publish fails
+        Verifies the job is failed rather than left queued, and a retry with
+        the same key creates and dispatches a new job instead of replaying it
+        """
+        def broker_down(job_id, job_type):
+            raise ConnectionError("broker unavailable")
+        monkeypatch.setattr(main, "dispatch_job", broker_down)
+        headers = {"Idempotency-Key": "gather-click-broker-down"}
+        assert client.post("/gather/queue-test-job", headers=headers).status_code == 500
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(JobDedupKey).filter(JobDedupKey.dedup_key == "gather-click-broker-down").count() == 0
+            job_count = db.query(Job).count()
+        finally:
+            db.close()
+        
+        monkeypatch.setattr(main, "dispatch_job", lambda job_id, job_type: dispatched.append(job_id))
+        retry = client.post("/gather/queue-test-job", headers=headers)
+        assert retry.status_code == 200
+        assert "duplicate" not in retry.json()
+        assert dispatched == [retry.json()["job_id"]]
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Job).count() == job_count + 1
+            failed = db.query(Job).filter(Job.id != retry.json()["job_id"]).order_by(Job.created_at.desc()).first()
+            assert failed.status == JobStatus.FAILED
+        finally:
+            db.close()
+    
+    def test_losing_concurrent_request_returns_winner(self, setup_database, dispatched, monkeypatch):
+        """
+        Test a request that checked the key just before another request committed it
+        Verifies the unique key rejects the second insert and the winner's job is returned
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.QUEUED, progress=0)
+            db.add(job)
+            db.add(JobDedupKey(dedup_key="raced", job_id=job.id))
+            db.commit()
+            winner_id = job.id
+            job_count = db.query(Job).count()
+        finally:
+            db.close()
+        
+        lookup = main.find_jobs_by_dedup_key
+        calls = []
+        async def stale_first_lookup(db, keys):
+            calls.append(keys)
+            return {} if len(calls) == 1 else await lookup(db, keys)
+        monkeypatch.setattr(main, "find_jobs_by_dedup_key", stale_first_lookup)
+        
+        response = client.post("/gather/queue-test-job", headers={"Idempotency-Key": "raced"})
+        assert response.status_code == 200
+        assert response.json()["job_id"] == winner_id
+        assert dispatched == []
+        
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Job).count() == job_count
+        finally:
+            db.close()
+    
+    def test_batch_dedup_keys(self, setup_database, dispatched):
+        """Test that batch jobs sharing a dedup_key, within or across batches, are created once"""
+        body = {"jobs": [
+            {"type": "test", "dedup_key": "book-42"},
+            {"type": "test", "dedup_key": "book-42"},
+            {"type": "test"},
+        ]}
+        first = client.post("/gather/jobs:batch", json=body).json()
+        assert first["count"] == 2 and first["duplicates"] == 1
+        assert first["job_ids"][0] == first["job_ids"][1]
+        
+        second = client.post("/gather/jobs:batch", json=body).json()
+        assert second["count"] == 1 and second["duplicates"] == 2
+        assert second["job_ids"][0] == first["job_ids"][0]
+        assert len(dispatched) == 3
+    
+    def test_batch_failed_dispatch_releases_keys(self, setup_database, dispatched, monkeypatch):
+        """
+        Test a batch whose broker publish fails
+        Verifies its jobs are failed rather than left queued, and resubmitting
+        the same keys creates and dispatches new jobs
+        """
+        def broker_down(jobs):
+            raise ConnectionError("broker unavailable")
+        monkeypatch.setattr(main, "dispatch_jobs", broker_down)
+        def status_counts():
+            db = TestingSessionLocal()
+            try:
+                return dict(db.query(Job.status, func.count()).group_by(Job.status).all())
+            finally:
+                db.close()
+        before = status_counts()
+        body = {"jobs": [{"type": "test", "dedup_key": "reel-7"}, {"type": "test"}]}
+        response = client.post("/gather/jobs:batch", json=body)
+        assert response.status_code == 500
+        
+        after = status_counts()
+        assert after.get(JobStatus.QUEUED, 0) == before.get(JobStatus.QUEUED, 0)
+        assert after.get(JobStatus.FAILED, 0) == before.get(JobStatus.FAILED, 0) + 2
+        
+        monkeypatch.setattr(main, "dispatch_jobs", lambda jobs: dispatched.extend(job_id for job_id, _ in jobs))
+        retry = client.post("/gather/jobs:batch", json=body).json()
+        assert retry["count"] == 2 and retry["duplicates"] == 0
+        assert dispatched == retry["job_ids"]
+
+class TestJobEventBroadcast:
+    """Test fan-out of job events to streaming viewers"""
+    
+    def test_dispatch_reaches_every_subscriber(self):
+        """
+        Test that one published event is delivered to every viewer
+        Verifies a single subscription serves many dashboards
+        """
+        async def scenario():
+            broadcaster = JobEventBroadcaster(channel="test:events")
+            broadcaster._listener = asyncio.get_running_loop().create_future()
+            queues = [broadcaster.subscribe() for _ in range(3)]
+            broadcaster.dispatch('{"job_id": "abc", "progress": 50}')
+            return [queue.get_nowait() for queue in queues]
+        
+        events = asyncio.run(scenario())
+        assert events == [("job", '{"job_id": "abc", "progress": 50}')] * 3
+    
+    def test_slow_subscriber_is_resynced(self):
+        """
+        Test that a viewer whose buffer overflows receives a resync event
+        Verifies slow clients cannot block delivery to others
+        """
+        async def scenario():
+            broadcaster = JobEventBroadcaster(channel="test:events")
+            broadcaster._listener = asyncio.get_running_loop().create_future()
+            queue = broadcaster.subscribe()
+            for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+                broadcaster.dispatch(f'{{"job_id": "{i}"}}')
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+        
+        events = asyncio.run(scenario())
+        assert events == [("resync", "{}")]
+    
+    def test_format_sse(self):
+        """Test Server-Sent Events framing"""
+        assert format_sse("{}", event="job") == "event: job\ndata: {}\n\n"
+
+class TestProgressReporter:
+    """Test write-behind progress reporting used by Celery tasks"""
+    
+    def test_progress_is_coalesced_until_flush(self, setup_database):
+        """
+        Test that progress ticks only reach the jobs table on flush or transition
+        Verifies high-frequency updates do not commit on every tick
+        """
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=JobStatus.QUEUED, progress=0)
+            db.add(job)
+            db.commit()
+            
+            reporter = ProgressReporter(job.id, db, flush_interval=3600)
+            reporter.start()
+            for progress in range(1, 91):
+                reporter.update(progress)
+            
+            db.expire_all()
+            stored = db.query(Job).filter(Job.id == job.id).first()
+            assert stored.status == JobStatus.RUNNING
+            assert stored.progress == 0
+            
+            reporter.flush()
+            db.expire_all()
+            assert db.query(Job).filter(Job.id == job.id).first().progress == 90
+            
+            reporter.complete()
+            db.expire_all()
+            stored = db.query(Job).filter(Job.id == job.id).first()
+            assert stored.status == JobStatus.COMPLETED
+            assert stored.progress == 100
+            assert stored.completed_at is not None
+        finally:
+            db.close()
+
+class TestJobCancellation:
+    """Test cancelling queued and running jobs"""
+    
+    def _add_job(self, status=JobStatus.QUEUED):
+        db = TestingSessionLocal()
+        try:
+            job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=status, progress=0)
+            db.add(job)
+            db.commit()
+            return job.id
+        finally:
+            db.close()
+    
+    def test_cancel_queued_job(self, setup_database):
+        """
+        Test that a queued job is marked cancelled and cannot be cancelled twice
+        Verifies the conflict response for jobs that already finished
+        """
+        job_id = self._add_job()
+        
+        response = client.post(f"/jobs/{job_id}/cancel")
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        
+        status_response = client.get(f"/jobs/{job_id}/status")
+        assert status_response.json()["status"] == "cancelled"
+        
+        response = client.post(f"/jobs/{job_id}/cancel")
+        assert response.status_code == 409
+    
+    def test_cancel_unknown_job(self, setup_database):
+        """Test that cancelling a missing job returns 404"""
+        response = client.post(f"/jobs/{uuid.uuid4()}/cancel")
+        assert response.status_code == 404
+    
+    def test_bulk_cancel_requires_filter(self):
+        """Test that bulk cancellation refuses to match every job"""
+        response = client.post("/jobs/cancel", json={})
+        assert response.status_code == 400
+    
+    def test_cancelled_job_does_not_start(self, setup_database):
+        """
+        Test that a task picking up an already cancelled job stops immediately
+        Verifies the guarded status transition in the progress reporter
+        """
+        job_id = self._add_job(status=JobStatus.CANCELLED)
+        db = TestingSessionLocal()
+        try:
+            with pytest.raises(JobCancelled):
+                ProgressReporter(job_id, db).start()
+            assert db.query(Job).filter(Job.id == job_id).first().status == JobStatus.CANCELLED
+        finally:
+            db.close()
+
+class TestJobPipelines:
+    """Test job dependency graphs and the pipeline scheduler"""
+    
+    DIAMOND = [
+        {"key": "publish", "type": JobType.TEST, "depends_on": ["ocr", "video"]},
+        {"key": "ocr", "type": JobType.TEST, "depends_on": ["gather"]},
+        {"key": "video", "type": JobType.TEST, "depends_on": ["gather"]},
+        {"key": "gather", "type": JobType.TEST, "payload": {"source": "book"}},
+    ]
+    
+    def _finish(self, db, job, status, result=None):
+        db.query(Job).filter(Job.id == job.id).update({"status": status, "result": result})
+        db.commit()
+        return advance_pipeline(db, job.id)
+    
+    def _statuses(self, db, pipeline_id):
+        return {job.stage: job.status for job in db.query(Job).filter(Job.pipeline_id == pipeline_id)}
+    
+    def test_order_stages_validates_graph(self):
+        """
+        Test that stages are ordered parents first and bad graphs are rejected
+        Verifies unknown dependencies and cycles raise PipelineError
+        """
+        keys = [stage["key"] for stage in order_stages(self.DIAMOND)]
+        assert keys[0] == "gather" and keys[-1] == "publish"
+        
+        with pytest.raises(PipelineError):
+            order_stages([{"key": "a", "type": JobType.TEST, "depends_on": ["missing"]}])
+        with pytest.raises(PipelineError, match="cycle"):
+            order_stages([
+                {"key": "a", "type": JobType.TEST, "depends_on": ["b"]},
+                {"key": "b", "type": JobType.TEST, "depends_on": ["a"]},
+            ])
+    
+    def test_pipeline_endpoint_rejects_invalid_graphs(self, setup_database):
+        """Test that cycles and job types without tasks are refused before anything is queued"""
+        response = client.post("/pipelines", json={"stages": [
+            {"key": "a", "type": "test", "depends_on": ["b"]},
+            {"key": "b", "type": "test", "depends_on": ["a"]},
+        ]})
+        assert response.status_code == 400
+        assert "cycle" in response.json()["detail"]
+        
+        response = client.post("/pipelines", json={"stages": [{"key": "a", "type": "media_consumption"}]})
+        assert response.status_code == 400
+    
+    def test_children_released_when_all_parents_complete(self, setup_database, monkeypatch):
+        """
+        Test that branches are released together and a join waits for both
+        Verifies parent results are handed to children as inputs
+        """
+        dispatched = []
+        monkeypatch.setattr("pipelines.dispatch_released", dispatched.extend)
+        db = TestingSessionLocal()
+        try:
+            pipeline_id, jobs = create_pipeline(db, self.DIAMOND)
+            db.commit()
+            jobs = {job.stage: job for job in jobs}
+            assert self._statuses(db, pipeline_id)["gather"] == JobStatus.QUEUED
+            assert self._statuses(db, pipeline_id)["publish"] == JobStatus.WAITING
+            
+            released = self._finish(db, jobs["gather"], JobStatus.COMPLETED, {"pages": 3})
+            assert {job_id for job_id, _ in released} == {jobs["ocr"].id, jobs["video"].id}
+            ocr_job = db.query(Job).filter(Job.id == jobs["ocr"].id).first()
+            assert ocr_job.payload["inputs"] == {"gather": {"pages": 3}}
+            
+            assert self._finish(db, jobs["ocr"], JobStatus.COMPLETED, {"text": "ocr.txt"}) == []
+            assert self._statuses(db, pipeline_id)["publish"] == JobStatus.WAITING
+            
+            released = self._finish(db, jobs["video"], JobStatus.COMPLETED, {"video": "out.bin"})
+            assert [job_id for job_id, _ in released] == [jobs["publish"].id]
+            assert len(dispatched) == 3
+            
+            response = client.get(f"/pipelines/{pipeline_id}")
+            assert response.status_code == 200
+            assert len(response.json()["edges"]) == 4
+        finally:
+            db.close()
+    
+    def test_failure_cancels_downstream_jobs(self, setup_database):
+        """Test that a failed job cancels every job that depends on it"""
+        db = TestingSessionLocal()
+        try:
+            pipeline_id, jobs = create_pipeline(db, self.DIAMOND)
+            db.commit()
+            
+            assert self._finish(db, jobs[0], JobStatus.FAILED) == []
+            statuses = self._statuses(db, pipeline_id)
+            assert statuses["gather"] == JobStatus.FAILED
+            assert {statuses[key] for key in ("ocr", "video", "publish")} == {JobStatus.CANCELLED}
+            
+            response = client.get(f"/pipelines/{pipeline_id}")
+            assert response.json()["status"] == "failed"
+        finally:
+            db.close()
+    
+    def test_sweep_skips_jobs_blocked_on_running_parents(self, setup_database, monkeypatch):
+        """
+        Test that the periodic release sweep is not starved by blocked jobs
+        Verifies ready jobs are released even when older jobs still wait on
+        unfinished parents and fill the sweep's limit
+        """
+        monkeypatch.setattr("pipelines.dispatch_released", lambda released: None)
+        db = TestingSessionLocal()
+        try:
+            blocked_id, blocked = create_pipeline(db, self.DIAMOND)
+            ready_id, ready = create_pipeline(db, self.DIAMOND)
+            db.commit()
+            db.query(Job).filter(Job.pipeline_id == blocked_id).update({"created_at": datetime(2000, 1, 1)})
+            db.query(Job).filter(Job.id == ready[0].id).update({"status": JobStatus.COMPLETED})
+            db.commit()
+            
+            for _ in range(10):
+                if not release_ready_jobs(db, limit=1):
+                    break
+            assert self._statuses(db, ready_id)["ocr"] == JobStatus.QUEUED
+            assert self._statuses(db, ready_id)["video"] == JobStatus.QUEUED
+            assert self._statuses(db, blocked_id)["ocr"] == JobStatus.WAITING
+        finally:
+            db.close()
+    
+    def test_failed_dispatch_fails_whole_pipeline(self, setup_database, monkeypatch):
+        """
+        Test a pipeline whose root jobs cannot be sent to the broker
+        Verifies the roots fail and the waiting stages are cancelled instead
+        of staying stuck
+        """
+        def broker_down(jobs):
+            raise ConnectionError("broker unavailable")
+        monkeypatch.setattr(main, "dispatch_jobs", broker_down)
+        stages = [{**stage, "type": stage["type"].value} for stage in self.DIAMOND]
+        db = TestingSessionLocal()
+        try:
+            before = {job_id for (job_id,) in db.query(Job.id).filter(Job.pipeline_id.isnot(None))}
+        finally:
+            db.close()
+        
+        response = client.post("/pipelines", json={"stages": stages})
+        assert response.status_code == 500
+        
+        db = TestingSessionLocal()
+        try:
+            jobs = db.query(Job).filter(Job.pipeline_id.isnot(None), Job.id.notin_(before)).all()
+            statuses = {job.stage: job.status for job in jobs}
+            assert statuses["gather"] == JobStatus.FAILED
+            assert {statuses[key] for key in ("ocr", "video", "publish")} == {JobStatus.CANCELLED}
+        finally:
+            db.close()
+    
+    def test_cancel_dependents_leaves_redis_to_the_caller(self, setup_database, monkeypatch):
+        """
+        Test that cancelling dependents only updates the database
+        Verifies the cancelled ids and types are returned for the caller to record
+        """
+        def no_redis(*args):
+            raise AssertionError("cancel_dependents must not call Redis")
+        
+        monkeypatch.setattr("pipelines.invalidate_job_status", no_redis)
+        monkeypatch.setattr("pipelines.record_jobs_cancelled", no_redis)
+        db = TestingSessionLocal()
+        try:
+            pipeline_id, jobs = create_pipeline(db, self.DIAMOND)
+            db.commit()
+            jobs = {job.stage: job for job in jobs}
+            cancelled = cancel_dependents(db, [jobs["gather"].id], "Upstream job cancelled")
+            assert {job_id for job_id, _ in cancelled} == {jobs[key].id for key in ("ocr", "video", "publish")}
+            assert {job_type for _, job_type in cancelled} == {JobType.TEST}
+            assert self._statuses(db, pipeline_id)["publish"] == JobStatus.CANCELLED
+        finally:
+            db.close()
+
+class TestJobRetention:
+    """Test archival of old finished jobs"""
+    
+    def _add_job(self, db, status, created_at):
+        job = Job(id=str(uuid.uuid4()), type=JobType.TEST, status=status, progress=100, created_at=created_at)
+        db.add(job)
+        return job.id
+    
+    def test_only_old_finished_jobs_are_archived(self, setup_database):
+        """
+        Test that finished jobs past the cutoff move to the archive in batches
+        Verifies active and recent jobs are left in place
+        """
+        db = TestingSessionLocal()
+        try:
+            old = datetime(1999, 1, 1)
+            archived_ids = [
+                self._add_job(db, JobStatus.COMPLETED, old),
+                self._add_job(db, JobStatus.FAILED, old),
+                self._add_job(db, JobStatus.CANCELLED, old),
+            ]
+            kept_ids = [
+                self._add_job(db, JobStatus.RUNNING, old),
+                self._add_job(db, JobStatus.COMPLETED, datetime.utcnow()),
+            ]
+            db.commit()
+            
+            metrics = archive_old_jobs(db, older_than=datetime(2000, 1, 1), batch_size=2, mode="table")
+            assert metrics["rows_archived"] == 3
+            assert metrics["batches"] == 2
+            
+            remaining = {job_id for (job_id,) in db.query(Job.id).filter(Job.id.in_(archived_ids + kept_ids))}
+            assert remaining == set(kept_ids)
+            archived = {job_id for (job_id,) in db.query(JobArchive.id).filter(JobArchive.id.in_(archived_ids))}
+            assert archived == set(archived_ids)
+        finally:
+            db.close()
+
+class TestJobPartitions:
+    """Test monthly partition planning for the jobs table"""
+    
+    def test_partition_bounds_cross_year_boundary(self):
+        """
+        Test that planned partitions are contiguous months around now
+        Verifies month arithmetic across December/January
+        """
+        bounds = partition_bounds(datetime(2024, 12, 15), months_ahead=2)
+        assert [name for name, _, _ in bounds] == ["jobs_2024_11", "jobs_2024_12", "jobs_2025_01", "jobs_2025_02"]
+        for (_, _, end), (_, start, _) in zip(bounds, bounds[1:]):
+            assert end == start
+    
+    def test_single_table_fallback_on_sqlite(self, setup_database):
+        """
+        Test that partition maintenance is a no-op outside PostgreSQL
+        Verifies SQLite runs keep the plain jobs table
+        """
+        with engine.begin() as connection:
+            assert ensure_job_partitions(connection) == []
+            assert detach_old_job_partitions(connection) == []
+    
+    def test_partition_creation_moves_default_rows(self, monkeypatch):
+        """
+        Test partition maintenance against a recorded PostgreSQL connection
+        Verifies a month whose rows sit in the default partition is created by
+        moving them, and that a failing month does not stop the others
+        """
+        class RecordingConnection:
+            dialect = type("Dialect", (), {"name": "postgresql"})
+            
+            def __init__(self):
+                self.statements = []
+            
+            def in_transaction(self):
+                return False
+            
+            def begin(self):
+                return nullcontext()
+            
+            def execute(self, statement, params=None):
+                sql = str(statement)
+                self.statements.append(sql)
+                if "jobs_2025_02" in sql and sql.startswith("CREATE"):
+                    raise ProgrammingError(sql, params, Exception("partition would overlap"))
+                if sql.startswith("SELECT to_regclass"):
+                    exists = params["name"] == "jobs_default"
+                    return type("Result", (), {"scalar": lambda self: "jobs_default" if exists else None})()
+                if sql.startswith("SELECT EXISTS"):
+                    stranded = params["start"] == datetime(2024, 12, 1)
+                    return type("Result", (), {"scalar": lambda self: stranded})()
+        
+        monkeypatch.setattr("partitions.JOB_PARTITIONING", "monthly")
+        connection = RecordingConnection()
+        names = ensure_job_partitions(connection, now=datetime(2024, 12, 15), months_ahead=2)
+        assert names == ["jobs_2024_11", "jobs_2024_12", "jobs_2025_01"]
+        
+        changes = [sql.split(" WHERE")[0] for sql in connection.statements if not sql.startswith("SELECT")]
+        december = changes.index("ALTER TABLE jobs DETACH PARTITION jobs_default")
+        assert changes[december + 1].startswith("CREATE TABLE jobs_2024_12 PARTITION OF jobs")
+        assert changes[december + 2:december + 5] == [
+            "INSERT INTO jobs SELECT * FROM jobs_default",
+            "DELETE FROM jobs_default",
+            "ALTER TABLE jobs ATTACH PARTITION jobs_default DEFAULT",
+        ]
+        assert changes[-1] == "CREATE TABLE IF NOT EXISTS jobs_default PARTITION OF jobs DEFAULT"
+
+class TestOCRPipeline:
+    """Test the chunked OCR pipeline"""
+    
+    def test_page_listing_and_chunking(self, tmp_path, monkeypatch):
+        """
+        Test that pages are numbered in name order and chunked consecutively
+        Verifies non-image files are ignored and paths outside INPUT_ROOT rejected
+        """
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path))
+        for name in ["b.png", "a.png", "notes.txt", "c.TIF"]:
+            (tmp_path / name).write_bytes(b"")
+        pages = list_pages({"source_dir": str(tmp_path)})
+        assert [(page["number"], os.path.basename(page["path"])) for page in pages] == [(1, "a.png"), (2, "b.png"), (3, "c.TIF")]
+        assert list_pages({"pages": ["a.png"]})[0]["path"] == str(tmp_path.resolve() / "a.png")
+        
+        for payload in [{"source_dir": "/etc"}, {"source_dir": ".."}, {"pages": ["a.png", "/etc/passwd"]}]:
+            with pytest.raises(InputPathError):
+                list_pages(payload)
+        os.symlink("/etc/passwd", tmp_path / "d.png")
+        with pytest.raises(InputPathError):
+            list_pages({"source_dir": str(tmp_path)})
+        
+        chunks = chunk_pages(list_pages({"page_count": 25}), 10)
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert chunks[2][0]["number"] == 21
+        
+        with pytest.raises(ValueError):
+            list_pages({})
+    
+    def test_ocr_pages_resume_and_assemble(self, tmp_path):
+        """
+        Test that pages are stored individually and assembled in order
+        Verifies a retried chunk skips pages that are already stored
+        """
+        engine = FakeOCREngine(words_per_page=20)
+        pages = list_pages({"page_count": 5})
+        assert engine.recognize(pages[0]) == engine.recognize(pages[0])
+        
+        assert ocr_pages(engine, pages[:3], str(tmp_path)) == 3
+        seen = []
+        assert ocr_pages(engine, pages, str(tmp_path), on_page=seen.append) == 2
+        assert len(seen) == 5
+        
+        result = assemble_document(str(tmp_path), 5)
+        with open(result["text_path"], encoding="utf-8") as document:
+            text = document.read()
+        assert text == "".join(engine.recognize(page) for page in pages)
+        assert result["characters"] == len(text)
+        assert (tmp_path / page_filename(5)).exists()
+    
+    def test_chunk_and_finalize_tasks_complete_job(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that chunk tasks and the chord callback complete an OCR job
+        Verifies the assembled document is recorded as the job result
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path))
+        db = TestingSessionLocal()
+        try:
+            job = Job(
+                id=str(uuid.uuid4()),
+                type=JobType.OCR_PROCESSING,
+                status=JobStatus.RUNNING,
+                progress=0,
+                payload={"page_count": 4, "engine": "fake"},
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        
+        pages = list_pages({"page_count": 4})
+        chunk_results = [ocr_page_chunk_task.run(job_id, chunk, 4) for chunk in chunk_pages(pages, 2)]
+        assert [result["recognised"] for result in chunk_results] == [2, 2]
+        
+        result = ocr_finalize_task.run(chunk_results, job_id, 4)
+        assert result["status"] == "completed"
+        
+        db = TestingSessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            assert job.status == JobStatus.COMPLETED
+            assert job.progress == 100
+            assert job.result["pages"] == 4
+            assert os.path.exists(job.result["text_path"])
+        finally:
+            db.close()
+
+class TestVideoProcessing:
+    """Test streamed, checkpointed video processing"""
+    
+    def test_resume_after_crash(self, tmp_path):
+        """
+        Test that a rerun continues from the last checkpointed segment
+        Verifies bytes written after the checkpoint are discarded
+        """
+        source = tmp_path / "film.bin"
+        source.write_bytes(os.urandom(10 * 1024 + 100))
+        output_dir = tmp_path / "out"
+        output_dir.mkdir()
+        
+        def crash(done, total):
+            if done == 4:
+                raise RuntimeError("worker lost")
+        
+        with pytest.raises(RuntimeError):
+            process_video(str(source), str(output_dir), CopySegmentProcessor(), segment_bytes=1024, on_segment=crash)
+        with open(output_dir / "output.bin", "ab") as output:
+            output.write(b"half-written segment")
+        
+        result = process_video(str(source), str(output_dir), CopySegmentProcessor(), segment_bytes=1024)
+        assert result["resumed_from_segment"] == 4
+        assert result["segments"] == 11
+        assert (output_dir / "output.bin").read_bytes() == source.read_bytes()
+    
+    def test_checkpoint_ignored_for_changed_source(self, tmp_path):
+        """Test that a checkpoint of a different input restarts from zero"""
+        source = tmp_path / "film.bin"
+        source.write_bytes(b"a" * 4096)
+        process_video(str(source), str(tmp_path), CopySegmentProcessor(), segment_bytes=1024)
+        
+        source.write_bytes(b"b" * 3000)
+        result = process_video(str(source), str(tmp_path), CopySegmentProcessor(), segment_bytes=1024)
+        assert result["resumed_from_segment"] == 0
+        assert (tmp_path / "output.bin").read_bytes() == b"b" * 3000
+    
+    def test_video_task_completes_job(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that the video task processes the payload's source file
+        Verifies the output location is recorded as the job result
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path))
+        source = tmp_path / "film.bin"
+        source.write_bytes(os.urandom(5000))
+        db = TestingSessionLocal()
+        try:
+            job = Job(
+                id=str(uuid.uuid4()),
+                type=JobType.VIDEO_PROCESSING,
+                status=JobStatus.QUEUED,
+                progress=0,
+                payload={"source_path": str(source), "segment_bytes": 1024},
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        
+        assert process_video_task.run(job_id)["status"] == "completed"
+        
+        db = TestingSessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            assert job.status == JobStatus.COMPLETED
+            assert job.result["segments"] == 5
+            with open(job.result["output_path"], "rb") as output:
+                assert output.read() == source.read_bytes()
+        finally:
+            db.close()
+    
+    def test_source_outside_input_root_rejected(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that a video payload cannot name a file outside INPUT_ROOT
+        Verifies the job fails without reading or copying the file
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path / "inputs"))
+        (tmp_path / "inputs").mkdir()
+        os.symlink("/etc/passwd", tmp_path / "inputs" / "link.bin")
+        for source_path in ["/etc/passwd", "../secret.bin", "link.bin"]:
+            db = TestingSessionLocal()
+            try:
+                job = Job(
+                    id=str(uuid.uuid4()),
+                    type=JobType.VIDEO_PROCESSING,
+                    status=JobStatus.QUEUED,
+                    progress=0,
+                    payload={"source_path": source_path},
+                )
+                db.add(job)
+                db.commit()
+                job_id = job.id
+            finally:
+                db.close()
+            
+            with pytest.raises(InputPathError):
+                process_video_task.run(job_id)
+            assert not os.path.exists(tmp_path / "artifacts" / job_id / "output.bin")
+            db = TestingSessionLocal()
+            try:
+                assert db.query(Job.status).filter(Job.id == job_id).scalar() == JobStatus.FAILED
+            finally:
+                db.close()
+
+class TestResultCache:
+    """Test the content-addressed result cache"""
+    
+    def test_fingerprint_depends_on_content_and_parameters(self, tmp_path, monkeypatch):
+        """
+        Test that identical files at different paths share a fingerprint
+        Verifies parameters take part and uncacheable jobs have none
+        """
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path))
+        (tmp_path / "mirror-a.bin").write_bytes(b"reel" * 1000)
+        (tmp_path / "mirror-b.bin").write_bytes(b"reel" * 1000)
+        first = input_fingerprint(JobType.VIDEO_PROCESSING, {"source_path": str(tmp_path / "mirror-a.bin")})
+        second = input_fingerprint(JobType.VIDEO_PROCESSING, {"source_path": str(tmp_path / "mirror-b.bin")})
+        assert first == second
+        
+        digest = input_fingerprint(JobType.VIDEO_PROCESSING, {"source_path": str(tmp_path / "mirror-a.bin"), "processor": "digest"})
+        assert digest != first
+        assert input_fingerprint(JobType.TEST, {}) is None
+        assert input_fingerprint(JobType.VIDEO_PROCESSING, {"source_path": str(tmp_path / "mirror-a.bin"), "cache": False}) is None
+    
+    def test_disk_cache_evicts_least_recently_used(self, tmp_path):
+        """Test that the disk backend stays within its byte budget, evicting the oldest entries"""
+        cache = DiskResultCache(directory=str(tmp_path), max_bytes=250)
+        for number, key in enumerate(["a", "b"]):
+            cache.put(key, {"value": "x" * 80})
+            os.utime(tmp_path / f"{key}.json", (1000 + number, 1000 + number))
+        assert cache.get("a") is not None
+        
+        cache.put("c", {"value": "x" * 80})
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.size()["size_bytes"] <= 250
+    
+    def test_repeated_input_served_from_cache(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that a second job over identical bytes completes from the cache
+        Verifies the job record marks the cache hit and gets its own registered
+        copy of the first output
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path))
+        monkeypatch.setattr("result_cache.RESULT_CACHE_BACKEND", "disk")
+        monkeypatch.setattr("result_cache.RESULT_CACHE_DIR", str(tmp_path / "cache"))
+        data = os.urandom(3000)
+        job_ids = []
+        db = TestingSessionLocal()
+        try:
+            for name in ["mirror-a.bin", "mirror-b.bin"]:
+                (tmp_path / name).write_bytes(data)
+                job = Job(
+                    id=str(uuid.uuid4()),
+                    type=JobType.VIDEO_PROCESSING,
+                    status=JobStatus.QUEUED,
+                    progress=0,
+                    payload={"source_path": str(tmp_path / name), "segment_bytes": 1024},
+                )
+                db.add(job)
+                job_ids.append(job.id)
+            db.commit()
+        finally:
+            db.close()
+        
+        assert "cache_hit" not in process_video_task.run(job_ids[0])
+        assert process_video_task.run(job_ids[1])["cache_hit"] is True
+        
+        db = TestingSessionLocal()
+        try:
+            first, second = [db.query(Job).filter(Job.id == job_id).first() for job_id in job_ids]
+            assert first.cache_hit is False and second.cache_hit is True
+            assert second.status == JobStatus.COMPLETED
+            assert second.input_hash == first.input_hash
+            assert second.result["cached_from"] == first.id
+            assert os.path.dirname(second.result["output_path"]) == str(tmp_path / "artifacts" / second.id)
+            with open(second.result["output_path"], "rb") as output:
+                assert output.read() == data
+            artifact = db.query(Artifact).filter(Artifact.job_id == second.id).one()
+            assert artifact.path == os.path.join(second.id, "output.bin")
+        finally:
+            db.close()
+
+class TestJobStats:
+    """Test the job statistics endpoint and its duration histograms"""
+    
+    def test_histogram_percentiles(self):
+        """
+        Test that percentiles from the bucketed histogram are close to the real ones
+        Verifies the reported value is within one bucket (15%) above the true duration
+        """
+        histogram = {}
+        for seconds, count in [(1.0, 90), (100.0, 10)]:
+            bucket = duration_bucket(seconds)
+            histogram[bucket] = histogram.get(bucket, 0) + count
+        assert 1.0 <= histogram_percentile(histogram, 0.5) <= 1.15
+        assert 100.0 <= histogram_percentile(histogram, 0.95) <= 115.0
+        assert histogram_percentile({}, 0.5) is None
+    
+    def test_stats_endpoint_counts(self, setup_database, monkeypatch):
+        """
+        Test that /jobs/stats reports counts per status and type
+        Verifies active and finished jobs are both counted
+        """
+        monkeypatch.setattr("job_stats._stats_cache", {})
+        before = client.get("/jobs/stats").json()["counts"]
+        monkeypatch.setattr("job_stats._stats_cache", {})
+        
+        db = TestingSessionLocal()
+        try:
+            for status in [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.COMPLETED, JobStatus.COMPLETED]:
+                db.add(Job(id=str(uuid.uuid4()), type=JobType.OCR_PROCESSING, status=status, progress=0))
+            db.commit()
+        finally:
+            db.close()
+        
+        response = client.get("/jobs/stats")
+        assert response.status_code == 200
+        stats = response.json()
+        counts = stats["counts"]
+        assert counts["by_status"]["queued"] == before["by_status"]["queued"] + 1
+        assert counts["by_status"]["running"] == before["by_status"]["running"] + 1
+        assert counts["by_status"]["completed"] == before["by_status"]["completed"] + 2
+        assert counts["by_type"]["ocr_processing"] == before["by_type"]["ocr_processing"] + 4
+        assert counts["total"] == before["total"] + 4
+        assert {"per_minute", "completed_per_minute"} <= set(stats["throughput"])
+        assert {"p50_seconds", "p95_seconds", "samples"} <= set(stats["durations"])
+    
+    def test_unseeded_counters_request_one_reconcile(self, monkeypatch):
+        """
+        Test that readers finding the counters unseeded do not count the table
+        Verifies only the first of several readers sends the reconcile task
+        """
+        class LockOnlyRedis:
+            def __init__(self):
+                self.keys = {}
+            
+            async def set(self, key, value, nx=False, ex=None):
+                if nx and key in self.keys:
+                    return None
+                self.keys[key] = value
+                return True
+            
+            async def delete(self, key):
+                self.keys.pop(key, None)
+        
+        sent = []
+        fake = LockOnlyRedis()
+        monkeypatch.setattr("job_stats.get_async_redis", lambda: fake)
+        monkeypatch.setattr("job_stats._send_reconcile", lambda: sent.append(True))
+        
+        async def readers():
+            for _ in range(3):
+                await request_reconcile()
+        
+        asyncio.run(readers())
+        assert sent == [True]
+        assert RECONCILE_LOCK_KEY in fake.keys
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint and instrumentation helpers"""
+    
+    def test_request_latency_per_route(self, setup_database):
+        """
+        Test that requests are timed per route template
+        Verifies /metrics reports the latency histogram and pool capacity
+        """
+        labels = {"method": "GET", "route": "/jobs/{job_id}/status", "status": "404"}
+        before = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+        client.get(f"/jobs/{uuid.uuid4()}/status")
+        assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == before + 1
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/jobs/{job_id}/status",status="404"}' in response.text
+        assert 'db_pool_capacity{engine="async"} 30.0' in response.text
+    
+    def test_task_runtime_by_job_type(self):
+        """
+        Test that task runtimes are recorded per job type
+        Verifies a finish without a recorded start is ignored
+        """
+        labels = {"job_type": "ocr_processing", "task": "celery_app.ocr_document_task", "state": "SUCCESS"}
+        before = REGISTRY.get_sample_value("celery_task_runtime_seconds_count", labels) or 0
+        task_started("task-1")
+        task_finished("task-1", "celery_app.ocr_document_task", "ocr_processing", "SUCCESS")
+        task_finished("task-2", "celery_app.ocr_document_task", "ocr_processing", "SUCCESS")
+        assert REGISTRY.get_sample_value("celery_task_runtime_seconds_count", labels) == before + 1
+
+class TestWikitextRender:
+    """Test the incremental wikitext tokenizer behind /transcribe/render"""
+    
+    def test_block_spans(self):
+        """
+        Test that markup is tokenized into nested spans and that comments carry over
+        """
+        spans, state = tokenize_block("== Title ==\n* '''bold''' [[Page|shown]]\n<!-- open", 0)
+        assert (0, 11, "mw-header mw-header-2") in spans
+        assert (12, 39, "mw-list mw-list-unordered") in spans
+        assert (14, 24, "mw-bold") in spans
+        assert (27, 31, "mw-link-target") in spans
+        assert spans[-1] == (40, 49, "mw-comment")
+        assert spans.index((25, 39, "mw-link")) < spans.index((27, 31, "mw-link-target"))
+        
+        spans, state = tokenize_block("still comment -->'''x'''", state)
+        assert spans == ((0, 17, "mw-comment"), (17, 24, "mw-bold"))
+        assert state == 0
+        assert render_block_html("<b>'''x'''", ((3, 10, "mw-bold"),)) == "&lt;b&gt;<span class=\"mw-bold\">'''x'''</span>"
+    
+    def test_edit_returns_only_changed_blocks(self):
+        """
+        Test that an edit answers with the blocks it changed
+        Verifies an unclosed comment re-tokenizes the following blocks, stale
+        versions are rejected and offsets count UTF-16 code units
+        """
+        text = "= A =\n\nfirst ''one''\n\nsecond\n\nthird 😀 [[x]]"
+        response = client.post("/transcribe/render", json={"text": text, "html": True})
+        assert response.status_code == 200
+        data = response.json()
+        document_id = data["document_id"]
+        assert [block["length"] for block in data["blocks"]] == [7, 15, 8, 14]
+        assert data["blocks"][3]["spans"][0] == [9, 14, "mw-link"]
+        assert data["blocks"][1]["html"] == "first <span class=\"mw-italic\">''one''</span>\n\n"
+        
+        response = client.post("/transcribe/render", json={
+            "document_id": document_id, "version": 1, "edits": [{"start": 7, "end": 12, "text": "1st"}]
+        })
+        data = response.json()
+        assert data["version"] == 2
+        assert [(change["index"], change["remove"], len(change["insert"])) for change in data["changes"]] == [(1, 1, 1)]
+        
+        edit = {"start": 26, "end": 26, "text": "<!--"}
+        data = client.post("/transcribe/render", json={"document_id": document_id, "version": 2, "edits": [edit]}).json()
+        change = data["changes"][0]
+        assert (change["index"], change["remove"]) == (2, 2)
+        assert change["insert"][1]["spans"] == [[0, 14, "mw-comment"]]
+        
+        stale = client.post("/transcribe/render", json={"document_id": document_id, "version": 2, "edits": [edit]})
+        assert stale.status_code == 409
+        outside = client.post("/transcribe/render", json={
+            "document_id": document_id, "version": 3, "edits": [{"start": 0, "end": data["length"] + 1}]
+        })
+        assert outside.status_code == 400
+        unknown = client.post("/transcribe/render", json={"document_id": "missing", "version": 1, "edits": []})
+        assert unknown.status_code == 404
+    
+    def test_token_cache_bounded_by_bytes(self):
+        """
+        Test that the token cache evicts by estimated size rather than entry count
+        Verifies keys are digests, so cached blocks do not keep their text alive
+        """
+        cache = TokenCache(2000)
+        big = "[[a]] " * 1000
+        key = TokenCache.key(big, 0)
+        assert len(key[0]) == 16
+        cache.put(key, tokenize_block(big, 0))
+        assert cache.get(key) is None
+        
+        for i in range(50):
+            cache.put(TokenCache.key(f"line {i} ''x''", 0), tokenize_block(f"line {i} ''x''", 0))
+        stats = cache.stats()
+        assert 0 < stats["bytes"] <= stats["max_bytes"] == 2000
+        assert stats["size"] < 50
+        assert cache.get(TokenCache.key("line 49 ''x''", 0)) is not None
+        assert cache.get(TokenCache.key("line 0 ''x''", 0)) is None
+        assert cache.get(TokenCache.key("line 49 ''x''", IN_COMMENT)) is None
+    
+    def test_incremental_edits_match_full_tokenization(self):
+        """
+        Test that the blocks after many edits equal tokenizing the edited text from scratch
+        """
+        rng = random.Random(7)
+        pieces = ["a", " ", "\n", "\n\n", "<!--", "-->", "{|", "|}", "|-", "'''", "[[", "]]", "= "]
+        text = "= T =\n\n" + "para [[link]] ''it''\n\n{|\n|-\n| cell\n|}\n\n" * 20
+        document = WikitextDocument("fuzz", text)
+        for _ in range(300):
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.choice([0, 1, 4, 30]))
+            insert = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+            document.edit(start, end, insert)
+            text = text[:start] + insert + text[end:]
+        
+        expected = []
+        state = 0
+        for part in split_blocks(text):
+            spans, state = tokenize_block(part, state)
+            expected.append((part, spans))
+        assert [(block.text, block.spans) for block in document.blocks] == expected
+
+class TestTranscriptions:
+    """Test versioned transcription storage with delta-compressed revisions"""
+    
+    def test_patches_store_deltas_and_periodic_snapshots(self, setup_database, monkeypatch):
+        """
+        Test that one-line fixes to a large book store small deltas
+        Verifies snapshots are taken every interval and that any revision
+        loads correctly without the in-process head cache
+        """
+        monkeypatch.setattr("transcriptions.TRANSCRIPTION_SNAPSHOT_INTERVAL", 3)
+        book = "".join(f"Line {i} of the book, transcribed from page {i // 40}.\n" for i in range(40_000))
+        assert len(book) > 2_000_000
+        response = client.post("/transcribe/transcriptions", json={"title": "Logbook", "text": book})
+        assert response.status_code == 200
+        transcription_id = response.json()["transcription_id"]
+        
+        texts = {1: book}
+        for revision in range(2, 9):
+            start = book.index(f"Line {revision * 1000} ")
+            edit = {"start": start, "end": start + 4, "text": f"Row{revision}"}
+            response = client.patch(f"/transcribe/transcriptions/{transcription_id}", json={
+                "base_revision": revision - 1, "edits": [edit]
+            })
+            assert response.status_code == 200
+            data = response.json()
+            assert data["revision"] == revision
+            assert data["snapshot"] == (revision in (4, 7))
+            assert data["delta_bytes"] < 100
+            book = book[:start] + edit["text"] + book[start + 4:]
+            texts[revision] = book
+        
+        db = TestingSessionLocal()
+        try:
+            sizes = dict(db.query(TranscriptionRevision.revision, func.length(TranscriptionRevision.delta))
+                         .filter(TranscriptionRevision.transcription_id == transcription_id).all())
+            assert sizes[1] is None and max(size for size in sizes.values() if size) < 100
+        finally:
+            db.close()
+        
+        monkeypatch.setattr("transcriptions._head_cache", HeadCache(10_000_000))
+        for revision in (8, 5, 1):
+            data = client.get(f"/transcribe/transcriptions/{transcription_id}", params={"revision": revision}).json()
+            assert data["text"] == texts[revision]
+            assert data["head_revision"] == 8
+        assert client.get(f"/transcribe/transcriptions/{transcription_id}").json()["text"] == texts[8]
+    
+    def test_conflicts_and_invalid_edits(self, setup_database):
+        """
+        Test that stale, out-of-range and unknown saves are rejected
+        Verifies clients can catch up from the revision edits
+        """
+        transcription_id = client.post("/transcribe/transcriptions", json={"text": "Dear sir 😀"}).json()["transcription_id"]
+        url = f"/transcribe/transcriptions/{transcription_id}"
+        
+        assert client.patch(url, json={"base_revision": 1, "edits": [{"start": 5, "end": 8, "text": "madam"}]}).status_code == 200
+        stale = client.patch(url, json={"base_revision": 1, "edits": [{"start": 0, "end": 0, "text": "x"}]})
+        assert stale.status_code == 409
+        assert stale.json()["detail"]["head_revision"] == 2
+        assert client.patch(url, json={"base_revision": 2, "edits": [{"start": 0, "end": 99}]}).status_code == 400
+        # The emoji is two UTF-16 code units; cutting between them is refused
+        assert client.patch(url, json={"base_revision": 2, "edits": [{"start": 12, "end": 13}]}).status_code == 400
+        assert client.patch("/transcribe/transcriptions/missing", json={
+            "base_revision": 1, "edits": [{"start": 0, "end": 0, "text": "x"}]
+        }).status_code == 404
+        
+        data = client.get(f"{url}/revisions", params={"since": 1}).json()
+        assert data["head_revision"] == 2
+        assert [revision["edits"] for revision in data["revisions"]] == [[[5, 8, "madam"]]]
+        assert client.get(url).json()["text"] == "Dear madam 😀"
+        assert client.get(url, params={"revision": 3}).status_code == 404
+
+class TestSearch:
+    """Test the full-text search index over OCR output and transcriptions"""
+    
+    def _completed_ocr_job(self, tmp_path, text, title):
+        """Store a completed OCR job whose document has the given text"""
+        job_id = str(uuid.uuid4())
+        path = tmp_path / f"{job_id}.txt"
+        path.write_text(text, encoding="utf-8")
+        db = TestingSessionLocal()
+        try:
+            db.add(Job(
+                id=job_id,
+                type=JobType.OCR_PROCESSING,
+                status=JobStatus.COMPLETED,
+                progress=100,
+                payload={"page_count": 1, "title": title},
+                result={"text_path": str(path), "pages": 1},
+                completed_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+        return job_id, path
+    
+    def test_ranked_paginated_results(self, setup_database, tmp_path):
+        """
+        Test ranking, pagination, filters and incremental re-indexing
+        Verifies every query term must match and removed sources leave the index
+        """
+        first, _ = self._completed_ocr_job(tmp_path, "Quillwort by the shore. Quillwort again, and quillwort.", "Shore notes")
+        second, _ = self._completed_ocr_job(tmp_path, "A single quillwort beside marram grass.", "Dune survey")
+        third, third_path = self._completed_ocr_job(tmp_path, "Only marram grass here.", "Marram")
+        keys = [document_key("ocr", job_id) for job_id in (first, second, third)]
+        db = TestingSessionLocal()
+        try:
+            assert index_documents(db, keys) == {"indexed": 3, "removed": 0}
+        finally:
+            db.close()
+        
+        response = client.get("/organize/search", params={"q": "quillwort"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 2
+        assert [result["source_id"] for result in body["results"]] == [first, second]
+        assert body["results"][0]["source"] == "ocr"
+        assert body["results"][0]["title"] == "Shore notes"
+        assert "<b>Quillwort</b>" in body["results"][0]["snippet"]
+        
+        page = client.get("/organize/search", params={"q": "quillwort", "limit": 1, "offset": 1}).json()
+        assert page["total"] == 2
+        assert [result["source_id"] for result in page["results"]] == [second]
+        
+        both = client.get("/organize/search", params={"q": "Marram quillwort"}).json()
+        assert [result["source_id"] for result in both["results"]] == [second]
+        
+        # Title matches outrank body matches
+        marram = client.get("/organize/search", params={"q": "marram"}).json()
+        assert [result["source_id"] for result in marram["results"]] == [third, second]
+        
+        assert client.get("/organize/search", params={"q": "quillwort", "source": "transcription"}).json()["total"] == 0
+        assert client.get("/organize/search", params={"q": "quillwort", "source": "video"}).status_code == 400
+        assert client.get("/organize/search", params={"q": "sphagnum"}).json()["results"] == []
+        
+        # Re-indexing one document leaves the others alone
+        os.remove(third_path)
+        db = TestingSessionLocal()
+        try:
+            assert index_documents(db, [keys[2]]) == {"indexed": 0, "removed": 1}
+            assert index_documents(db, [keys[2]]) == {"indexed": 0, "removed": 0}
+        finally:
+            db.close()
+        marram = client.get("/organize/search", params={"q": "marram"}).json()
+        assert [result["source_id"] for result in marram["results"]] == [second]
+    
+    def test_finished_ocr_job_is_indexed(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that the OCR pipeline indexes the assembled document
+        Without the queue the finalize step indexes the document itself
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path))
+        monkeypatch.setattr("celery_app.queue_for_indexing", lambda keys: None)
+        marker = f"ledger{uuid.uuid4().hex}"
+        db = TestingSessionLocal()
+        try:
+            job = Job(
+                id=str(uuid.uuid4()),
+                type=JobType.OCR_PROCESSING,
+                status=JobStatus.RUNNING,
+                progress=0,
+                payload={"page_count": 2, "engine": "fake", "title": f"Parish {marker}"},
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        
+        pages = list_pages({"page_count": 2})
+        chunk_results = [ocr_page_chunk_task.run(job_id, pages, 2)]
+        assert ocr_finalize_task.run(chunk_results, job_id, 2)["status"] == "completed"
+        
+        results = client.get("/organize/search", params={"q": marker}).json()["results"]
+        assert [result["source_id"] for result in results] == [job_id]
+        assert results[0]["title"] == f"Parish {marker}"
+    
+    def test_transcription_saves_are_reindexed(self, setup_database, monkeypatch):
+        """
+        Test that saving a transcription replaces its indexed text
+        Verifies terms removed by an edit stop matching
+        """
+        async def unavailable(keys):
+            return None
+        monkeypatch.setattr(main, "queue_for_indexing_async", unavailable)
+        
+        created = client.post("/transcribe/transcriptions", json={"title": "Field book", "text": "Sphagnum moss on the bog"}).json()
+        results = client.get("/organize/search", params={"q": "sphagnum", "source": "transcription"}).json()["results"]
+        assert [result["source_id"] for result in results] == [created["transcription_id"]]
+        
+        response = client.patch(f"/transcribe/transcriptions/{created['transcription_id']}", json={
+            "base_revision": 1,
+            "edits": [{"start": 0, "end": 8, "text": "Cotton-grass"}]
+        })
+        assert response.status_code == 200
+        assert client.get("/organize/search", params={"q": "sphagnum"}).json()["total"] == 0
+        results = client.get("/organize/search", params={"q": "cotton grass bog"}).json()["results"]
+        assert [result["source_id"] for result in results] == [created["transcription_id"]]
+        assert results[0]["title"] == "Field book"
+    
+    def test_highlight_escapes_text(self):
+        """Test that snippets are HTML-escaped around the highlighted terms"""
+        assert highlight("a <b> & Marram\n grass", ["marram"]) == "a &lt;b&gt; &amp; <b>Marram</b> grass"
+    
+    def test_headline_escapes_text(self):
+        """Test that PostgreSQL headlines are escaped like highlight() snippets"""
+        headline = "a <script> & \x02Marram\x03 grass"
+        assert escape_headline(headline) == "a &lt;script&gt; &amp; <b>Marram</b> grass"
+
+class TestCategorization:
+    """Test batch categorization of indexed documents"""
+    
+    TEXTS = [
+        "Dear Sir, I received your letter of the fourth and reply at once. Yours sincerely",
+        "The court held the statute void, and the judge ordered the plaintiff to pay.",
+        "",
+        "A sonnet and three other poems, with a chapter of verse for the novel's hero.",
+        "Thirty-two barrels, some rope and a lantern.",
+    ]
+    
+    def test_batches_match_single_documents(self):
+        """
+        Test that classifying a batch equals classifying each text alone
+        Verifies the vectorized scoring keeps documents apart
+        """
+        model = CategoryModel(DEFAULT_CATEGORY_PROFILES, features=2 ** 12)
+        batch = model.classify(self.TEXTS)
+        assert [category for category, _ in batch] == ["correspondence", "law", "uncategorized", "literature", "uncategorized"]
+        assert batch[2] == ("uncategorized", 0.0)
+        assert batch == [model.classify([text])[0] for text in self.TEXTS]
+    
+    def test_job_assigns_categories(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that a CATEGORIZATION job stores assignments batch by batch
+        Verifies /organize/categories counts them and finished documents are
+        skipped by the next uncategorized run
+        """
+        db = TestingSessionLocal()
+        try:
+            keys = []
+            for text in self.TEXTS:
+                path = tmp_path / f"{uuid.uuid4()}.txt"
+                path.write_text(text, encoding="utf-8")
+                job = Job(
+                    id=str(uuid.uuid4()),
+                    type=JobType.OCR_PROCESSING,
+                    status=JobStatus.COMPLETED,
+                    progress=100,
+                    payload={"title": "Scan"},
+                    result={"text_path": str(path)},
+                    completed_at=datetime.utcnow()
+                )
+                db.add(job)
+                db.commit()
+                keys.append(document_key("ocr", job.id))
+            index_documents(db, keys)
+        finally:
+            db.close()
+        before = {category["name"]: category["documents"] for category in client.get("/organize/categories").json()["categories"]}
+        
+        def run_job(payload):
+            db = TestingSessionLocal()
+            try:
+                job = Job(id=str(uuid.uuid4()), type=JobType.CATEGORIZATION, status=JobStatus.QUEUED, progress=0, payload=payload)
+                db.add(job)
+                db.commit()
+                job_id = job.id
+            finally:
+                db.close()
+            result = categorize_documents_task.run(job_id)
+            db = TestingSessionLocal()
+            try:
+                assert db.query(Job.status).filter(Job.id == job_id).scalar() == JobStatus.COMPLETED
+            finally:
+                db.close()
+            return result
+        
+        result = run_job({"document_ids": keys, "batch_size": 2})
+        assert result["documents"] == 5
+        assert result["categories"] == {"correspondence": 1, "law": 1, "literature": 1, "uncategorized": 2}
+        
+        response = client.get("/organize/categories")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["section"] == "organize"
+        after = {category["name"]: category["documents"] for category in body["categories"]}
+        assert after["law"] - before["law"] == 1
+        assert after["uncategorized"] - before["uncategorized"] == 2
+        assert after["history"] == before["history"]
+        
+        # Everything else indexed so far, then nothing left
+        run_job({})
+        assert client.get("/organize/categories").json()["pending"] == 0
+        assert run_job({"scope": "uncategorized"})["documents"] == 0
+
+class TestMediaServing:
+    """Test artifact registration, the recent listing and range/conditional serving"""
+    
+    def test_parse_range(self):
+        """Test single ranges, suffix ranges and the headers that are ignored"""
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=950-2000", 1000) == (950, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+        assert parse_range("bytes=0-1,5-9", 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+        assert parse_range("bytes=9-3", 1000) is None
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=-0", 1000)
+    
+    def test_video_output_listed_and_served(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test that a finished video job's output appears in /consume/recent
+        Verifies full, partial, HEAD and conditional responses for its content
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+        monkeypatch.setattr("storage.INPUT_ROOT", str(tmp_path))
+        monkeypatch.setattr("media.MEDIA_CHUNK_BYTES", 1000)
+        source = tmp_path / "reel.mp4"
+        data = os.urandom(5000)
+        source.write_bytes(data)
+        db = TestingSessionLocal()
+        try:
+            job = Job(
+                id=str(uuid.uuid4()),
+                type=JobType.VIDEO_PROCESSING,
+                status=JobStatus.QUEUED,
+                progress=0,
+                payload={"source_path": str(source), "segment_bytes": 1024, "title": "Harbour reel", "content_type": "text/html"},
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+        assert process_video_task.run(job_id)["status"] == "completed"
+        
+        response = client.get("/consume/recent")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["section"] == "consume"
+        item = body["recent_items"][0]
+        assert item["job_id"] == job_id
+        assert item["type"] == "video_processing"
+        assert item["title"] == "Harbour reel"
+        assert item["content_type"] == "video/mp4"
+        assert item["size"] == 5000
+        url = item["url"]
+        
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == data
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-type"] == "video/mp4"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        
+        response = client.get(url, headers={"Range": "bytes=1500-2499"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 1500-2499/5000"
+        assert response.content == data[1500:2500]
+        response = client.get(url, headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.content == data[-10:]
+        response = client.get(url, headers={"Range": "bytes=5000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */5000"
+        
+        # A range only applies while If-Range still names the file
+        response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+        response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == data
+        
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+        
+        response = client.head(url)
+        assert response.status_code == 200
+        assert response.headers["content-length"] == "5000"
+        assert response.content == b""
+        
+        assert client.get("/consume/artifacts/missing").status_code == 404
+        os.remove(tmp_path / "artifacts" / job_id / "output.bin")
+        assert client.get(url).status_code == 404
+    
+    def test_recent_listing_pages_and_filters(self, setup_database, tmp_path, monkeypatch):
+        """
+        Test newest-first cursor pagination, the type filter and idempotent registration
+        Other tests' artifacts are older, so these lead every page they appear on
+        """
+        monkeypatch.setattr("storage.ARTIFACT_ROOT", str(tmp_path))
+        job_ids = [str(uuid.uuid4()) for _ in range(3)]
+        db = TestingSessionLocal()
+        try:
+            for job_id, job_type in zip(job_ids, [JobType.OCR_PROCESSING, JobType.VIDEO_PROCESSING, JobType.OCR_PROCESSING]):
+                path = tmp_path / job_id / "document.txt"
+                path.parent.mkdir()
+                path.write_text(f"document {job_id}", encoding="utf-8")
+                register_artifact(db, job_id, job_type, str(path))
+            # A retried task registers the same file again
+            register_artifact(db, job_ids[0], JobType.OCR_PROCESSING, str(tmp_path / job_ids[0] / "document.txt"), title="Ledger")
+            with pytest.raises(ArtifactNotFound):
+                register_artifact(db, job_ids[0], JobType.OCR_PROCESSING, str(tmp_path.parent / "elsewhere.txt"))
+        finally:
+            db.close()
+        
+        first = client.get("/consume/recent", params={"limit": 2}).json()
+        assert [item["job_id"] for item in first["recent_items"]] == [job_ids[0], job_ids[2]]
+        assert first["recent_items"][0]["title"] == "Ledger"
+        assert first["recent_items"][0]["content_type"] == "text/plain"
+        second = client.get("/consume/recent", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        assert second["recent_items"][0]["job_id"] == job_ids[1]
+        
+        videos = client.get("/consume/recent", params={"type": "video_processing"}).json()
+        assert videos["recent_items"][0]["job_id"] == job_ids[1]
+        assert all(item["type"] == "video_processing" for item in videos["recent_items"])
+        assert client.get("/consume/recent", params={"cursor": "not-a-cursor"}).status_code == 400
+        
+        # Types that could run script on the API origin are served as bytes
+        page = tmp_path / "page.html"
+        page.write_text("<script>alert(1)</script>", encoding="utf-8")
+        db = TestingSessionLocal()
+        try:
+            assert register_artifact(db, "html-job", JobType.OCR_PROCESSING, str(page)).content_type == "application/octet-stream"
+            svg = register_artifact(db, "svg-job", JobType.OCR_PROCESSING, str(page), content_type="image/svg+xml")
+            assert svg.content_type == "application/octet-stream"
+        finally:
+            db.close()
+
 class TestJobCreationAndStatusUpdates:
     """Test complete job lifecycle from creation to completion"""
     
@@ -0,0 +1,268 @@
+"""
+Versioned transcription storage
+Saves arrive as edits against a base revision and are stored as compressed
+deltas, with a full snapshot whenever enough revisions or delta bytes have
+piled up since the last one. Loading any revision therefore reads one
+snapshot and a bounded number of deltas
+"""
+
+import os
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models import Transcription, TranscriptionRevision
+from wikitext import utf16_length
+
+# A snapshot is stored once this many revisions, or this many compressed
+# delta bytes, have accumulated since the previous one
+TRANSCRIPTION_SNAPSHOT_INTERVAL = int(os.getenv("TRANSCRIPTION_SNAPSHOT_INTERVAL", "50"))
+TRANSCRIPTION_SNAPSHOT_DELTA_BYTES = int(os.getenv("TRANSCRIPTION_SNAPSHOT_DELTA_BYTES", str(1024 * 1024)))
+
+# Head texts kept per API process, in megabytes of characters, so saves
+# apply edits without rebuilding the text
+TRANSCRIPTION_CACHE_MB = int(os.getenv("TRANSCRIPTION_CACHE_MB", "64"))
+
+ZLIB_LEVEL = 6
+
+class TranscriptionError(ValueError):
+    """Raised for edits that do not apply to a transcription"""
+
+class TranscriptionNotFound(TranscriptionError):
+    """The transcription or revision does not exist"""
+
+class RevisionConflict(TranscriptionError):
+    """The edits were made against a revision that is no longer the head"""
+    
+    def __init__(self, head_revision: int):
+        super().__init__(f"Transcription is at revision {head_revision}")
+        self.head_revision = head_revision
+
+def apply_edits(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    """
+    Apply (start, end, text) replacements in UTF-16 code units, each against
+    the text the previous one left
+    Edits that fall outside the text or split a surrogate pair are rejected
+    """
+    # ASCII text (an O(1) check) is indexed like UTF-16; anything else is
+    # spliced as UTF-16 bytes, encoded once for all remaining edits
+    encoded = None
+    for start, end, replacement in edits:
+        if encoded is None and text.isascii():
+            if not 0 <= start <= end <= len(text):
+                raise TranscriptionError(f"Edit range {start}-{end} outside the text (length {len(text)})")
+            text = text[:start] + replacement + text[end:]
+            continue
+        if encoded is None:
+            encoded = bytearray(text.encode("utf-16-le"))
+        if not 0 <= start <= end <= len(encoded) // 2:
+            raise TranscriptionError(f"Edit range {start}-{end} outside the text (length {len(encoded) // 2})")
+        encoded[start * 2:end * 2] = replacement.encode("utf-16-le")
+    if encoded is None:
+        return text
+    try:
+        return encoded.decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise TranscriptionError("Edits split a surrogate pair")
+
+def encode_delta(edits: List[Tuple[int, int, str]]) -> bytes:
+    """Compressed JSON of a revision's edits"""
+    return zlib.compress(orjson.dumps(edits), ZLIB_LEVEL)
+
+def decode_delta(data: bytes) -> list:
+    return orjson.loads(zlib.decompress(data))
+
+def encode_snapshot(text: str) -> bytes:
+    """Compressed UTF-8 of a revision's full text"""
+    return zlib.compress(text.encode("utf-8"), ZLIB_LEVEL)
+
+def decode_snapshot(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+class HeadCache:
+    """LRU of head texts by transcription id, bounded by total characters"""
+    
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+    
+    def get(self, transcription_id: str, revision: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(transcription_id)
+            if entry is None or entry[0] != revision:
+                return None
+            self._entries.move_to_end(transcription_id)
+            return entry[1]
+    
+    def put(self, transcription_id: str, revision: int, text: str):
+        with self._lock:
+            previous = self._entries.pop(transcription_id, None)
+            if previous is not None:
+                self._chars -= len(previous[1])
+            if len(text) > self.max_chars:
+                return
+            self._entries[transcription_id] = (revision, text)
+            self._chars += len(text)
+            while self._chars > self.max_chars:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+_head_cache = HeadCache(TRANSCRIPTION_CACHE_MB * 1024 * 1024)
+
+def _rebuild(snapshot: bytes, deltas: List[bytes]) -> str:
+    """Text of a snapshot with the following deltas applied in order"""
+    return apply_edits(decode_snapshot(snapshot), [edit for delta in deltas for edit in decode_delta(delta)])
+
+async def create_transcription(db: AsyncSession, text: str, title: Optional[str] = None) -> Transcription:
+    """Store a new transcription with its text as snapshot revision 1"""
+    snapshot = await run_in_threadpool(encode_snapshot, text)
+    transcription = Transcription(id=str(uuid.uuid4()), title=title, length=utf16_length(text))
+    db.add(transcription)
+    await db.flush()
+    await db.execute(insert(TranscriptionRevision).values(
+        transcription_id=transcription.id, revision=1, snapshot=snapshot, length=transcription.length
+    ))
+    await db.commit()
+    _head_cache.put(transcription.id, 1, text)
+    return transcription
+
+def _snapshot_revision_query(transcription_id: str, revision: int):
+    """Latest snapshot revision at or before a revision"""
+    return select(func.max(TranscriptionRevision.revision)).where(
+        TranscriptionRevision.transcription_id == transcription_id,
+        TranscriptionRevision.revision <= revision,
+        TranscriptionRevision.snapshot.isnot(None)
+    )
+
+def _revision_rows_query(transcription_id: str, snapshot_revision: int, revision: int):
+    """Snapshot row and the delta rows after it, up to a revision"""
+    return (
+        select(TranscriptionRevision.revision, TranscriptionRevision.snapshot, TranscriptionRevision.delta)
+        .where(
+            TranscriptionRevision.transcription_id == transcription_id,
+            TranscriptionRevision.revision >= snapshot_revision,
+            TranscriptionRevision.revision <= revision
+        )
+        .order_by(TranscriptionRevision.revision)
+    )
+
+async def read_transcription_text(db: AsyncSession, transcription: Transcription, revision: Optional[int] = None) -> str:
+    """
+    Text of a revision of a transcription, the head by default
+    Reads the latest snapshot at or before it and the deltas after that
+    """
+    revision = revision or transcription.head_revision
+    if not 1 <= revision <= transcription.head_revision:
+        raise TranscriptionNotFound(f"Revision {revision} not found")
+    cached = _head_cache.get(transcription.id, revision)
+    if cached is not None:
+        return cached
+    
+    if revision == transcription.head_revision:
+        snapshot_revision = transcription.snapshot_revision
+    else:
+        snapshot_revision = (await db.execute(_snapshot_revision_query(transcription.id, revision))).scalar()
+    rows = (await db.execute(_revision_rows_query(transcription.id, snapshot_revision, revision))).all()
+    text = await run_in_threadpool(_rebuild, rows[0].snapshot, [row.delta for row in rows[1:]])
+    if revision == transcription.head_revision:
+        _head_cache.put(transcription.id, revision, text)
+    return text
+
+def read_head_text(db: Session, transcription_id: str) -> Optional[Tuple[Transcription, str]]:
+    """
+    A transcription and its head text, for blocking code such as Celery tasks
+    Returns None for unknown transcriptions
+    """
+    transcription = db.get(Transcription, transcription_id)
+    if transcription is None:
+        return None
+    text = _head_cache.get(transcription_id, transcription.head_revision)
+    if text is None:
+        rows = db.execute(_revision_rows_query(
+            transcription_id, transcription.snapshot_revision, transcription.head_revision
+        )).all()
+        text = _rebuild(rows[0].snapshot, [row.delta for row in rows[1:]])
+    return transcription, text
+
+async def save_revision(db: AsyncSession, transcription_id: str, base_revision: int, edits: List[Tuple[int, int, str]]) -> dict:
+    """
+    Apply edits made against base_revision and store them as the next revision
+    Only the compressed edits are written, plus a snapshot of the new text
+    when one is due. Raises RevisionConflict unless base_revision is the head
+    """
+    transcription = await db.get(Transcription, transcription_id, populate_existing=True)
+    if transcription is None:
+        raise TranscriptionNotFound(f"Unknown transcription: {transcription_id}")
+    if transcription.head_revision != base_revision:
+        raise RevisionConflict(transcription.head_revision)
+    
+    text = await read_transcription_text(db, transcription)
+    text = await run_in_threadpool(apply_edits, text, edits)
+    delta = encode_delta(edits)
+    revision = base_revision + 1
+    snapshot_due = (
+        revision - transcription.snapshot_revision >= TRANSCRIPTION_SNAPSHOT_INTERVAL
+        or transcription.delta_bytes + len(delta) >= TRANSCRIPTION_SNAPSHOT_DELTA_BYTES
+    )
+    snapshot = await run_in_threadpool(encode_snapshot, text) if snapshot_due else None
+    length = transcription.length + sum(utf16_length(replacement) - (end - start) for start, end, replacement in edits)
+    
+    # Conditional on the head, so of two concurrent saves only one lands
+    result = await db.execute(
+        update(Transcription)
+        .where(Transcription.id == transcription_id, Transcription.head_revision == base_revision)
+        .values(
+            head_revision=revision,
+            length=length,
+            snapshot_revision=revision if snapshot_due else transcription.snapshot_revision,
+            delta_bytes=0 if snapshot_due else transcription.delta_bytes + len(delta),
+            updated_at=datetime.utcnow()
+        )
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise RevisionConflict(base_revision + 1)
+    await db.execute(insert(TranscriptionRevision).values(
+        transcription_id=transcription_id, revision=revision, delta=delta, snapshot=snapshot, length=length
+    ))
+    await db.commit()
+    _head_cache.put(transcription_id, revision, text)
+    return {
+        "transcription_id": transcription_id,
+        "revision": revision,
+        "length": length,
+        "snapshot": snapshot_due,
+        "delta_bytes": len(delta)
+    }
+
+async def read_revisions(db: AsyncSession, transcription_id: str, since: int, limit: int) -> List[dict]:
+    """Edits of the revisions after since, oldest first, for clients catching up"""
+    rows = (await db.execute(
+        select(
+            TranscriptionRevision.revision,
+            TranscriptionRevision.delta,
+            TranscriptionRevision.length,
+            TranscriptionRevision.created_at
+        )
+        .where(
+            TranscriptionRevision.transcription_id == transcription_id,
+            TranscriptionRevision.revision > max(since, 1)
+        )
+        .order_by(TranscriptionRevision.revision)
+        .limit(limit)
+    )).all()
+    return [
+        {"revision": row.revision, "edits": decode_delta(row.delta), "length": row.length, "created_at": row.created_at}
+        for row in rows
+    ]
@@ -0,0 +1,144 @@
+"""
+Streaming video processing building blocks
+Large source files are read in fixed-size segments and progress is
+checkpointed per segment so an interrupted job resumes where it stopped
+"""
+
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Optional
+
+from storage import write_atomic
+
+# Bytes read from the source per segment; memory use is bounded by this
+VIDEO_SEGMENT_BYTES = int(os.getenv("VIDEO_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+
+# Segment processor used when a job's payload does not name one
+VIDEO_PROCESSOR = os.getenv("VIDEO_PROCESSOR", "copy")
+
+# Names of the files kept in the job's artifact directory
+OUTPUT_FILENAME = "output.bin"
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+class SegmentProcessor:
+    """Interface for segment processors; process returns the output bytes of one segment"""
+    name = "base"
+    
+    def process(self, data: bytes, index: int) -> bytes:
+        raise NotImplementedError
+
+class CopySegmentProcessor(SegmentProcessor):
+    """Writes segments through unchanged, e.g. to stage a file for later steps"""
+    name = "copy"
+    
+    def process(self, data: bytes, index: int) -> bytes:
+        return data
+
+class DigestSegmentProcessor(SegmentProcessor):
+    """Produces a manifest line with the SHA-256 of every segment (fixity checks)"""
+    name = "digest"
+    
+    def process(self, data: bytes, index: int) -> bytes:
+        return f"{index}\t{len(data)}\t{hashlib.sha256(data).hexdigest()}\n".encode("ascii")
+
+VIDEO_PROCESSORS: Dict[str, Callable[..., SegmentProcessor]] = {
+    CopySegmentProcessor.name: CopySegmentProcessor,
+    DigestSegmentProcessor.name: DigestSegmentProcessor,
+}
+
+def get_segment_processor(name: Optional[str] = None, **options) -> SegmentProcessor:
+    """Instantiate a segment processor by name, defaulting to VIDEO_PROCESSOR"""
+    name = name or VIDEO_PROCESSOR
+    if name not in VIDEO_PROCESSORS:
+        raise ValueError(f"Unknown video processor: {name}")
+    return VIDEO_PROCESSORS[name](**options)
+
+def source_fingerprint(source_path: str, segment_bytes: int, processor: str) -> dict:
+    """Identity of an input; a checkpoint only applies to an unchanged source and settings"""
+    stat = os.stat(source_path)
+    return {
+        "source": os.path.abspath(source_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "segment_bytes": segment_bytes,
+        "processor": processor,
+    }
+
+def load_checkpoint(output_dir: str, fingerprint: dict) -> dict:
+    """
+    Read the checkpoint of a previous attempt
+    Returns an empty checkpoint when none exists or it belongs to another input
+    """
+    empty = {"segments_done": 0, "output_bytes": 0}
+    try:
+        with open(os.path.join(output_dir, CHECKPOINT_FILENAME), encoding="utf-8") as handle:
+            checkpoint = json.load(handle)
+    except (OSError, ValueError):
+        return empty
+    if checkpoint.get("fingerprint") != fingerprint:
+        return empty
+    return checkpoint
+
+def process_video(
+    source_path: str,
+    output_dir: str,
+    processor: SegmentProcessor,
+    segment_bytes: int = VIDEO_SEGMENT_BYTES,
+    on_segment: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Stream a source file through a segment processor into output_dir
+    Only one segment is held in memory at a time. After each segment the
+    output is synced and the checkpoint rewritten, so a rerun after a crash
+    truncates the output to the last checkpoint and continues from there
+    
+    Args:
+        source_path (str): File to process
+        output_dir (str): Directory receiving the output and checkpoint
+        processor (SegmentProcessor): Processor applied to every segment
+        segment_bytes (int): Bytes read per segment
+        on_segment (callable): Called with (segments done, total segments) after each segment
+    
+    Returns:
+        dict: Output path, sizes, segment count and the segment the run resumed from
+    """
+    fingerprint = source_fingerprint(source_path, segment_bytes, processor.name)
+    total_segments = max(1, -(-fingerprint["size"] // segment_bytes))
+    checkpoint = load_checkpoint(output_dir, fingerprint)
+    resumed_from = checkpoint["segments_done"]
+    segments_done = resumed_from
+    output_bytes = checkpoint["output_bytes"]
+    
+    output_path = os.path.join(output_dir, OUTPUT_FILENAME)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILENAME)
+    with open(source_path, "rb") as source, open(output_path, "ab+") as output:
+        # Drop anything written after the last checkpoint
+        output.truncate(output_bytes)
+        output.seek(output_bytes)
+        source.seek(segments_done * segment_bytes)
+        
+        while segments_done < total_segments:
+            data = source.read(segment_bytes)
+            if not data and fingerprint["size"]:
+                break
+            output_bytes += output.write(processor.process(data, segments_done))
+            output.flush()
+            os.fsync(output.fileno())
+            segments_done += 1
+            
+            write_atomic(checkpoint_path, json.dumps({
+                "fingerprint": fingerprint,
+                "segments_done": segments_done,
+                "output_bytes": output_bytes,
+            }))
+            if on_segment is not None:
+                on_segment(segments_done, total_segments)
+    
+    return {
+        "output_path": output_path,
+        "source_bytes": fingerprint["size"],
+        "output_bytes": output_bytes,
+        "segments": total_segments,
+        "resumed_from_segment": resumed_from,
+    }
@@ -0,0 +1,515 @@
+"""
+Incremental MediaWiki tokenizer for the Transcribe editor
+A document is split into blocks (paragraphs up to and including a blank line).
+Each block is tokenized from the state the block before it left open (an
+unclosed comment or table), and token streams are cached per block, so an edit
+re-tokenizes only the blocks it touches plus any following blocks whose
+starting state changed. Offsets exchanged with clients are UTF-16 code units,
+like JavaScript string indices
+"""
+
+import hashlib
+import html
+import os
+import re
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Iterator, List, Optional, Tuple
+
+# Memory (MB, estimated) of the token streams cached per (block text digest,
+# starting state), shared by all documents
+WIKITEXT_TOKEN_CACHE_MB = float(os.getenv("WIKITEXT_TOKEN_CACHE_MB", "64"))
+
+# Documents held per API process; the least recently used one is dropped first
+WIKITEXT_MAX_DOCUMENTS = int(os.getenv("WIKITEXT_MAX_DOCUMENTS", "100"))
+
+# Blocks per page of a document's block index; offsets are located by
+# walking page lengths, then the blocks of one page
+PAGE_BLOCKS = 256
+
+BLOCK_SEPARATOR = "\n\n"
+
+# Estimated bytes of a cached token stream: a fixed cost per entry plus one
+# (start, end, class) tuple per span
+TOKEN_ENTRY_BYTES = 200
+TOKEN_SPAN_BYTES = 120
+
+# Tokenizer state carried from one line (and block) to the next
+IN_COMMENT = 1
+IN_TABLE = 2
+
+# Line patterns of mediawikiHighlighter.js
+HEADER_RE = re.compile(r"(={1,6})\s*(.+?)\s*\1\s*$")
+UNORDERED_LIST_RE = re.compile(r"(\*+)\s*(.+)$")
+ORDERED_LIST_RE = re.compile(r"(#+)\s*(.+)$")
+
+# Inline patterns, earlier alternatives taking precedence at the same position
+INLINE_RE = re.compile(
+    r"(?P<category>\[\[Category:(?P<category_name>[^\]]+?)\]\])"
+    r"|(?P<link>\[\[(?P<link_target>[^\]|]+?)(?:\|(?P<link_display>[^\]]+?))?\]\])"
+    r"|(?P<template>\{\{(?P<template_name>[^}|]+?)(?:\|(?P<template_params>[^}]*?))?\}\})"
+    r"|(?P<external>\[(?P<url>[^\s\]]+)\s+(?P<link_text>[^\]]+?)\])"
+    r"|(?P<bold>'''[^']+?''')"
+    r"|(?P<italic>''[^']+?'')"
+)
+
+# Class of each inline alternative and of its named parts
+INLINE_CLASSES = {
+    "category": ("mw-category", (("category_name", "mw-category-name"),)),
+    "link": ("mw-link", (("link_target", "mw-link-target"), ("link_display", "mw-link-display"))),
+    "template": ("mw-template", (("template_name", "mw-template-name"), ("template_params", "mw-template-params"))),
+    "external": ("mw-external-link", (("url", "mw-url"), ("link_text", "mw-link-text"))),
+    "bold": ("mw-bold", ()),
+    "italic": ("mw-italic", ()),
+}
+
+class WikitextError(ValueError):
+    """Raised for edits that do not apply to a document"""
+
+class DocumentNotFound(WikitextError):
+    """The document is unknown to this process (never opened, or dropped)"""
+
+class VersionConflict(WikitextError):
+    """The edits were made against another version of the document"""
+
+def split_blocks(text: str) -> List[str]:
+    """
+    Split text after every blank line
+    Concatenating the blocks gives the text back; the last block is the
+    unterminated rest and may be empty
+    """
+    parts = text.split(BLOCK_SEPARATOR)
+    return [part + BLOCK_SEPARATOR for part in parts[:-1]] + [parts[-1]]
+
+def _tokenize_inline(line: str, start: int, end: int, base: int, spans: list):
+    for match in INLINE_RE.finditer(line, start, end):
+        name, parts = INLINE_CLASSES[match.lastgroup]
+        spans.append((base + match.start(), base + match.end(), name))
+        for group, part_name in parts:
+            if match.start(group) >= 0:
+                spans.append((base + match.start(group), base + match.end(group), part_name))
+
+def _tokenize_line(line: str, base: int, state: int, spans: list) -> int:
+    """Append the spans of a line starting at offset base and return the state after it"""
+    length = len(line)
+    closes_table = False
+    
+    if not state & IN_COMMENT:
+        if line.startswith("{|"):
+            state |= IN_TABLE
+        if state & IN_TABLE:
+            closes_table = line.startswith("|}")
+            if length:
+                spans.append((base, base + length, "mw-table"))
+            if line.startswith("|-"):
+                spans.append((base, base + length, "mw-table-row"))
+            elif line.startswith("|") and not closes_table:
+                spans.append((base, base + length, "mw-table-cell"))
+        else:
+            header = HEADER_RE.match(line)
+            unordered = None if header else UNORDERED_LIST_RE.match(line)
+            ordered = None if header or unordered else ORDERED_LIST_RE.match(line)
+            if header:
+                spans.append((base, base + length, f"mw-header mw-header-{len(header.group(1))}"))
+            elif unordered:
+                spans.append((base, base + length, "mw-list mw-list-unordered"))
+                spans.append((base, base + unordered.end(1), "mw-list-bullets"))
+            elif ordered:
+                spans.append((base, base + length, "mw-list mw-list-ordered"))
+                spans.append((base, base + ordered.end(1), "mw-list-numbers"))
+    
+    # Comments may run across lines; markup inside them is not highlighted
+    position = search = 0
+    while True:
+        if state & IN_COMMENT:
+            close = line.find("-->", search)
+            if close < 0:
+                if position < length:
+                    spans.append((base + position, base + length, "mw-comment"))
+                break
+            spans.append((base + position, base + close + 3, "mw-comment"))
+            state &= ~IN_COMMENT
+            position = close + 3
+        opening = line.find("<!--", position)
+        if opening < 0:
+            _tokenize_inline(line, position, length, base, spans)
+            break
+        _tokenize_inline(line, position, opening, base, spans)
+        state |= IN_COMMENT
+        position = opening
+        search = opening + 4
+    
+    if closes_table:
+        state &= ~IN_TABLE
+    return state
+
+class TokenCache:
+    """
+    LRU of block token streams, bounded by their estimated size in bytes
+    Keyed by a digest of the block text, so large blocks are not kept alive
+    by the cache itself
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(text: str, state: int) -> Tuple[bytes, int]:
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest(), state
+    
+    def get(self, key: Tuple[bytes, int]) -> Optional[Tuple[tuple, int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key: Tuple[bytes, int], tokens: Tuple[tuple, int]):
+        size = TOKEN_ENTRY_BYTES + TOKEN_SPAN_BYTES * len(tokens[0])
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (tokens, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+_token_cache = TokenCache(int(WIKITEXT_TOKEN_CACHE_MB * 1024 * 1024))
+
+def tokenize_block(text: str, state: int = 0) -> Tuple[tuple, int]:
+    """
+    Spans of a block and the state it leaves open for the next one
+    Spans are (start, end, class) tuples in code points, outer spans before
+    the spans nested in them
+    """
+    key = TokenCache.key(text, state)
+    tokens = _token_cache.get(key)
+    if tokens is None:
+        tokens = _tokenize_block(text, state)
+        _token_cache.put(key, tokens)
+    return tokens
+
+def _tokenize_block(text: str, state: int) -> Tuple[tuple, int]:
+    """tokenize_block without the cache"""
+    spans = []
+    offset = 0
+    for line in text.split("\n"):
+        state = _tokenize_line(line, offset, state, spans)
+        offset += len(line) + 1
+    # Stable, so spans covering the same range stay outer first
+    spans.sort(key=lambda span: (span[0], -span[1]))
+    return tuple(spans), state
+
+def render_block_html(text: str, spans) -> str:
+    """Escaped HTML of a block with a <span class="..."> per span"""
+    out = []
+    open_ends = []
+    position = 0
+    for start, end, name in spans:
+        while open_ends and open_ends[-1] <= start:
+            close = open_ends.pop()
+            out.append(html.escape(text[position:close], quote=False))
+            out.append("</span>")
+            position = close
+        out.append(html.escape(text[position:start], quote=False))
+        position = start
+        out.append(f'<span class="{name}">')
+        open_ends.append(min(end, open_ends[-1]) if open_ends else end)
+    while open_ends:
+        close = open_ends.pop()
+        out.append(html.escape(text[position:close], quote=False))
+        out.append("</span>")
+        position = close
+    out.append(html.escape(text[position:], quote=False))
+    return "".join(out)
+
+def utf16_length(text: str) -> int:
+    """Length of text in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+def _utf16_offsets(text: str) -> List[int]:
+    """UTF-16 offset of every code point index of text, and of its end"""
+    offsets = [0]
+    for char in text:
+        offsets.append(offsets[-1] + (2 if ord(char) > 0xFFFF else 1))
+    return offsets
+
+class Block:
+    """A block of a document with its token stream"""
+    __slots__ = ("id", "text", "units", "entry_state", "exit_state", "spans")
+    
+    def __init__(self, block_id: int, text: str, entry_state: int):
+        self.id = block_id
+        self.text = text
+        self.units = utf16_length(text)
+        self.entry_state = entry_state
+        self.spans, self.exit_state = tokenize_block(text, entry_state)
+    
+    def index_of(self, units: int) -> int:
+        """Code point index of a UTF-16 offset into the block"""
+        if self.units == len(self.text):
+            return units
+        offsets = _utf16_offsets(self.text)
+        index = 0
+        while offsets[index] < units:
+            index += 1
+        return index
+    
+    def payload(self, with_html: bool = False) -> dict:
+        """The block as sent to clients, spans in UTF-16 offsets"""
+        spans = self.spans
+        if self.units != len(self.text):
+            offsets = _utf16_offsets(self.text)
+            spans = tuple((offsets[start], offsets[end], name) for start, end, name in spans)
+        block = {"id": self.id, "length": self.units, "spans": spans}
+        if with_html:
+            block["html"] = render_block_html(self.text, self.spans)
+        return block
+
+class BlockIndex:
+    """
+    The blocks of a document in pages, with the length of every page
+    Offsets and block indexes are found by bisecting cumulative page sums,
+    rebuilt once per splice, so an edit touches one or two pages rather
+    than every block
+    """
+    
+    def __init__(self, blocks: List[Block]):
+        self.pages = [blocks[i:i + PAGE_BLOCKS] for i in range(0, len(blocks), PAGE_BLOCKS)]
+        self.page_units = [sum(block.units for block in page) for page in self.pages]
+        self.count = len(blocks)
+        self.units = sum(self.page_units)
+        self._page_ends = None
+        self._page_unit_ends = None
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self) -> Iterator[Block]:
+        return self.iter_from(0)
+    
+    def _build_sums(self):
+        if self._page_ends is None:
+            self._page_ends = list(accumulate(map(len, self.pages)))
+            self._page_unit_ends = list(accumulate(self.page_units))
+    
+    def _page_of(self, index: int) -> Tuple[int, int]:
+        """Page holding a block index and the position within it"""
+        self._build_sums()
+        page = min(bisect_right(self._page_ends, index), len(self.pages) - 1)
+        return page, index - (self._page_ends[page - 1] if page else 0)
+    
+    def iter_from(self, index: int) -> Iterator[Block]:
+        """Blocks from index onwards"""
+        if index >= self.count:
+            return
+        page, position = self._page_of(index)
+        yield from self.pages[page][position:]
+        for following in self.pages[page + 1:]:
+            yield from following
+    
+    def get(self, index: int) -> Block:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        page, position = self._page_of(index)
+        return self.pages[page][position]
+    
+    def locate(self, offset: int, earlier: bool = False) -> Tuple[int, int]:
+        """
+        Index of the block holding a UTF-16 offset and the offset within it
+        An offset on a block boundary belongs to the later block, or to the
+        earlier one if asked
+        """
+        self._build_sums()
+        page = (bisect_left if earlier else bisect_right)(self._page_unit_ends, offset)
+        if page == len(self.pages):
+            return self.count - 1, self.pages[-1][-1].units
+        if page:
+            offset -= self._page_unit_ends[page - 1]
+        index = self._page_ends[page - 1] if page else 0
+        for position, block in enumerate(self.pages[page]):
+            if offset < block.units or (earlier and offset <= block.units):
+                return index + position, offset
+            offset -= block.units
+    
+    def splice(self, index: int, remove: int, blocks: List[Block]):
+        """Replace remove blocks from index on with blocks"""
+        if index < self.count:
+            first_page, start = self._page_of(index)
+        else:
+            first_page, start = len(self.pages) - 1, len(self.pages[-1])
+        last_page = first_page
+        covered = len(self.pages[first_page])
+        while covered < start + remove:
+            last_page += 1
+            covered += len(self.pages[last_page])
+        
+        merged = [block for page in self.pages[first_page:last_page + 1] for block in page]
+        merged[start:start + remove] = blocks
+        if len(merged) > 2 * PAGE_BLOCKS:
+            pages = [merged[i:i + PAGE_BLOCKS] for i in range(0, len(merged), PAGE_BLOCKS)]
+        else:
+            pages = [merged] if merged else []
+        page_units = [sum(block.units for block in page) for page in pages]
+        
+        self.units += sum(page_units) - sum(self.page_units[first_page:last_page + 1])
+        self.count += len(blocks) - remove
+        self.pages[first_page:last_page + 1] = pages
+        self.page_units[first_page:last_page + 1] = page_units
+        self._page_ends = None
+        self._page_unit_ends = None
+
+class WikitextDocument:
+    """A tokenized document; edits are applied under its lock"""
+    
+    def __init__(self, document_id: str, text: str):
+        self.id = document_id
+        self.version = 1
+        self.lock = threading.Lock()
+        self._next_block_id = 0
+        blocks = []
+        state = 0
+        for part in split_blocks(text):
+            blocks.append(self._new_block(part, state))
+            state = blocks[-1].exit_state
+        self.blocks = BlockIndex(blocks)
+    
+    def _new_block(self, text: str, state: int) -> Block:
+        self._next_block_id += 1
+        return Block(self._next_block_id, text, state)
+    
+    @property
+    def length(self) -> int:
+        return self.blocks.units
+    
+    def text(self) -> str:
+        return "".join(block.text for block in self.blocks)
+    
+    def edit(self, start: int, end: int, text: str) -> Tuple[int, int, List[Block]]:
+        """
+        Replace the UTF-16 range [start, end) with text
+        Returns the splice of blocks that changed: (index, blocks removed,
+        blocks inserted)
+        """
+        first, first_offset = self.blocks.locate(start)
+        last, last_offset = self.blocks.locate(end, earlier=True)
+        if last < first:
+            last, last_offset = first, 0
+        head = self.blocks.get(first)
+        tail = head if last == first else self.blocks.get(last)
+        region = head.text[:head.index_of(first_offset)] + text + tail.text[tail.index_of(last_offset):]
+        
+        # Re-split the touched blocks; a region that no longer ends on a blank
+        # line runs into the next block
+        parts = split_blocks(region)
+        following = self.blocks.iter_from(last + 1)
+        for block in following:
+            if parts[-1] == "":
+                parts.pop()
+                following = self.blocks.iter_from(last + 1)
+                break
+            last += 1
+            parts[-1:] = split_blocks(parts[-1] + block.text)
+        
+        state = self.blocks.get(first - 1).exit_state if first else 0
+        inserted = []
+        for part in parts:
+            inserted.append(self._new_block(part, state))
+            state = inserted[-1].exit_state
+        
+        # Blocks after the region only change if they now start in another state
+        stop = last + 1
+        for block in following:
+            if block.entry_state == state:
+                break
+            inserted.append(self._new_block(block.text, state))
+            state = inserted[-1].exit_state
+            stop += 1
+        
+        self.blocks.splice(first, stop - first, inserted)
+        return first, stop - first, inserted
+
+_documents = OrderedDict()
+_documents_lock = threading.Lock()
+
+def _render(document: WikitextDocument) -> dict:
+    return {"document_id": document.id, "version": document.version, "length": document.length}
+
+def open_document(text: str, document_id: Optional[str] = None, with_html: bool = False) -> dict:
+    """
+    Tokenize a whole document, replacing any open document with the same id
+    Returns every block of it
+    """
+    document = WikitextDocument(document_id or str(uuid.uuid4()), text)
+    with _documents_lock:
+        _documents[document.id] = document
+        _documents.move_to_end(document.id)
+        while len(_documents) > WIKITEXT_MAX_DOCUMENTS:
+            _documents.popitem(last=False)
+    rendered = _render(document)
+    rendered["blocks"] = [block.payload(with_html) for block in document.blocks]
+    return rendered
+
+def edit_document(document_id: str, version: int, edits: List[dict], with_html: bool = False) -> dict:
+    """
+    Apply edits ({"start", "end", "text"}, each against the text the
+    previous one left) to version of an open document
+    Returns the new version and, per edit, the splice of blocks that changed
+    """
+    with _documents_lock:
+        document = _documents.get(document_id)
+        if document is None:
+            raise DocumentNotFound(f"Unknown document: {document_id}")
+        _documents.move_to_end(document_id)
+    
+    with document.lock:
+        if version != document.version:
+            raise VersionConflict(f"Document is at version {document.version}, not {version}")
+        # Validate every edit before applying any, so a bad one changes nothing
+        length = document.length
+        for edit in edits:
+            if not 0 <= edit["start"] <= edit["end"] <= length:
+                raise WikitextError(f"Edit range {edit['start']}-{edit['end']} outside the document (length {length})")
+            length += utf16_length(edit["text"]) - (edit["end"] - edit["start"])
+        
+        changes = []
+        for edit in edits:
+            index, removed, inserted = document.edit(edit["start"], edit["end"], edit["text"])
+            changes.append({
+                "index": index,
+                "remove": removed,
+                "insert": [block.payload(with_html) for block in inserted]
+            })
+        document.version += 1
+        rendered = _render(document)
+    rendered["changes"] = changes
+    return rendered
+
+def read_wikitext_stats() -> dict:
+    """Open documents and token cache usage of this process"""
+    return {"documents": len(_documents), "token_cache": _token_cache.stats()}
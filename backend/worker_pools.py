@@ -0,0 +1,109 @@
+"""
+Launch dedicated Celery worker pools per job type
+CPU-heavy job types run under prefork, I/O-heavy ones under threads or gevent
+
+Usage:
+    python worker_pools.py list                  # show the worker command for each pool
+    python worker_pools.py run ocr_processing    # run one pool in the foreground
+    python worker_pools.py run all               # run every pool as child processes
+    python worker_pools.py shared                # one worker for every queue (development)
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from routing import DISPATCH_QUEUE, MAINTENANCE_QUEUE, QUEUE_SETTINGS, QueueSettings, all_queues
+
+# Pool that runs the batch fan-out and scheduled maintenance tasks
+SYSTEM_POOL = "system"
+SYSTEM_POOL_SETTINGS = QueueSettings(
+    f"{DISPATCH_QUEUE},{MAINTENANCE_QUEUE}", priority=0, concurrency=2, prefetch_multiplier=1, pool="threads"
+)
+
+def pool_settings() -> Dict[str, QueueSettings]:
+    """Settings for every named pool, one per job type plus the system pool"""
+    pools = {job_type.value: settings for job_type, settings in QUEUE_SETTINGS.items()}
+    pools[SYSTEM_POOL] = SYSTEM_POOL_SETTINGS
+    return pools
+
+def worker_command(name: str, settings: QueueSettings) -> List[str]:
+    """Celery worker command line for a pool"""
+    pool = settings.pool
+    if pool == "gevent" and importlib.util.find_spec("gevent") is None:
+        print(f"gevent is not installed; running pool {name} with threads", file=sys.stderr)
+        pool = "threads"
+    return [
+        "celery", "-A", "celery_app", "worker",
+        "--queues", settings.queue,
+        "--pool", pool,
+        "--concurrency", str(settings.concurrency),
+        "--prefetch-multiplier", str(settings.prefetch_multiplier),
+        "--hostname", f"{name}@%h",
+        "--loglevel", "info",
+    ]
+
+def shared_worker_command() -> List[str]:
+    """Single worker consuming every queue, most urgent first"""
+    return [
+        "celery", "-A", "celery_app", "worker",
+        "--queues", ",".join(all_queues()),
+        "--pool", "prefork",
+        "--prefetch-multiplier", "1",
+        "--loglevel", "info",
+    ]
+
+def pool_environment(index: int) -> Dict[str, str]:
+    """
+    Environment of the index-th pool started together with others
+    Each pool's metrics exporter gets its own port, counting up from
+    WORKER_METRICS_PORT
+    """
+    env = dict(os.environ)
+    if env.get("WORKER_METRICS_PORT"):
+        env["WORKER_METRICS_PORT"] = str(int(env["WORKER_METRICS_PORT"]) + index)
+    return env
+
+def run_pools(names: List[str]) -> int:
+    """Run the named pools; a single pool runs in the foreground"""
+    pools = pool_settings()
+    unknown = [name for name in names if name not in pools]
+    if unknown:
+        print(f"Unknown pools: {', '.join(unknown)}. Choose from: {', '.join(pools)}", file=sys.stderr)
+        return 2
+    
+    if len(names) == 1:
+        return subprocess.call(worker_command(names[0], pools[names[0]]))
+    
+    processes = [
+        subprocess.Popen(worker_command(name, pools[name]), env=pool_environment(index))
+        for index, name in enumerate(names)
+    ]
+    try:
+        return max(process.wait() for process in processes)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        return max(process.wait() for process in processes)
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("list", "run", "shared"):
+        print(__doc__)
+        return 2
+    
+    if argv[0] == "list":
+        for name, settings in pool_settings().items():
+            print(f"{name}: {' '.join(worker_command(name, settings))}")
+        return 0
+    if argv[0] == "shared":
+        return subprocess.call(shared_worker_command())
+    
+    names = argv[1:]
+    if names == ["all"]:
+        names = list(pool_settings())
+    return run_pools(names)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,14 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// Fallback polling interval used only while the event stream is unavailable
+const FALLBACK_POLL_INTERVAL = 10000;
+
+// Refresh interval of the queue statistics strip
+const STATS_POLL_INTERVAL = 15000;
+
 /**
  * Gather component - Main job queue management interface
  * Features job listing, creation, and real-time status updates
@@ -12,6 +18,10 @@ function Gather() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [isCreatingJob, setIsCreatingJob] = useState(false);
+  const [isLive, setIsLive] = useState(false);
+  const [stats, setStats] = useState(null);
+  // Idempotency key of the job submission in flight, reused if it is retried
+  const pendingSubmissionKey = useRef(null);
 
   /**
    * Fetch all jobs from the API
@@ -30,15 +40,51 @@ function Gather() {
     }
   };
 
+  /**
+   * Fetch queue statistics (counts and durations) without loading every job
+   */
+  const fetchStats = async () => {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/jobs/stats`);
+      setStats(response.data);
+    } catch (err) {
+      console.error('Error fetching job statistics:', err);
+    }
+  };
+
+  /**
+   * Apply a job state delta received from the event stream
+   * Updates the matching job in place or prepends a newly created one
+   */
+  const applyJobEvent = (event) => {
+    setJobs((currentJobs) => {
+      const index = currentJobs.findIndex((job) => job.job_id === event.job_id);
+      if (index === -1) {
+        // Only full job records (with a creation time) can be shown
+        return event.created_at ? [event, ...currentJobs] : currentJobs;
+      }
+      const updatedJobs = [...currentJobs];
+      updatedJobs[index] = { ...updatedJobs[index], ...event };
+      return updatedJobs;
+    });
+  };
+
   /**
    * Create a new test job
-   * Demonstrates job creation and immediate status update
+   * Demonstrates job creation and immediate status update; one idempotency
+   * key covers a click and its retries, so double clicks queue a single job
    */
   const createTestJob = async () => {
     setIsCreatingJob(true);
+    if (!pendingSubmissionKey.current) {
+      pendingSubmissionKey.current = crypto.randomUUID();
+    }
     try {
-      const response = await axios.post(`${API_BASE_URL}/gather/queue-test-job`);
+      const response = await axios.post(`${API_BASE_URL}/gather/queue-test-job`, null, {
+        headers: { 'Idempotency-Key': pendingSubmissionKey.current }
+      });
       console.log('Job created:', response.data);
+      pendingSubmissionKey.current = null;
       
       // Immediately refresh the job list to show the new job
       await fetchJobs();
@@ -51,6 +97,20 @@ function Gather() {
     }
   };
 
+  /**
+   * Cancel a waiting, queued or running job
+   * The stream delivers the resulting status change
+   */
+  const cancelJob = async (jobId) => {
+    try {
+      await axios.post(`${API_BASE_URL}/jobs/${jobId}/cancel`);
+      setError(null);
+    } catch (err) {
+      setError('Failed to cancel job. It may have already finished.');
+      console.error('Error cancelling job:', err);
+    }
+  };
+
   /**
    * Format timestamp for display
    * Converts ISO timestamp to readable format
@@ -77,6 +137,8 @@ function Gather() {
       case 'running': return `${baseClass} status-running`;
       case 'failed': return `${baseClass} status-failed`;
       case 'queued': return `${baseClass} status-queued`;
+      case 'waiting': return `${baseClass} status-waiting`;
+      case 'cancelled': return `${baseClass} status-cancelled`;
       default: return baseClass;
     }
   };
@@ -93,12 +155,50 @@ function Gather() {
     return baseClass;
   };
 
-  // Set up auto-refresh every 2 seconds
+  // Statistics are cheap counters on the server; refresh them periodically
+  useEffect(() => {
+    fetchStats();
+    const statsInterval = setInterval(fetchStats, STATS_POLL_INTERVAL);
+    return () => clearInterval(statsInterval);
+  }, []);
+
+  // Subscribe to server-pushed job updates, polling only while disconnected
   useEffect(() => {
     fetchJobs();
-    
-    const interval = setInterval(fetchJobs, 2000);
-    return () => clearInterval(interval);
+
+    let pollInterval = null;
+    const startPolling = () => {
+      if (!pollInterval) {
+        pollInterval = setInterval(fetchJobs, FALLBACK_POLL_INTERVAL);
+      }
+    };
+    const stopPolling = () => {
+      clearInterval(pollInterval);
+      pollInterval = null;
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return stopPolling;
+    }
+
+    const eventSource = new EventSource(`${API_BASE_URL}/gather/jobs/stream`);
+    eventSource.onopen = () => {
+      setIsLive(true);
+      stopPolling();
+    };
+    eventSource.onerror = () => {
+      // EventSource reconnects on its own; poll in the meantime
+      setIsLive(false);
+      startPolling();
+    };
+    eventSource.addEventListener('job', (e) => applyJobEvent(JSON.parse(e.data)));
+    eventSource.addEventListener('resync', fetchJobs);
+
+    return () => {
+      eventSource.close();
+      stopPolling();
+    };
   }, []);
 
   return (
@@ -113,6 +213,28 @@ function Gather() {
         <div className="header-ornament right"></div>
       </div>
 
+      {/* Queue statistics */}
+      {stats && (
+        <div className="job-stats">
+          {['waiting', 'queued', 'running', 'completed', 'failed'].map((status) => (
+            <div key={status} className="job-stat">
+              <span className="detail-label">{status.toUpperCase()}</span>
+              <span className="job-stat-value">{stats.counts.by_status[status]}</span>
+            </div>
+          ))}
+          <div className="job-stat">
+            <span className="detail-label">PER MINUTE</span>
+            <span className="job-stat-value">{stats.throughput.completed_per_minute ?? '—'}</span>
+          </div>
+          <div className="job-stat">
+            <span className="detail-label">P50 / P95</span>
+            <span className="job-stat-value">
+              {stats.durations.p50_seconds ?? '—'}s / {stats.durations.p95_seconds ?? '—'}s
+            </span>
+          </div>
+        </div>
+      )}
+
       {/* Action buttons */}
       <div className="action-bar">
         <button
@@ -200,6 +322,11 @@ function Gather() {
                 </div>
 
                 <div className="job-footer">
+                  {['waiting', 'queued', 'running'].includes(job.status) && (
+                    <button onClick={() => cancelJob(job.job_id)} className="btn-secondary">
+                      Cancel
+                    </button>
+                  )}
                   <div className="job-ornament"></div>
                 </div>
               </div>
@@ -211,7 +338,7 @@ function Gather() {
       {/* Auto-refresh indicator */}
       <div className="refresh-indicator">
         <div className="refresh-dot"></div>
-        <span>Auto-refreshing every 2 seconds</span>
+        <span>{isLive ? 'Live updates connected' : 'Reconnecting, refreshing every 10 seconds'}</span>
       </div>
     </div>
   );
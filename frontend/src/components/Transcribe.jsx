@@ -1,9 +1,16 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { 
   highlightMediaWiki, 
   injectMediaWikiStyles, 
   debounce 
 } from '../utils/mediawikiHighlighter';
+import axios from 'axios';
+import { WikitextRenderSession, diffText } from '../utils/wikitextRender';
+
+const API_BASE_URL = 'http://localhost:8000';
+
+// The backend re-renders only the edited blocks, so a short debounce is enough
+const RENDER_DEBOUNCE_MS = 100;
 
 /**
  * Transcribe component - OCR and text processing interface
@@ -12,8 +19,14 @@ import {
 function Transcribe() {
   const [text, setText] = useState('');
   const [highlightedHtml, setHighlightedHtml] = useState('');
+  // Blocks rendered by the backend; null while highlighting locally
+  const [blocks, setBlocks] = useState(null);
   const textareaRef = useRef(null);
   const overlayRef = useRef(null);
+  const renderSessionRef = useRef(null);
+  // Last saved transcription: id, revision and the text it holds
+  const savedRef = useRef({ id: null, revision: null, text: '' });
+  const [saveStatus, setSaveStatus] = useState('');
 
   // Sample MediaWiki text for demonstration
   const sampleText = `= Main Heading =
@@ -50,17 +63,25 @@ And an external link: [https://www.mediawiki.org MediaWiki Documentation]
 | Cell 3 || Cell 4
 |}`;
 
-  // Debounced highlighting function to improve performance
-  const debouncedHighlight = debounce((textToHighlight) => {
-    const highlighted = highlightMediaWiki(textToHighlight);
-    setHighlightedHtml(highlighted);
-  }, 300);
+  // Highlight through the backend's incremental renderer, falling back to
+  // local highlighting when it is unreachable
+  const debouncedHighlight = useMemo(() => debounce(async (textToHighlight) => {
+    if (!renderSessionRef.current) {
+      renderSessionRef.current = new WikitextRenderSession(API_BASE_URL);
+    }
+    try {
+      setBlocks(await renderSessionRef.current.update(textToHighlight));
+    } catch (err) {
+      console.error('Error rendering wikitext:', err);
+      renderSessionRef.current = null;
+      setBlocks(null);
+      setHighlightedHtml(highlightMediaWiki(textToHighlight));
+    }
+  }, RENDER_DEBOUNCE_MS), []);
 
-  // Handle text changes
+  // Handle text changes; highlighting follows from the effect on text
   const handleTextChange = (e) => {
-    const newText = e.target.value;
-    setText(newText);
-    debouncedHighlight(newText);
+    setText(e.target.value);
     syncScroll();
   };
 
@@ -75,13 +96,38 @@ And an external link: [https://www.mediawiki.org MediaWiki Documentation]
   // Load sample text
   const loadSample = () => {
     setText(sampleText);
-    debouncedHighlight(sampleText);
+  };
+
+  // Save the text; after the first save only the changed range is sent
+  const saveTranscription = async () => {
+    const current = text;
+    const saved = savedRef.current;
+    try {
+      if (saved.id === null) {
+        const { data } = await axios.post(`${API_BASE_URL}/transcribe/transcriptions`, { text: current });
+        savedRef.current = { id: data.transcription_id, revision: data.revision, text: current };
+      } else if (current !== saved.text) {
+        const { data } = await axios.patch(`${API_BASE_URL}/transcribe/transcriptions/${saved.id}`, {
+          base_revision: saved.revision,
+          edits: [diffText(saved.text, current)]
+        });
+        savedRef.current = { ...saved, revision: data.revision, text: current };
+      }
+      setSaveStatus(`Saved revision ${savedRef.current.revision}`);
+    } catch (err) {
+      if (err.response?.status === 409) {
+        setSaveStatus(`Not saved: revision ${err.response.data.detail.head_revision} was saved elsewhere`);
+      } else {
+        setSaveStatus('Failed to save transcription');
+        console.error('Error saving transcription:', err);
+      }
+    }
   };
 
   // Clear text
   const clearText = () => {
     setText('');
-    setHighlightedHtml('');
+    debouncedHighlight('');
   };
 
   // Initialize component
@@ -121,10 +167,14 @@ And an external link: [https://www.mediawiki.org MediaWiki Documentation]
           <button onClick={clearText} className="btn-secondary">
             Clear
           </button>
+          <button onClick={saveTranscription} className="btn-secondary">
+            Save
+          </button>
           <div className="editor-info">
             <span className="text-counter">
               {text.length} characters | {text.split('\n').length} lines
             </span>
+            {saveStatus && <span className="text-counter"> | {saveStatus}</span>}
           </div>
         </div>
 
@@ -140,9 +190,14 @@ And an external link: [https://www.mediawiki.org MediaWiki Documentation]
             <div 
               ref={overlayRef}
               className="syntax-overlay mediawiki-editor"
-              dangerouslySetInnerHTML={{ __html: highlightedHtml }}
               onScroll={syncScroll}
-            />
+            >
+              {blocks
+                ? blocks.map((block) => (
+                    <span key={block.id} dangerouslySetInnerHTML={{ __html: block.html }} />
+                  ))
+                : <span dangerouslySetInnerHTML={{ __html: highlightedHtml }} />}
+            </div>
             
             {/* Actual textarea */}
             <textarea
@@ -0,0 +1,92 @@
+/**
+ * Client for the incremental wikitext renderer (POST /transcribe/render)
+ * Keeps the rendered blocks of one document and, after each change, sends
+ * only the edited range; the server answers with the blocks that changed
+ */
+
+import axios from 'axios';
+
+/**
+ * Smallest single replacement turning one text into another
+ * Offsets are UTF-16 code units, as the server expects
+ * @param {string} previous - Text before the change
+ * @param {string} next - Text after the change
+ * @returns {{start: number, end: number, text: string}} Edit against previous
+ */
+export function diffText(previous, next) {
+  const shorter = Math.min(previous.length, next.length);
+  let start = 0;
+  while (start < shorter && previous.charCodeAt(start) === next.charCodeAt(start)) {
+    start++;
+  }
+  let suffix = 0;
+  while (
+    suffix < shorter - start &&
+    previous.charCodeAt(previous.length - 1 - suffix) === next.charCodeAt(next.length - 1 - suffix)
+  ) {
+    suffix++;
+  }
+  return { start, end: previous.length - suffix, text: next.slice(start, next.length - suffix) };
+}
+
+export class WikitextRenderSession {
+  /**
+   * @param {string} apiBaseUrl - Backend base URL
+   */
+  constructor(apiBaseUrl) {
+    this.url = `${apiBaseUrl}/transcribe/render`;
+    this.documentId = null;
+    this.version = null;
+    this.text = '';
+    this.blocks = [];
+    this.pending = Promise.resolve();
+  }
+
+  /**
+   * Render the document's new text; calls are applied one after another
+   * @param {string} text - Full text of the document
+   * @returns {Promise<Array<{id: number, html: string}>>} Rendered blocks
+   */
+  update(text) {
+    const result = this.pending.then(() => this.sync(text));
+    this.pending = result.catch(() => {});
+    return result;
+  }
+
+  async sync(text) {
+    if (this.documentId !== null) {
+      if (text === this.text) {
+        return this.blocks;
+      }
+      try {
+        const { data } = await axios.post(this.url, {
+          document_id: this.documentId,
+          version: this.version,
+          edits: [diffText(this.text, text)],
+          html: true
+        });
+        for (const change of data.changes) {
+          this.blocks = this.blocks.slice(0, change.index).concat(
+            change.insert,
+            this.blocks.slice(change.index + change.remove)
+          );
+        }
+        this.version = data.version;
+        this.text = text;
+        return this.blocks;
+      } catch (err) {
+        // Unknown to this server process or out of step: send the full text again
+        if (![404, 409].includes(err.response?.status)) {
+          throw err;
+        }
+      }
+    }
+
+    const { data } = await axios.post(this.url, { text, document_id: this.documentId, html: true });
+    this.documentId = data.document_id;
+    this.version = data.version;
+    this.text = text;
+    this.blocks = data.blocks;
+    return this.blocks;
+  }
+}